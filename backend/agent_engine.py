@@ -1,14 +1,13 @@
 import config
 import re
-from typing import TypedDict, List, Annotated
+from typing import TypedDict, List
 from langchain_ollama import ChatOllama
-from langchain_core.messages import SystemMessage, HumanMessage
+from langchain_core.messages import HumanMessage
 from langgraph.graph import StateGraph, END
-from langchain_community.tools.tavily_search import TavilySearchResults
-from vector_store import get_vector_store
-
-# Web search Tool
-web_search_tool = TavilySearchResults(k=3)
+import metrics
+import retrieval
+from context_packer import pack_context, merge_stats
+from web_search import web_search
 
 # State Definition
 class AgentState(TypedDict):
@@ -16,6 +15,11 @@ class AgentState(TypedDict):
     context: List[str]
     response: str
     is_sufficient: bool
+    scores: List[float]
+    relevance: List[float]
+    route: str
+    packing: dict
+    filters: dict
 
 # Initialization
 llm = ChatOllama(
@@ -27,30 +31,56 @@ llm = ChatOllama(
 
 # Nodes
 
+def route_for_scores(scores):
+    """
+    Relevance gate: 'local' answers from memory, 'web' skips the local LLM pass and
+    researches straight away, 'both' researches first and answers from both in one pass,
+    'speculative' answers from memory with a web search already started in case it fails.
+    """
+    if not config.RELEVANCE_GATE_ENABLED:
+        return "local"
+    top = max(scores, default=0.0)
+    if top >= config.RELEVANCE_LOCAL_THRESHOLD:
+        return "local"
+    if top < config.RELEVANCE_WEB_THRESHOLD:
+        return "web"
+    # Marginal: try memory first while the web search already runs in the background
+    return "speculative" if config.WEB_SEARCH_SPECULATIVE else "both"
+
+@metrics.timed("retrieve")
 def retrieve_node(state: AgentState):
-    """Fetches top-k relevant documents from ChromaDB."""
+    """Fetches top-k relevant documents (hybrid search, scoped by any /chat filters) and decides the route from their relevance."""
     query = state['query']
     print(f"🔍 Searching memory for: {query}")
     
-    vector_db = get_vector_store()
-    
-    # Increase k to ensure coverage
-    docs = vector_db.similarity_search(query, k=5)
-    context_data = [d.page_content for d in docs]
+    # Vector + BM25 hits, fused (plain vector search when hybrid is off)
+    results = retrieval.search(query, k=5, filters=state.get('filters'))
+    scores = [round(score, 3) for _, score in results]
+    route = route_for_scores(scores)
+
+    # Chunks below the web threshold on both vector and BM25 evidence are noise to the LLM
+    kept = [
+        (d.page_content, score) for d, score in results
+        if not config.RELEVANCE_GATE_ENABLED or score >= config.RELEVANCE_WEB_THRESHOLD
+    ]
+    context_data = [text for text, _ in kept]
     
+    if route == "speculative":
+        web_search.prefetch(query)
+
     # Log only count
-    print(f"📄 Found {len(context_data)} chunks.")
-    return {"context": context_data}
+    print(f"📄 Found {len(context_data)} chunks (top relevance {max(scores, default=0.0):.2f} -> {route}).")
+    return {"context": context_data, "relevance": [score for _, score in kept], "scores": scores, "route": route}
 
-def grade_and_generate_node(state: AgentState):
-    # 1. Label context with strict IDs (internal use only - not shown to user)
-    context_with_ids = []
-    for i, txt in enumerate(state['context']):
-        # Clean text for better LLM parsing
-        clean_txt = txt.replace("\n", " ")[:800] 
-        context_with_ids.append(f"[Source {i}] {clean_txt}...")
-    
-    context_str = "\n\n".join(context_with_ids)
+def build_prompt(state: AgentState):
+    """Returns (prompt, has_researched, packing stats) for the reasoning step."""
+    # 1. Pack context into the token budget and label it with strict IDs (internal use only - not shown to user)
+    packed, packing = pack_context(state['context'], state.get('relevance'))
+    context_str = "\n\n".join(f"[Source {i}] {txt}" for i, txt in packed)
+    metrics.CONTEXT_TOKENS.labels("raw").inc(packing["raw_tokens"])
+    metrics.CONTEXT_TOKENS.labels("packed").inc(packing["packed_tokens"])
+    print(f"✂️ Context packed: {packing['raw_tokens']} -> {packing['packed_tokens']} tokens "
+          f"({packing['used']}/{packing['chunks']} chunks, {packing['duplicates']} duplicates dropped)")
     
     # 2. Check if we have already researched (Loop Prevention)
     has_researched = any("[WEB SEARCH RESULT]" in d for d in state['context'])
@@ -91,10 +121,17 @@ def grade_and_generate_node(state: AgentState):
         3. If the answer is NOT clearly in the context, output exactly: "INSUFFICIENT_INFO"
         4. At the very end, on a new line, cite which source you used: SOURCES: [0]
         """
-    
-    response = llm.invoke([HumanMessage(content=prompt)])
-    content = response.content.strip()
-    
+    return prompt, has_researched, packing
+
+def parse_cited_sources(content):
+    """Returns the indices in the trailing 'SOURCES: [..]' citation, or None if absent."""
+    match = re.search(r"SOURCES:\s*\[([\d,\s]+)\]", content, re.IGNORECASE)
+    if not match:
+        return None
+    return [int(x.strip()) for x in match.group(1).split(",") if x.strip().isdigit()]
+
+def finalize_response(state: AgentState, content, has_researched):
+    """Turns the raw LLM output into the node's state update (sufficiency, cleaned answer, cited sources)."""
     # 4. Loop Prevention & Sufficiency Check
     if "INSUFFICIENT_INFO" in content.upper():
         if has_researched:
@@ -115,12 +152,9 @@ def grade_and_generate_node(state: AgentState):
     final_response = content
     filtered_context = [] 
     
-    match = re.search(r"SOURCES:\s*\[([\d,\s]+)\]", content, re.IGNORECASE)
-    if match:
+    indices = parse_cited_sources(content)
+    if indices is not None:
         try:
-            ids_str = match.group(1)
-            indices = [int(x.strip()) for x in ids_str.split(",") if x.strip().isdigit()]
-            
             # Keep ONLY the cited sources
             for idx in indices:
                 if 0 <= idx < len(state['context']):
@@ -162,11 +196,21 @@ def grade_and_generate_node(state: AgentState):
         "is_sufficient": True
     }
 
+@metrics.timed("reason")
+def grade_and_generate_node(state: AgentState):
+    prompt, has_researched, packing = build_prompt(state)
+    with metrics.stage("llm"):
+        response = llm.invoke([HumanMessage(content=prompt)])
+    metrics.record_llm_usage(response)
+    result = finalize_response(state, response.content.strip(), has_researched)
+    return {**result, "packing": merge_stats(state.get("packing"), packing)}
+
+@metrics.timed("research")
 def research_node(state: AgentState):
     """Fallback to web search."""
     print(f"🌐 Researching web for: {state['query']}")
     try:
-        results = web_search_tool.invoke(state['query'])
+        results = web_search.search(state['query'])
         # Combine results into one robust chunk
         web_content = "\n".join([f"- {r['content']}" for r in results])
     except Exception as e:
@@ -184,7 +228,18 @@ workflow.add_node("reason", grade_and_generate_node)
 workflow.add_node("research", research_node)
 
 workflow.set_entry_point("retrieve")
-workflow.add_edge("retrieve", "reason")
+
+def route_after_retrieval(state):
+    return "research" if state.get("route") in ("web", "both") else "reason"
+
+workflow.add_conditional_edges(
+    "retrieve",
+    route_after_retrieval,
+    {
+        "reason": "reason",
+        "research": "research"
+    }
+)
 
 def check_sufficiency(state):
     if state["is_sufficient"]:
@@ -203,3 +258,73 @@ workflow.add_conditional_edges(
 workflow.add_edge("research", "reason")
 
 agent_app = workflow.compile()
+
+# Streaming Execution (same retrieve -> reason -> research flow as the graph, token by token)
+INSUFFICIENT_MARKER = "INSUFFICIENT_INFO"
+SOURCES_MARKER = "SOURCES:"
+# The prompt quotes the marker, so the model may wrap it in quotes (or markdown emphasis)
+_MARKER_WRAPPING = " \t\r\n\"'`*\u201c\u2018"
+
+def _displayable_length(text):
+    """Length of streamed text safe to show: stops before a (possibly partial) SOURCES line."""
+    upper = text.upper()
+    idx = upper.find(SOURCES_MARKER)
+    if idx != -1:
+        return idx
+    for k in range(len(SOURCES_MARKER) - 1, 0, -1):
+        if upper.endswith(SOURCES_MARKER[:k]):
+            return len(text) - k
+    return len(text)
+
+def stream_agent(query, filters=None):
+    """
+    Generator of (event, data) pairs for /chat/stream:
+    ("status", {...}) on each stage, ("token", {"text"}) while the answer is generated,
+    ("reset", {}) if streamed text is discarded for a web search, and a final
+    ("final", {"answer", "context_used", "sources", "context_tokens"}) once the answer is settled.
+    """
+    state = {"query": query, "context": [], "response": "", "is_sufficient": False, "filters": filters}
+
+    yield "status", {"stage": "retrieving"}
+    state.update(retrieve_node(state))
+    if route_after_retrieval(state) == "research":
+        yield "status", {"stage": "researching"}
+        state.update(research_node(state))
+
+    while True:
+        prompt, has_researched, packing = build_prompt(state)
+        state["packing"] = merge_stats(state.get("packing"), packing)
+        yield "status", {"stage": "generating"}
+
+        content, sent = "", 0
+        for chunk in metrics.timed_iter(llm.stream([HumanMessage(content=prompt)]), "llm"):
+            metrics.record_llm_usage(chunk)
+            content += chunk.content
+            head = content.lstrip(_MARKER_WRAPPING).upper()
+            # Hold everything back while the answer could still be the INSUFFICIENT_INFO marker
+            if len(head) < len(INSUFFICIENT_MARKER) and INSUFFICIENT_MARKER.startswith(head):
+                continue
+            if INSUFFICIENT_MARKER in content.upper():
+                break  # No point generating the rest
+            end = _displayable_length(content)
+            if end > sent:
+                yield "token", {"text": content[sent:end]}
+                sent = end
+
+        result = finalize_response(state, content.strip(), has_researched)
+        if result["is_sufficient"]:
+            # context_used holds just the cited chunks, in citation order: the sources index into it
+            cited = parse_cited_sources(content)
+            yield "final", {
+                "answer": result["response"],
+                "context_used": result["context"],
+                "sources": list(range(len(result["context"]))) if cited else [],
+                "context_tokens": state["packing"]
+            }
+            return
+
+        if sent:
+            yield "reset", {}
+        yield "status", {"stage": "researching"}
+        state.update(result)
+        state.update(research_node(state))
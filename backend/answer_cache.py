@@ -0,0 +1,180 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+import config
+from lazy_sqlite import LazyConnection
+
+
+_SENTENCE_RE = re.compile(r"[.!?]+(?:\s+|$)")
+_WORD_RE = re.compile(r"\w+(?:[-.:/]\w+)*")
+
+
+def normalize_query(query):
+    """Case/whitespace/trailing-punctuation insensitive key for the exact-match layer."""
+    return re.sub(r"\s+", " ", query).strip().lower().rstrip("?!. ")
+
+
+def query_anchors(query):
+    """
+    The words a near-duplicate question must share to get the same answer: anything with a
+    digit (years, amounts, versions, codes), snake_case names, acronyms and capitalised names
+    (except where only the sentence start is capitalised). Embeddings barely tell
+    "price in 2023" from "price in 2024"; these do.
+    """
+    anchors = set()
+    for sentence in _SENTENCE_RE.split(query):
+        for i, word in enumerate(_WORD_RE.findall(sentence)):
+            if (any(c.isdigit() for c in word) or "_" in word
+                    or (len(word) > 1 and (word.isupper() or (i > 0 and word[0].isupper())))):
+                anchors.add(word.lower())
+    return frozenset(anchors)
+
+
+class WriteMarker:
+    """
+    Count of knowledge-base writes kept in SQLite next to the job queue, so every process
+    sharing that directory (chat and ingest replicas) sees the others' writes.
+    """
+
+    _conn = LazyConnection()
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _create_schema(conn):
+        conn.execute("PRAGMA journal_mode=WAL")  # Lookups never wait on a writer
+        conn.execute("CREATE TABLE IF NOT EXISTS writes (id INTEGER PRIMARY KEY CHECK (id = 0), count INTEGER NOT NULL)")
+        conn.execute("INSERT OR IGNORE INTO writes (id, count) VALUES (0, 0)")
+
+    def bump(self):
+        """Records a write; returns the new count."""
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE writes SET count = count + 1 WHERE id = 0")
+            return self._conn.execute("SELECT count FROM writes WHERE id = 0").fetchone()[0]
+
+    def read(self):
+        with self._lock:
+            return self._conn.execute("SELECT count FROM writes WHERE id = 0").fetchone()[0]
+
+
+class AnswerCache:
+    """
+    Two-layer cache in front of the agent:
+    1. exact match on the normalized query,
+    2. semantic match when a cached query's embedding is within `threshold` cosine similarity
+       and both questions have the same anchors (numbers, codes, names; see query_anchors).
+    LRU + TTL eviction. `invalidate()` drops everything and bumps a generation counter so
+    answers computed against the old knowledge base are never stored afterwards.
+    With a `marker` (WriteMarker), writes made by other processes invalidate it too: every
+    lookup and store compares the shared write count with the last one seen.
+    """
+
+    def __init__(self, max_entries, ttl_seconds, threshold, embed_fn, marker=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.threshold = threshold
+        self._embed_fn = embed_fn
+        self._marker = marker
+        self._seen_writes = None
+        self._entries = OrderedDict()  # normalized query -> {"answer", "embedding", "anchors", "created"}
+        self._lock = threading.Lock()
+        self.generation = 0
+        self.hits = {"exact": 0, "semantic": 0}
+        self.misses = 0
+
+    def _sync(self):
+        """Clears the cache if another process wrote to the knowledge base since the last check."""
+        if self._marker is None:
+            return
+        writes = self._marker.read()
+        with self._lock:
+            if writes != self._seen_writes:
+                self._seen_writes = writes
+                self._entries.clear()
+                self.generation += 1
+
+    def _expired(self, entry, now):
+        return now - entry["created"] > self.ttl_seconds
+
+    def lookup(self, query):
+        """
+        Returns (answer, kind, generation, embedding). `answer` is None on a miss; pass the
+        generation and embedding back to store() so the query is not embedded twice.
+        """
+        self._sync()
+        key = normalize_query(query)
+        now = time.time()
+        with self._lock:
+            generation = self.generation
+            entry = self._entries.get(key)
+            if entry is not None and not self._expired(entry, now):
+                self._entries.move_to_end(key)
+                self.hits["exact"] += 1
+                return entry["answer"], "exact", generation, entry["embedding"]
+
+        embedding = np.asarray(self._embed_fn(query), dtype=np.float32)
+
+        with self._lock:
+            # Drop expired entries, then compare against the rest in one matrix product
+            for k in [k for k, e in self._entries.items() if self._expired(e, now)]:
+                del self._entries[k]
+            anchors = query_anchors(query)
+            keys = [k for k, e in self._entries.items() if e["anchors"] == anchors]
+            if keys:
+                matrix = np.stack([self._entries[k]["embedding"] for k in keys])
+                scores = matrix @ embedding  # embeddings are normalized: dot == cosine
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    self._entries.move_to_end(keys[best])
+                    self.hits["semantic"] += 1
+                    return self._entries[keys[best]]["answer"], "semantic", generation, embedding
+            self.misses += 1
+        return None, None, generation, embedding
+
+    def store(self, query, answer, generation, embedding):
+        self._sync()
+        with self._lock:
+            if generation != self.generation:
+                return  # Knowledge changed while this answer was being computed
+            key = normalize_query(query)
+            self._entries[key] = {"answer": answer, "embedding": embedding, "anchors": query_anchors(query), "created": time.time()}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self):
+        writes = self._marker.bump() if self._marker is not None else None
+        with self._lock:
+            self._seen_writes = writes
+            self._entries.clear()
+            self.generation += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": dict(self.hits),
+                "misses": self.misses,
+                "generation": self.generation,
+                "knowledge_writes": self._seen_writes,
+            }
+
+
+def _embed_query(text):
+    from vector_store import get_embedding_service
+    return get_embedding_service().embed_query(text)
+
+
+answer_cache = AnswerCache(
+    max_entries=config.ANSWER_CACHE_SIZE,
+    ttl_seconds=config.ANSWER_CACHE_TTL,
+    threshold=config.ANSWER_CACHE_SIMILARITY,
+    embed_fn=_embed_query,
+    marker=WriteMarker(config.KNOWLEDGE_WRITES_PATH)
+)
@@ -0,0 +1,80 @@
+"""
+Benchmark: per-chunk add_texts (old /ingest/text loop) vs add_texts_bulk.
+Uses the real BGE model and a scratch Chroma directory; prints chunks/sec.
+
+    cd backend
+    python benchmarks/bench_bulk_ingest.py --chunks 2000 --batch-size 64
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vector_store import create_embeddings, create_vector_store, add_texts_bulk
+
+WORDS = ("omni scribe vector chroma embedding whisper paddle ocr transcript meeting budget "
+         "roadmap latency throughput index query answer source document chunk retrieval").split()
+
+
+def synthetic_corpus(n_chunks, chunk_chars=1000, seed=7):
+    rng = random.Random(seed)
+    chunks = []
+    for i in range(n_chunks):
+        words = []
+        while sum(len(w) + 1 for w in words) < chunk_chars:
+            words.append(rng.choice(WORDS))
+        chunks.append(f"[DOCUMENT - .TXT]: chunk {i} " + " ".join(words))
+    return chunks
+
+
+def run_per_chunk(db, chunks):
+    for i, chunk in enumerate(chunks):
+        db.add_texts(texts=[chunk], metadatas=[{"source": "bench", "chunk": i}])
+
+
+def run_bulk(db, chunks, batch_size, upsert_size):
+    add_texts_bulk(
+        chunks,
+        metadatas=[{"source": "bench", "chunk": i} for i in range(len(chunks))],
+        vector_db=db, batch_size=batch_size, upsert_size=upsert_size
+    )
+
+
+def timed(label, fn, n_chunks):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<12} {n_chunks:>6} chunks  {elapsed:8.2f}s  {n_chunks / elapsed:8.1f} chunks/sec")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--upsert-size", type=int, default=1024)
+    args = parser.parse_args()
+
+    chunks = synthetic_corpus(args.chunks)
+    embeddings = create_embeddings()
+    embeddings.embed_documents(chunks[:8])  # warm up the model outside the timings
+
+    scratch = tempfile.mkdtemp(prefix="omni_bench_")
+    try:
+        before = timed("per-chunk", lambda: run_per_chunk(
+            create_vector_store(os.path.join(scratch, "a"), "bench", embeddings), chunks), len(chunks))
+        after = timed("bulk", lambda: run_bulk(
+            create_vector_store(os.path.join(scratch, "b"), "bench", embeddings), chunks,
+            args.batch_size, args.upsert_size), len(chunks))
+        print(f"speedup      {before / after:.1f}x")
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Benchmark: reduced-precision vector search (float16 / int8 + exact re-scoring) and HNSW ef_search.
+Ground truth is exact float32 search over the same vectors. For each precision and
+re-scoring factor it prints recall@k, p50 latency and the memory held per vector;
+with --hnsw it also builds scratch Chroma collections and sweeps ef_search.
+Embeds a synthetic corpus with the real BGE model, or uses clustered random unit
+vectors with --synthetic (no model needed).
+
+    cd backend
+    python benchmarks/bench_precision.py --chunks 20000 --queries 200 --k 20
+    python benchmarks/bench_precision.py --synthetic --chunks 100000
+    python benchmarks/bench_precision.py --hnsw --ef 10,50,100
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from quantized_index import QuantizedIndex, PRECISIONS
+
+
+def synthetic_vectors(n, dim=384, clusters=50, seed=7):
+    """Unit vectors around random cluster centres (roughly what a topical corpus looks like)."""
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(clusters, dim))
+    vectors = centres[rng.integers(0, clusters, n)] + rng.normal(scale=0.9, size=(n, dim))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def embedded_vectors(n_chunks, n_queries):
+    from bench_retrieval import synthetic_corpus
+    from vector_store import create_embeddings
+
+    embeddings = create_embeddings()
+    chunks, _ = synthetic_corpus(n_chunks)
+    queries, _ = synthetic_corpus(n_queries, seed=13)
+    return (np.asarray(embeddings.embed_documents(chunks), dtype=np.float32),
+            np.asarray(embeddings.embed_documents(queries), dtype=np.float32))
+
+
+def exact_top_k(vectors, queries, k):
+    return [set(np.argsort(-(vectors @ query))[:k]) for query in queries]
+
+
+def report(label, found, truth, latencies, k, extra=""):
+    recall = statistics.mean(len(f & t) / k for f, t in zip(found, truth))
+    print(f"{label:<22} recall@{k} {recall:6.3f}   p50 {statistics.median(latencies):7.2f} ms{extra}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--factors", default="1,2,4,8", help="re-scoring factors to try")
+    parser.add_argument("--synthetic", action="store_true", help="random unit vectors instead of BGE embeddings")
+    parser.add_argument("--hnsw", action="store_true", help="also sweep Chroma's HNSW ef_search")
+    parser.add_argument("--ef", default="10,50,100")
+    parser.add_argument("--m", type=int, default=16)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        vectors = synthetic_vectors(args.chunks)
+        queries = synthetic_vectors(args.queries, seed=13)
+    else:
+        vectors, queries = embedded_vectors(args.chunks, args.queries)
+    ids = [str(i) for i in range(len(vectors))]
+    truth = exact_top_k(vectors, queries, args.k)
+    print(f"{len(vectors)} vectors x {vectors.shape[1]} dims, {len(queries)} queries; float32 = {vectors.shape[1] * 4} B/vector")
+
+    scratch = tempfile.mkdtemp(prefix="omni_precision_")
+    try:
+        for precision in PRECISIONS:
+            index = QuantizedIndex(os.path.join(scratch, f"{precision}.db"), precision)
+            index.upsert(ids, vectors)
+            index.search(queries[0], args.k)  # Loads the codes
+            stats = index.stats()
+            per_vector = stats["bytes_per_vector"]
+            for factor in (int(f) for f in args.factors.split(",")):
+                index.rescore_factor = factor
+                found, latencies = [], []
+                for query in queries:
+                    start = time.perf_counter()
+                    hits = index.search(query, args.k)
+                    latencies.append((time.perf_counter() - start) * 1000)
+                    found.append({int(doc_id) for doc_id, _ in hits})
+                report(f"{precision} x{factor}", found, truth, latencies, args.k, f"   {per_vector:6.0f} B/vector in memory")
+
+        if args.hnsw:
+            from vector_store import get_client
+            client = get_client(os.path.join(scratch, "chroma"))
+            for ef in (int(e) for e in args.ef.split(",")):
+                collection = client.create_collection(
+                    f"bench_ef{ef}", metadata={"hnsw:space": "l2", "hnsw:M": args.m, "hnsw:search_ef": ef}
+                )
+                for start in range(0, len(ids), 5000):
+                    collection.add(ids=ids[start:start + 5000], embeddings=vectors[start:start + 5000].tolist())
+                found, latencies = [], []
+                for query in queries:
+                    start = time.perf_counter()
+                    hits = collection.query(query_embeddings=[query.tolist()], n_results=args.k, include=[])
+                    latencies.append((time.perf_counter() - start) * 1000)
+                    found.append({int(doc_id) for doc_id in hits["ids"][0]})
+                report(f"hnsw M={args.m} ef={ef}", found, truth, latencies, args.k)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Benchmark: vector-only vs BM25 vs hybrid (RRF) vs hybrid + reranker retrieval.
+Builds a synthetic corpus where every chunk carries a unique identifier (error code,
+ticket number) buried in generic text, then asks one paraphrased and one
+identifier-only query per target chunk. Prints recall@k and p50/p95 latency per mode.
+Uses the real BGE model, a scratch Chroma directory and a scratch BM25 index.
+
+    cd backend
+    python benchmarks/bench_retrieval.py --chunks 2000 --queries 200 --k 5
+    python benchmarks/bench_retrieval.py --rerank      # also times the cross-encoder
+"""
+import argparse
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vector_store import create_embeddings, create_vector_store, add_texts_bulk
+from lexical_index import LexicalIndex
+from retrieval import hybrid_search
+
+TOPICS = {
+    "billing": "invoice payment refund charge subscription card declined receipt",
+    "network": "timeout connection gateway proxy latency packet socket dns",
+    "storage": "disk volume quota backup snapshot replica mount filesystem",
+    "auth": "login password token session expired permission role denied",
+    "audio": "microphone transcript recording whisper meeting speaker noise",
+}
+FILLER = "the system reported an issue while the team reviewed the logs and notes for the weekly meeting".split()
+
+
+def synthetic_corpus(n_chunks, seed=7):
+    rng = random.Random(seed)
+    chunks, facts = [], []
+    for i in range(n_chunks):
+        topic = rng.choice(list(TOPICS))
+        code = f"{topic[:3].upper()}-{rng.randint(1000, 9999)}-{i}"
+        words = [rng.choice(FILLER) for _ in range(60)] + rng.sample(TOPICS[topic].split(), 4)
+        rng.shuffle(words)
+        words.insert(rng.randint(0, len(words)), f"error {code}")
+        chunks.append(" ".join(words))
+        facts.append((topic, code))
+    return chunks, facts
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def evaluate(label, search, queries, k):
+    hits, latencies = 0, []
+    for query, target in queries:
+        start = time.perf_counter()
+        ids = search(query, k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits += target in ids
+    print(f"{label:<14} recall@{k} {hits / len(queries):6.3f}   p50 {statistics.median(latencies):7.1f} ms   "
+          f"p95 {percentile(latencies, 95):7.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--candidates", type=int, default=20)
+    parser.add_argument("--rerank", action="store_true", help="also run hybrid + cross-encoder (needs RERANKER_MODEL_PATH)")
+    args = parser.parse_args()
+
+    chunks, facts = synthetic_corpus(args.chunks)
+    ids = [f"chunk-{i}" for i in range(len(chunks))]
+    rng = random.Random(11)
+    targets = rng.sample(range(len(chunks)), min(args.queries, len(chunks)))
+    queries = []
+    for i in targets:
+        topic, code = facts[i]
+        queries.append((f"what does {code} mean for {topic}", ids[i]))
+        queries.append((code, ids[i]))
+
+    scratch = tempfile.mkdtemp(prefix="omni_bench_")
+    try:
+        embeddings = create_embeddings()
+        db = create_vector_store(os.path.join(scratch, "chroma"), "bench", embeddings)
+        lexical = LexicalIndex(os.path.join(scratch, "lexical.db"))
+        start = time.perf_counter()
+        add_texts_bulk(chunks, metadatas=[{"source": "bench"} for _ in chunks], ids=ids,
+                       vector_db=db, lexical_index=lexical)
+        print(f"indexed {len(chunks)} chunks in {time.perf_counter() - start:.1f}s, {len(queries)} queries\n")
+
+        evaluate("vector", lambda q, k: [
+            doc_id for doc_id in db._collection.query(
+                query_embeddings=[embeddings.embed_query(q)], n_results=k, include=[])["ids"][0]
+        ], queries, args.k)
+        evaluate("bm25", lambda q, k: [doc_id for doc_id, _ in lexical.search(q, k)], queries, args.k)
+        evaluate("hybrid", lambda q, k: [
+            doc.id for doc, _ in hybrid_search(q, k, db, lexical, args.candidates, rerank=False)
+        ], queries, args.k)
+        if args.rerank:
+            evaluate("hybrid+rerank", lambda q, k: [
+                doc.id for doc, _ in hybrid_search(q, k, db, lexical, args.candidates, rerank=True)
+            ], queries, args.k)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
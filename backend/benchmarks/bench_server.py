@@ -0,0 +1,46 @@
+"""
+The backend as load_test.py runs it: main.app under uvicorn with StubWhisper/StubOCR in
+place of the models and web research pointed at the fake Tavily endpoint. Embeddings
+(BGE) and Chroma are real. Paths, OLLAMA_BASE_URL and cache settings come from the
+environment that load_test.py sets up.
+
+    python benchmarks/bench_server.py --port 8765 --services http://127.0.0.1:9000
+"""
+import argparse
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from fakes import StubWhisper, StubOCR, http_search_provider
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--services", required=True, help="URL of the fake Ollama/Tavily server")
+    parser.add_argument("--whisper-rtf", type=float, default=0.02)
+    parser.add_argument("--ocr-ms", type=float, default=30)
+    args = parser.parse_args()
+
+    import uvicorn
+    import main as backend
+    from ingestion import ingestion_engine
+    from web_search import set_provider
+
+    def load_whisper():
+        ingestion_engine._whisper_executor = ThreadPoolExecutor(1, thread_name_prefix="whisper")
+        return StubWhisper(args.whisper_rtf)
+
+    ingestion_engine._load_whisper = load_whisper
+    ingestion_engine._load_ocr = lambda: StubOCR(args.ocr_ms)
+    set_provider(http_search_provider(args.services))
+
+    uvicorn.run(backend.app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Benchmark: backend cold start.
+Each scenario runs in a fresh interpreter and reports how long `import main` takes
+(the time before uvicorn can accept requests) and, for the eager scenario, how long
+loading every model up front takes (what the old module-level initialisation cost).
+
+    cd backend
+    python benchmarks/bench_startup.py --repeat 3
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import time
+t0 = time.perf_counter()
+import main
+t1 = time.perf_counter()
+if {eager}:
+    main._warm_up_models()
+t2 = time.perf_counter()
+print(f"{{t1 - t0:.3f}} {{t2 - t0:.3f}}")
+"""
+
+SCENARIOS = [
+    # name, role, eager
+    ("lazy (all roles)", "all", False),
+    ("lazy (chat-only)", "chat", False),
+    ("lazy (ingest-only)", "ingest", False),
+    ("eager (all models)", "all", True),
+]
+
+
+def run_probe(role, eager):
+    env = dict(os.environ, OMNISCRIBE_ROLE=role, WARMUP_ON_STARTUP="false")
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE.format(eager=eager)],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    import_s, ready_s = out.stdout.strip().splitlines()[-1].split()
+    return float(import_s), float(ready_s)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'scenario':<22} {'import main (s)':>16} {'ready (s)':>10}")
+    for name, role, eager in SCENARIOS:
+        runs = [run_probe(role, eager) for _ in range(args.repeat)]
+        import_s = statistics.median(r[0] for r in runs)
+        ready_s = statistics.median(r[1] for r in runs)
+        print(f"{name:<22} {import_s:>16.2f} {ready_s:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Benchmark: audio transcription speed as real-time factor (RTF = wall time / audio length;
+below 1.0 is faster than real time). Each profile runs in a fresh interpreter because the
+worker count and thread split are fixed when Whisper is loaded. Model load time is
+excluded.
+
+    cd backend
+    python benchmarks/bench_transcribe.py path/to/recording.wav --workers 1 2 4 --beam 5 1
+"""
+import argparse
+import itertools
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import time
+from ingestion import ingestion_engine
+ingestion_engine.whisper
+t0 = time.perf_counter()
+segments, duration = ingestion_engine.transcribe_segments({path!r})
+n = sum(1 for _ in segments)
+print(f"{{time.perf_counter() - t0:.3f}} {{duration:.3f}} {{n}}")
+"""
+
+
+def run_probe(path, workers, beam, vad):
+    env = dict(
+        os.environ,
+        WHISPER_WORKERS=str(workers),
+        WHISPER_BEAM_SIZE=str(beam),
+        WHISPER_VAD_FILTER=str(vad).lower(),
+    )
+    env.pop("WHISPER_CPU_THREADS", None)  # let config split the cores across workers
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE.format(path=os.path.abspath(path))],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    wall_s, duration_s, segments = out.stdout.strip().splitlines()[-1].split()
+    return float(wall_s), float(duration_s), int(segments)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("audio")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() // 2 or 1])
+    parser.add_argument("--beam", type=int, nargs="+", default=[5, 1])
+    parser.add_argument("--vad", choices=["on", "off", "both"], default="on")
+    args = parser.parse_args()
+
+    vad_modes = {"on": [True], "off": [False], "both": [True, False]}[args.vad]
+
+    print(f"{'workers':>7} {'beam':>4} {'vad':>4} {'audio (s)':>10} {'wall (s)':>9} {'RTF':>6} {'segments':>9}")
+    for workers, beam, vad in itertools.product(args.workers, args.beam, vad_modes):
+        wall_s, duration_s, segments = run_probe(args.audio, workers, beam, vad)
+        rtf = wall_s / duration_s if duration_s else float("nan")
+        print(f"{workers:>7} {beam:>4} {'on' if vad else 'off':>4} {duration_s:>10.1f} {wall_s:>9.2f} {rtf:>6.3f} {segments:>9}")
+
+
+if __name__ == "__main__":
+    main()
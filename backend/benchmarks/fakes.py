@@ -0,0 +1,213 @@
+"""
+Deterministic stand-ins for the load test (benchmarks/load_test.py).
+FakeServiceServer answers the Ollama chat API and a Tavily-style /search on one local
+port; StubWhisper and StubOCR replace the models inside the backend (see bench_server.py).
+Answers, transcripts and OCR text depend only on their input, so runs are repeatable.
+"""
+import io
+import json
+import random
+import re
+import struct
+import threading
+import time
+import wave
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+TOPICS = {
+    "billing": "The invoice {code} was refunded after the card was declined twice during renewal.",
+    "network": "Gateway timeouts on {code} were traced to a proxy with a stale DNS entry.",
+    "storage": "Volume {code} ran out of quota, so the nightly snapshot failed and was retried.",
+    "auth": "Sessions for {code} expired early because the token clock was skewed by five minutes.",
+    "audio": "The meeting recording {code} had speaker noise that the transcript marked as inaudible.",
+}
+OFF_TOPIC = ["latest stable linux kernel version", "population of iceland", "boiling point of water on everest"]
+
+
+# Ollama + Tavily
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _json(self, body, status=200):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            return self._json({"models": [{"name": "llama3.1", "model": "llama3.1"}]})
+        if self.path == "/api/version":
+            return self._json({"version": "0.0.0-fake"})
+        self._json({"error": "not found"}, 404)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if self.path == "/api/chat":
+            return self._chat(body)
+        if self.path == "/search":
+            time.sleep(self.server.search_ms / 1000)
+            return self._json({"results": fake_search_results(body.get("query", ""))})
+        self._json({"error": "not found"}, 404)
+
+    def _chat(self, body):
+        prompt = body["messages"][-1]["content"]
+        tokens = fake_answer_tokens(prompt)
+        model = body.get("model", "fake")
+
+        def message(content, done, **extra):
+            return {"model": model, "created_at": "2024-01-01T00:00:00Z",
+                    "message": {"role": "assistant", "content": content}, "done": done, **extra}
+
+        final = message("", True, done_reason="stop", total_duration=0, load_duration=0,
+                        prompt_eval_count=len(prompt) // 4, prompt_eval_duration=0,
+                        eval_count=len(tokens), eval_duration=0)
+        time.sleep(self.server.prefill_ms / 1000)
+        if not body.get("stream", True):
+            time.sleep(self.server.token_ms * len(tokens) / 1000)
+            final["message"]["content"] = "".join(tokens)
+            return self._json(final)
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        for token in tokens:
+            time.sleep(self.server.token_ms / 1000)
+            self.wfile.write((json.dumps(message(token, False)) + "\n").encode("utf-8"))
+            self.wfile.flush()
+        self.wfile.write((json.dumps(final) + "\n").encode("utf-8"))
+
+
+class FakeServiceServer:
+    """Ollama (/api/chat, /api/tags) and Tavily-style (/search) on 127.0.0.1, in a background thread."""
+
+    def __init__(self, port=0, prefill_ms=50, token_ms=5, search_ms=300):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.prefill_ms = prefill_ms
+        self.httpd.token_ms = token_ms
+        self.httpd.search_ms = search_ms
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="fake-services", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def fake_answer_tokens(prompt):
+    """INSUFFICIENT_INFO without context, else a short answer citing the first source, in word tokens."""
+    context = prompt.split("USER QUESTION:")[0]
+    sources = re.findall(r"\[Source (\d+)\] (.{0,200})", context)
+    if not sources:
+        return ["INSUFF", "ICIENT", "_INFO"]
+    index, text = sources[0]
+    words = text.split()[:16]
+    answer = "According to the notes, " + " ".join(words) + f".\nSOURCES: [{index}]"
+    return re.findall(r"\S+\s*|\s+", answer)
+
+
+def fake_search_results(query):
+    seed = zlib.crc32(query.lower().encode("utf-8"))
+    return [{"url": f"https://example.com/{seed % 1000}/{i}", "content": f"Result {i} about {query} (ref {seed % 97})."}
+            for i in range(3)]
+
+
+def http_search_provider(base_url, timeout=10):
+    """web_search provider that calls the fake Tavily endpoint over HTTP."""
+    import requests
+
+    def search(query):
+        response = requests.post(f"{base_url}/search", json={"query": query}, timeout=timeout)
+        response.raise_for_status()
+        return response.json()["results"]
+    return search
+
+
+# Model stand-ins
+class StubWhisper:
+    """faster-whisper's transcribe(): one 5 s segment at a time, `rtf` x audio length of sleep."""
+
+    def __init__(self, rtf=0.02):
+        self.rtf = rtf
+
+    def transcribe(self, audio, beam_size=5, vad_filter=False, **kwargs):
+        with wave.open(audio, "rb") as wav:
+            duration = wav.getnframes() / wav.getframerate()
+        tag = zlib.crc32(str(audio).encode("utf-8")) % 10000
+
+        def segments():
+            start = 0.0
+            while start < duration:
+                end = min(start + 5.0, duration)
+                time.sleep((end - start) * self.rtf)
+                yield SimpleNamespace(start=start, end=end, text=f" Segment {int(start // 5)} of recording {tag} about the quarterly roadmap.")
+                start = end
+        return segments(), SimpleNamespace(duration=duration)
+
+
+class StubOCR:
+    """PaddleOCR's ocr(): two text lines derived from the decoded image, after `ms` of sleep."""
+
+    def __init__(self, ms=30):
+        self.ms = ms
+
+    def ocr(self, image, cls=True):
+        time.sleep(self.ms / 1000)
+        height, width = image.shape[:2]
+        checksum = int(image[::16, ::16].sum()) % 100000
+        box = [[0, 0], [width, 0], [width, 20], [0, 20]]
+        return [[
+            [box, (f"Scanned receipt {checksum} total {height * width % 997} EUR", 0.99)],
+            [box, (f"Size {width}x{height} approved by finance", 0.98)],
+        ]]
+
+
+# Synthetic uploads
+def make_wav(seconds, seed):
+    """16 kHz mono 16-bit noise (unique per seed, so content-hash caches never hit)."""
+    rng = random.Random(seed)
+    frames = bytes(rng.getrandbits(8) for _ in range(64)) * (seconds * 16000 * 2 // 64)
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(16000)
+        wav.writeframes(frames)
+    return buffer.getvalue()
+
+
+def make_png(width, height, seed):
+    """Grayscale PNG with a seeded pattern, written with zlib only."""
+    rng = random.Random(seed)
+    row_bytes = bytes(rng.getrandbits(8) for _ in range(width))
+    raw = b"".join(b"\x00" + row_bytes[y % 7:] + row_bytes[:y % 7] for y in range(height))
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(raw)) + chunk(b"IEND", b""))
+
+
+def make_document(seed, paragraphs=12):
+    """Plain-text notes built from TOPICS; returns (text, [(topic, code)])."""
+    rng = random.Random(seed)
+    facts, lines = [], []
+    for _ in range(paragraphs):
+        topic = rng.choice(sorted(TOPICS))
+        code = f"{topic[:3].upper()}-{rng.randint(1000, 9999)}"
+        facts.append((topic, code))
+        lines.append(TOPICS[topic].format(code=code) + " " + " ".join(
+            rng.choice(["Follow-up is scheduled.", "Owner notified.", "See the weekly notes.", "No customer impact."])
+            for _ in range(3)))
+    return "\n\n".join(lines), facts
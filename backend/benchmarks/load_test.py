@@ -0,0 +1,395 @@
+"""
+Offline load test: drives the real FastAPI app (benchmarks/bench_server.py) with a
+seeded mix of chat and ingest traffic. Ollama and Tavily are replaced by a local fake
+HTTP server and Whisper/PaddleOCR by stub engines (benchmarks/fakes.py); BGE embeddings
+and Chroma are real and live in a scratch directory. Reports p50/p95/p99 latency,
+throughput and peak RSS per endpoint (plus end-to-end job latency and mean time per
+stage from /metrics) and writes everything to JSON so runs can be compared.
+
+    cd backend
+    python benchmarks/load_test.py --requests 300 --concurrency 8 --mix chat=50,stream=10,audio=10,image=15,text=15
+    python benchmarks/load_test.py --out after.json --compare before.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from fakes import FakeServiceServer, OFF_TOPIC, make_document, make_png, make_wav
+
+ENDPOINTS = {
+    "chat": "/chat",
+    "stream": "/chat/stream",
+    "audio": "/ingest/audio",
+    "image": "/ingest/image",
+    "text": "/ingest/text",
+}
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))], 1)
+
+
+def summarize(latencies):
+    return {
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "mean_ms": round(sum(latencies) / len(latencies), 1) if latencies else None,
+        "max_ms": round(max(latencies), 1) if latencies else None,
+    }
+
+
+def read_rss(pid):
+    """Resident set size of `pid` in bytes (psutil if installed, else /proc), or None."""
+    try:
+        import psutil
+        return psutil.Process(pid).memory_info().rss
+    except ImportError:
+        pass
+    except Exception:
+        return None
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+
+
+class RssSampler(threading.Thread):
+    """Samples the server's RSS every `interval` seconds: [(monotonic time, bytes)]."""
+
+    def __init__(self, pid, interval=0.1):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.samples = []
+        self._finished = threading.Event()
+
+    def run(self):
+        while not self._finished.is_set():
+            rss = read_rss(self.pid)
+            if rss is not None:
+                self.samples.append((time.monotonic(), rss))
+            self._finished.wait(self.interval)
+
+    def stop(self):
+        self._finished.set()
+        self.join()
+
+    def peak_mb(self, intervals=None):
+        """Peak RSS overall, or over the samples taken while any of `intervals` was in flight."""
+        # A request shorter than the sampling interval still gets the next sample
+        values = [rss for t, rss in self.samples
+                  if intervals is None or any(start <= t <= end + self.interval for start, end in intervals)]
+        return round(max(values) / 2**20, 1) if values else None
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, weight = part.split("=")
+        if name not in ENDPOINTS:
+            raise SystemExit(f"Unknown endpoint '{name}' in --mix (use {', '.join(ENDPOINTS)})")
+        mix[name] = float(weight)
+    return mix
+
+
+def build_plan(args, facts):
+    """The request list, fixed by --seed: (kind, payload) with payloads generated up front."""
+    rng = random.Random(args.seed)
+    mix = parse_mix(args.mix)
+    kinds = rng.choices(list(mix), weights=list(mix.values()), k=args.requests)
+    plan = []
+    for i, kind in enumerate(kinds):
+        if kind in ("chat", "stream"):
+            if rng.random() < args.off_topic:
+                query = rng.choice(OFF_TOPIC)
+            else:
+                topic, code = rng.choice(facts)
+                query = f"What happened with {code} in {topic}?"
+            plan.append((kind, {"data": {"query": query}}))
+        elif kind == "audio":
+            plan.append((kind, {"files": {"file": (f"call_{i}.wav", make_wav(args.audio_seconds, 10_000 + i), "audio/wav")}}))
+        elif kind == "image":
+            plan.append((kind, {"files": {"file": (f"scan_{i}.png", make_png(640, 480, 20_000 + i), "image/png")}}))
+        else:
+            text, _ = make_document(30_000 + i)
+            plan.append((kind, {"files": {"file": (f"notes_{i}.txt", text.encode("utf-8"), "text/plain")}}))
+    return plan
+
+
+class Client:
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self._local = threading.local()
+
+    @property
+    def session(self):
+        if not hasattr(self._local, "session"):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def send(self, kind, payload):
+        """One request: {kind, status, start, end, latency_ms, [ttft_ms], [job_id], [error]}."""
+        record = {"kind": kind, "start": time.monotonic()}
+        try:
+            response = self.session.post(self.base_url + ENDPOINTS[kind], timeout=600, stream=kind == "stream", **payload)
+            record["status"] = response.status_code
+            if kind == "stream" and response.ok:
+                for line in response.iter_lines(decode_unicode=True):
+                    if line.startswith("event: token") and "ttft_ms" not in record:
+                        record["ttft_ms"] = (time.monotonic() - record["start"]) * 1000
+                    if line.startswith("event: final") or line.startswith("event: error"):
+                        record["status"] = 200 if "final" in line else 500
+            elif response.status_code == 202:
+                record["job_id"] = response.json()["job_id"]
+            else:
+                response.content
+        except requests.RequestException as e:
+            record["status"] = None
+            record["error"] = str(e)
+        record["end"] = time.monotonic()
+        record["latency_ms"] = (record["end"] - record["start"]) * 1000
+        return record
+
+    def wait_for_jobs(self, job_ids, timeout=1800):
+        """Polls until every job finished; returns their job records."""
+        pending, done = set(job_ids), {}
+        deadline = time.monotonic() + timeout
+        while pending and time.monotonic() < deadline:
+            for job_id in list(pending):
+                job = self.session.get(f"{self.base_url}/jobs/{job_id}", timeout=30).json()
+                if job["status"] in ("succeeded", "failed"):
+                    done[job_id] = job
+                    pending.discard(job_id)
+            if pending:
+                time.sleep(0.25)
+        return done
+
+    def stage_means(self):
+        """Mean milliseconds and count per stage from /metrics (omniscribe_stage_seconds)."""
+        text = self.session.get(self.base_url + "/metrics", timeout=30).text
+        sums, counts = {}, {}
+        for name, stage, value in re.findall(r'omniscribe_stage_seconds_(sum|count)\{stage="([^"]+)"\} (\S+)', text):
+            (sums if name == "sum" else counts)[stage] = float(value)
+        return {stage: {"count": int(counts[stage]), "mean_ms": round(sums[stage] / counts[stage] * 1000, 1)}
+                for stage in sorted(counts) if counts[stage]}
+
+
+def start_server(args, services_url, data_dir):
+    env = dict(
+        os.environ,
+        OMNISCRIBE_BACKEND_DIR=data_dir,
+        OLLAMA_BASE_URL=services_url,
+        WEB_SEARCH_PROVIDER="stub",
+        WHISPER_WORKERS="1",
+        PYTHONUNBUFFERED="1",
+        PYTHONIOENCODING="utf-8",
+    )
+    if not args.caches:
+        env.update(ANSWER_CACHE_ENABLED="false", MEDIA_CACHE_ENABLED="false")
+    log = open(os.path.join(data_dir, "server.log"), "w", encoding="utf-8")
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(BENCH_DIR, "bench_server.py"), "--port", str(args.port), "--services", services_url,
+         "--whisper-rtf", str(args.whisper_rtf), "--ocr-ms", str(args.ocr_ms)],
+        cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT
+    )
+    log.close()  # The server holds its own handle
+    base_url = f"http://127.0.0.1:{args.port}"
+    deadline = time.monotonic() + 300
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"Backend exited during startup, see {log.name}")
+        try:
+            if requests.get(base_url + "/", timeout=2).ok:
+                return process, base_url
+        except requests.RequestException:
+            time.sleep(0.5)
+    process.terminate()
+    raise SystemExit("Backend did not start within 300s")
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    data_dir = tempfile.mkdtemp(prefix="omni_load_")
+    with FakeServiceServer(prefill_ms=args.llm_prefill_ms, token_ms=args.llm_token_ms, search_ms=args.search_ms) as services:
+        process, base_url = start_server(args, services.url, data_dir)
+        sampler = RssSampler(process.pid)
+        sampler.start()
+        client = Client(base_url)
+        try:
+            # Seed the knowledge base (also loads BGE) so chat queries have something to find
+            seed_start = time.monotonic()
+            facts, seed_jobs = [], []
+            for i in range(args.seed_docs):
+                text, doc_facts = make_document(i)
+                facts.extend(doc_facts)
+                record = client.send("text", {"files": {"file": (f"seed_{i}.txt", text.encode("utf-8"), "text/plain")}})
+                seed_jobs.append(record["job_id"])
+            client.wait_for_jobs(seed_jobs)
+            client.send("chat", {"data": {"query": "warm-up"}})
+            seed_seconds = time.monotonic() - seed_start
+            print(f"seeded {args.seed_docs} documents in {seed_seconds:.1f}s, running {args.requests} requests "
+                  f"at concurrency {args.concurrency}...")
+
+            plan = build_plan(args, facts)
+            started = time.monotonic()
+            with ThreadPoolExecutor(args.concurrency) as pool:
+                records = list(pool.map(lambda item: client.send(*item), plan))
+            wall = time.monotonic() - started
+            jobs = client.wait_for_jobs([r["job_id"] for r in records if "job_id" in r])
+            drained = time.monotonic() - started
+            stages = client.stage_means()
+        finally:
+            sampler.stop()
+            process.terminate()
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    if args.keep_data:
+        print(f"data kept in {data_dir}")
+    else:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    endpoints = {}
+    for kind in ENDPOINTS:
+        mine = [r for r in records if r["kind"] == kind]
+        if not mine:
+            continue
+        ok = [r for r in mine if r.get("status") is not None and r["status"] < 400]
+        statuses = {}
+        for r in mine:
+            statuses[str(r.get("status"))] = statuses.get(str(r.get("status")), 0) + 1
+        entry = {
+            "path": ENDPOINTS[kind],
+            "requests": len(mine),
+            "errors": len(mine) - len(ok),
+            "statuses": statuses,
+            **summarize([r["latency_ms"] for r in ok]),
+            "throughput_rps": round(len(ok) / wall, 2),
+            "peak_rss_mb": sampler.peak_mb([(r["start"], r["end"]) for r in mine]),
+        }
+        if kind == "stream":
+            entry["ttft"] = summarize([r["ttft_ms"] for r in ok if "ttft_ms" in r])
+        job_records = [jobs[r["job_id"]] for r in mine if r.get("job_id") in jobs]
+        if job_records:
+            # Upload accepted -> indexed, from the job's own timestamps
+            entry["job"] = {
+                "finished": len(job_records),
+                "failed": sum(job["status"] == "failed" for job in job_records),
+                **summarize([(job["finished_at"] - job["created_at"]) * 1000 for job in job_records if job["finished_at"]]),
+            }
+        endpoints[kind] = entry
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": vars(args),
+        },
+        "summary": {
+            "requests": len(records),
+            "wall_seconds": round(wall, 2),
+            "drain_seconds": round(drained, 2),
+            "throughput_rps": round(len(records) / wall, 2),
+            "seed_seconds": round(seed_seconds, 2),
+            "peak_rss_mb": sampler.peak_mb(),
+        },
+        "endpoints": endpoints,
+        "stages": stages,
+    }
+
+
+def _cell(value, width, digits=1):
+    return f"{'-':>{width}}" if value is None else f"{value:>{width}.{digits}f}"
+
+
+def print_report(results, baseline=None):
+    summary = results["summary"]
+    print(f"\n{summary['requests']} requests in {summary['wall_seconds']}s ({summary['throughput_rps']} req/s), "
+          f"jobs drained after {summary['drain_seconds']}s, peak RSS {summary['peak_rss_mb']} MB\n")
+    print(f"{'endpoint':<16}{'n':>5}{'err':>5}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>8}{'RSS MB':>9}"
+          f"{'job p95 ms':>12}" + (f"{'Δp95':>9}" if baseline else ""))
+    for kind, e in results["endpoints"].items():
+        line = (f"{e['path']:<16}{e['requests']:>5}{e['errors']:>5}{_cell(e['p50_ms'], 10)}{_cell(e['p95_ms'], 10)}"
+                f"{_cell(e['p99_ms'], 10)}{_cell(e['throughput_rps'], 8, 2)}{_cell(e['peak_rss_mb'], 9)}"
+                f"{_cell((e.get('job') or {}).get('p95_ms'), 12)}")
+        old = (baseline or {}).get("endpoints", {}).get(kind)
+        if old and old.get("p95_ms") and e["p95_ms"]:
+            line += f"{(e['p95_ms'] - old['p95_ms']) / old['p95_ms'] * 100:>+8.1f}%"
+        print(line)
+    if "stream" in results["endpoints"] and results["endpoints"]["stream"]["ttft"]["p50_ms"] is not None:
+        ttft = results["endpoints"]["stream"]["ttft"]
+        print(f"\n/chat/stream time to first token: p50 {ttft['p50_ms']} ms, p95 {ttft['p95_ms']} ms")
+    if results["stages"]:
+        print("\nmean ms per stage: " + ", ".join(f"{stage} {s['mean_ms']}" for stage, s in results["stages"].items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--mix", default="chat=50,stream=10,audio=10,image=15,text=15",
+                        help="relative weights per endpoint: " + ", ".join(ENDPOINTS))
+    parser.add_argument("--seed", type=int, default=7, help="fixes the request mix and payloads")
+    parser.add_argument("--seed-docs", type=int, default=20, help="documents ingested before the run")
+    parser.add_argument("--off-topic", type=float, default=0.2, help="share of chat queries that need web research")
+    parser.add_argument("--audio-seconds", type=int, default=30)
+    parser.add_argument("--llm-prefill-ms", type=float, default=50)
+    parser.add_argument("--llm-token-ms", type=float, default=5)
+    parser.add_argument("--search-ms", type=float, default=300)
+    parser.add_argument("--whisper-rtf", type=float, default=0.02, help="stub Whisper seconds per audio second")
+    parser.add_argument("--ocr-ms", type=float, default=30)
+    parser.add_argument("--caches", action="store_true", help="keep the answer and media caches on")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--out", default="load_test_results.json")
+    parser.add_argument("--compare", help="earlier results JSON to show p95 changes against")
+    parser.add_argument("--keep-data", action="store_true", help="keep the scratch data dir (server.log, Chroma)")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    results = run(args)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print_report(results, baseline)
+    print(f"\nresults written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Single chunking pipeline for every ingest path.
+Documents are consumed as a stream of (page, text) units and cut into token-aware,
+overlapping chunks at sentence boundaries. Like documents.py this module stays light
+enough to run inside the parse process pool.
+"""
+import functools
+import math
+import os
+import re
+
+import config
+from documents import iter_document_units
+
+# A sentence ends at . ! ? followed by whitespace, or at a line break
+SENTENCE_RE = re.compile(r"\S[^\n]*?(?:[.!?](?=\s|$)|$)", re.M)
+_APPROX_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+
+@functools.lru_cache(maxsize=1)
+def _load_tokenizer():
+    # The BGE tokenizer.json ships with the embedding model; loaded once per process
+    try:
+        from tokenizers import Tokenizer
+        return Tokenizer.from_file(os.path.join(config.EMBEDDING_MODEL_PATH, "tokenizer.json"))
+    except Exception:
+        return None
+
+
+def count_tokens(text):
+    """Token count under the embedding model's tokenizer (word-piece estimate as fallback)."""
+    tokenizer = _load_tokenizer()
+    if tokenizer is not None:
+        return len(tokenizer.encode(text, add_special_tokens=False).ids)
+    return math.ceil(len(_APPROX_TOKEN_RE.findall(text)) * 1.3)
+
+
+def _split_long_sentence(sentence, start, max_tokens, n_tokens):
+    """Cuts a sentence that alone exceeds the budget into word-aligned pieces."""
+    words = list(re.finditer(r"\S+", sentence))
+    per_piece = max(1, int(len(words) * max_tokens / n_tokens))
+    for i in range(0, len(words), per_piece):
+        group = words[i:i + per_piece]
+        s, e = group[0].start(), group[-1].end()
+        yield sentence[s:e], start + s
+
+
+def _make_chunk(window):
+    pages = [s["page"] for s in window if s["page"] is not None]
+    chunk = {
+        "text": " ".join(s["text"] for s in window),
+        "tokens": sum(s["tokens"] for s in window),
+        "char_start": window[0]["start"],
+        "char_end": window[-1]["end"],
+    }
+    if pages:
+        chunk["page_start"] = min(pages)
+        chunk["page_end"] = max(pages)
+    return chunk
+
+
+def iter_chunks(units, max_tokens=None, overlap_tokens=None, count=count_tokens):
+    """
+    Generator: turns (page, text) units into chunks of at most `max_tokens` tokens, each
+    starting with up to `overlap_tokens` tokens of the previous chunk's tail sentences.
+    Chunks carry token count, char offsets into the extracted text and PDF page span.
+    Only the current window of sentences is held in memory.
+    """
+    max_tokens = max_tokens or config.CHUNK_MAX_TOKENS
+    overlap_tokens = min(config.CHUNK_OVERLAP_TOKENS if overlap_tokens is None else overlap_tokens, max_tokens // 2)
+
+    window = []
+    window_tokens = 0
+    fresh = 0  # sentences in the window not yet emitted in any chunk
+    offset = 0
+
+    for page, text in units:
+        for match in SENTENCE_RE.finditer(text):
+            sentence = match.group()
+            start = offset + match.start()
+            n = count(sentence)
+            pieces = [(sentence, start)] if n <= max_tokens else _split_long_sentence(sentence, start, max_tokens, n)
+
+            for piece, piece_start in pieces:
+                piece_tokens = n if piece is sentence else count(piece)
+
+                if window and window_tokens + piece_tokens > max_tokens:
+                    if fresh:
+                        yield _make_chunk(window)
+                    # Carry the tail sentences over as overlap
+                    tail, tail_tokens = [], 0
+                    for s in reversed(window):
+                        if tail_tokens + s["tokens"] > overlap_tokens:
+                            break
+                        tail.insert(0, s)
+                        tail_tokens += s["tokens"]
+                    window, window_tokens, fresh = tail, tail_tokens, 0
+                    while window and window_tokens + piece_tokens > max_tokens:
+                        window_tokens -= window.pop(0)["tokens"]
+
+                window.append({
+                    "text": piece, "tokens": piece_tokens, "page": page,
+                    "start": piece_start, "end": piece_start + len(piece)
+                })
+                window_tokens += piece_tokens
+                fresh += 1
+
+        offset += len(text) + 1
+
+    if window and fresh:
+        yield _make_chunk(window)
+
+
+def chunk_document(filepath, file_ext, page_texts=None):
+    """
+    Parses and chunks one document on disk (runs on the parse pool).
+    Returns (chunks, scanned_pages): the PDF pages that had no text layer and need OCR.
+    `page_texts` supplies the OCR text for those pages on the second pass.
+    """
+    scanned_pages = []
+    units = iter_document_units(filepath, file_ext, page_texts=page_texts, scanned_pages=scanned_pages)
+    return list(iter_chunks(units)), scanned_pages
+
+
+def chunk_text(text):
+    """Chunks an already extracted text (transcripts, OCR output)."""
+    return list(iter_chunks([(None, text)]))
+
+
+def directory_fields(path):
+    """
+    {"dir_<depth>": directory} for every directory above `path`, dir_1 being the root. Stored
+    on knowledge-folder chunks so a path prefix is one equality match (Chroma has no prefix operator).
+    """
+    dirs, parent = [], os.path.dirname(os.path.normpath(path))
+    while True:
+        dirs.append(parent)
+        if os.path.dirname(parent) == parent:
+            break
+        parent = os.path.dirname(parent)
+    return {f"dir_{depth}": directory for depth, directory in enumerate(reversed(dirs), 1)}
+
+
+def directory_filter(prefix):
+    """Chroma `where` clause for knowledge-folder chunks under the directory `prefix` (or that file itself)."""
+    prefix = os.path.normpath(prefix)
+    depth = len(directory_fields(os.path.join(prefix, "_")))
+    return {"$or": [{f"dir_{depth}": prefix}, {"path": prefix}]}
+
+
+def chunk_metadata(chunk, index, **base):
+    """Chroma metadata for one chunk: `base` fields plus position info (no None values)."""
+    meta = dict(base, chunk=index, tokens=chunk["tokens"],
+                char_start=chunk["char_start"], char_end=chunk["char_end"])
+    if "page_start" in chunk:
+        meta["page_start"] = chunk["page_start"]
+        meta["page_end"] = chunk["page_end"]
+    return meta
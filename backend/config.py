@@ -27,6 +27,7 @@ OCR_MODEL_DIR = os.path.join(MODELS_DIR, "paddleocr")
 # Database Paths
 VECTOR_DB_PATH = os.path.join(BACKEND_DIR, "chroma_db")
 COLLECTION_NAME = "omni_knowledge"
+CORRECTIONS_COLLECTION = "omni_corrections"
 
 # LLM Settings (Ollama - configurable for Docker networking)
 LLM_MODEL_NAME = os.getenv("LLM_MODEL_NAME", "llama3.1:8b")
@@ -37,3 +38,169 @@ EMBEDDING_DEVICE = os.getenv("EMBEDDING_DEVICE", "cpu")
 WHISPER_DEVICE = os.getenv("WHISPER_DEVICE", "cpu")
 WHISPER_COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE", "int8")
 
+
+# Worker Pools (concurrency limit + queue depth per workload; beyond that requests get a 503)
+AUDIO_POOL_WORKERS = int(os.getenv("AUDIO_POOL_WORKERS", "1"))
+AUDIO_POOL_QUEUE = int(os.getenv("AUDIO_POOL_QUEUE", "4"))
+OCR_POOL_WORKERS = int(os.getenv("OCR_POOL_WORKERS", "2"))
+OCR_POOL_QUEUE = int(os.getenv("OCR_POOL_QUEUE", "16"))
+PARSE_POOL_WORKERS = int(os.getenv("PARSE_POOL_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+PARSE_POOL_QUEUE = int(os.getenv("PARSE_POOL_QUEUE", "16"))
+PARSE_POOL_KIND = os.getenv("PARSE_POOL_KIND", "process")  # "process" or "thread"
+EMBED_POOL_WORKERS = int(os.getenv("EMBED_POOL_WORKERS", "2"))
+EMBED_POOL_QUEUE = int(os.getenv("EMBED_POOL_QUEUE", "32"))
+LLM_POOL_WORKERS = int(os.getenv("LLM_POOL_WORKERS", "2"))
+LLM_POOL_QUEUE = int(os.getenv("LLM_POOL_QUEUE", "8"))
+# Single-question embeddings on the /chat and /feedback path, kept apart from ingest's embed pool
+QUERY_POOL_WORKERS = int(os.getenv("QUERY_POOL_WORKERS", "2"))
+QUERY_POOL_QUEUE = int(os.getenv("QUERY_POOL_QUEUE", "16"))
+
+# Ingestion Jobs (persistent queue so restarts don't lose uploads)
+JOBS_DB_PATH = os.getenv("OMNISCRIBE_JOBS_DB", os.path.join(BACKEND_DIR, "jobs", "jobs.db"))
+UPLOAD_DIR = os.getenv("OMNISCRIBE_UPLOAD_DIR", os.path.join(BACKEND_DIR, "uploads"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_MAX_QUEUED = int(os.getenv("JOB_MAX_QUEUED", "500"))
+
+# Uploads (per-type limits; larger uploads are rejected with 413 while they arrive, before any model runs)
+MAX_AUDIO_UPLOAD_MB = int(os.getenv("MAX_AUDIO_UPLOAD_MB", "500"))
+MAX_IMAGE_UPLOAD_MB = int(os.getenv("MAX_IMAGE_UPLOAD_MB", "25"))
+MAX_DOCUMENT_UPLOAD_MB = int(os.getenv("MAX_DOCUMENT_UPLOAD_MB", "100"))
+
+# Bulk Ingestion (texts per embedding forward pass / records per Chroma upsert)
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+UPSERT_BATCH_SIZE = int(os.getenv("UPSERT_BATCH_SIZE", "1024"))
+
+# Media Cache (Whisper/OCR results keyed by the SHA-256 of the upload; oldest-used entries evicted above the size cap)
+MEDIA_CACHE_ENABLED = os.getenv("MEDIA_CACHE_ENABLED", "true").lower() == "true"
+MEDIA_CACHE_DIR = os.getenv("OMNISCRIBE_MEDIA_CACHE_DIR", os.path.join(BACKEND_DIR, "media_cache"))
+MEDIA_CACHE_MAX_MB = int(os.getenv("MEDIA_CACHE_MAX_MB", "256"))
+
+# Knowledge Folder Manifest (path + content hash of every ingested file, for incremental re-scans)
+SCAN_MANIFEST_PATH = os.getenv("OMNISCRIBE_SCAN_MANIFEST", os.path.join(BACKEND_DIR, "jobs", "scan_manifest.db"))
+
+# Knowledge Folder Scan (parsed files buffered ahead of the embedder / files per bulk upsert)
+SCAN_EMBED_QUEUE = int(os.getenv("SCAN_EMBED_QUEUE", "64"))
+SCAN_EMBED_BATCH_FILES = int(os.getenv("SCAN_EMBED_BATCH_FILES", "32"))
+
+# Chunking (BGE-small truncates at 512 tokens; leave room for the source tag)
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "400"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "50"))
+
+# Audio Transcription (transcripts are indexed in windows of at most this many seconds as Whisper produces them)
+TRANSCRIPT_WINDOW_SECONDS = float(os.getenv("TRANSCRIPT_WINDOW_SECONDS", "60"))
+# Speed profile: beam size and VAD filtering of non-speech
+WHISPER_BEAM_SIZE = int(os.getenv("WHISPER_BEAM_SIZE", "5"))
+WHISPER_VAD_FILTER = os.getenv("WHISPER_VAD_FILTER", "true").lower() == "true"
+# Parallel transcription: recordings longer than AUDIO_SPLIT_SECONDS are decoded a block at a time, cut at
+# silences and the pieces transcribed by WHISPER_WORKERS concurrent workers with WHISPER_CPU_THREADS threads each
+# (memory: ~2 x WHISPER_WORKERS pieces of 16 kHz float32, about 11 MB per 3 minutes, not the whole recording)
+WHISPER_WORKERS = int(os.getenv("WHISPER_WORKERS", "1"))
+WHISPER_CPU_THREADS = int(os.getenv("WHISPER_CPU_THREADS", str(max(1, (os.cpu_count() or 4) // max(1, WHISPER_WORKERS)))))
+AUDIO_SPLIT_SECONDS = float(os.getenv("AUDIO_SPLIT_SECONDS", "180"))
+
+# Batch OCR (images per OCR task, parallel decoders ahead of the serial model, downscale limit, text lines per recognition batch)
+OCR_BATCH_SIZE = int(os.getenv("OCR_BATCH_SIZE", "8"))
+OCR_DECODE_WORKERS = int(os.getenv("OCR_DECODE_WORKERS", "4"))
+OCR_MAX_IMAGE_SIDE = int(os.getenv("OCR_MAX_IMAGE_SIDE", "2000"))
+OCR_REC_BATCH_SIZE = int(os.getenv("OCR_REC_BATCH_SIZE", "16"))
+OCR_MAX_BATCH_FILES = int(os.getenv("OCR_MAX_BATCH_FILES", "500"))
+
+# Scanned PDFs (pages with fewer extractable characters are rasterized and OCR'd; pages in flight per document)
+PDF_OCR_ENABLED = os.getenv("PDF_OCR_ENABLED", "true").lower() == "true"
+PDF_OCR_MIN_CHARS = int(os.getenv("PDF_OCR_MIN_CHARS", "20"))
+PDF_OCR_DPI = int(os.getenv("PDF_OCR_DPI", "200"))
+PDF_OCR_CONCURRENCY = int(os.getenv("PDF_OCR_CONCURRENCY", "4"))
+
+# Hybrid Retrieval (BM25 index kept next to Chroma, merged with vector hits by reciprocal rank fusion;
+# CANDIDATES per retriever, optional cross-encoder reranking of the fused candidates)
+HYBRID_SEARCH_ENABLED = os.getenv("HYBRID_SEARCH_ENABLED", "true").lower() == "true"
+LEXICAL_INDEX_PATH = os.getenv("OMNISCRIBE_LEXICAL_INDEX", os.path.join(BACKEND_DIR, "jobs", "lexical_index.db"))
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "20"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "false").lower() == "true"
+RERANKER_MODEL_PATH = os.getenv("RERANKER_MODEL_PATH", os.path.join(MODELS_DIR, "bge-reranker-base"))
+
+# Source Partitions (one Chroma collection per source type instead of the single COLLECTION_NAME; /chat searches
+# only the partitions its source filter allows, in parallel; chunks already in COLLECTION_NAME are moved over once)
+PARTITION_BY_SOURCE = os.getenv("PARTITION_BY_SOURCE", "false").lower() == "true"
+
+# Vector Index (HNSW graph per Chroma collection: M links per node, EF_CONSTRUCTION / EF_SEARCH candidates while
+# building / querying; HNSW_<COLLECTION>_<PARAM> overrides one collection, e.g. HNSW_OMNI_CORRECTIONS_M=8.
+# Fixed when a collection is created: existing collections pick up changes through POST /admin/index/rebuild)
+HNSW_M = int(os.getenv("HNSW_M", "16"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "100"))
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "10"))
+
+def hnsw_settings(collection_name):
+    """Chroma collection metadata carrying this collection's HNSW parameters."""
+    def setting(param, default):
+        return int(os.getenv(f"HNSW_{collection_name.upper()}_{param}", default))
+    return {
+        "hnsw:space": "l2",
+        "hnsw:M": setting("M", HNSW_M),
+        "hnsw:construction_ef": setting("EF_CONSTRUCTION", HNSW_EF_CONSTRUCTION),
+        "hnsw:search_ef": setting("EF_SEARCH", HNSW_EF_SEARCH),
+    }
+
+# Reduced-precision vectors ("float32" = knowledge base in Chroma's HNSW; "float16" / "int8" move it out of Chroma
+# into QUANTIZED_INDEX_PATH: float32 vectors stored once on disk, only compact codes in memory, no HNSW graph; the best
+# candidates x RESCORE_FACTOR are re-scored exactly - see benchmarks/bench_precision.py for the recall it keeps.
+# Only memory shrinks (float32 stays on disk) and search is a flat scan. Changing it takes effect once POST
+# /admin/index/migrate has moved the chunks. PARTITION_BY_SOURCE only applies to float32)
+VECTOR_PRECISION = os.getenv("VECTOR_PRECISION", "float32").lower()
+VECTOR_RESCORE_FACTOR = int(os.getenv("VECTOR_RESCORE_FACTOR", "4"))
+QUANTIZED_INDEX_PATH = os.getenv("OMNISCRIBE_QUANTIZED_INDEX", os.path.join(BACKEND_DIR, "jobs", "vector_codes.db"))
+
+# Relevance Gate (Chroma relevance of the best retrieved chunk picks the route: at or above LOCAL answer from
+# memory, below WEB go straight to web research, in between research first and answer from both in one pass)
+RELEVANCE_GATE_ENABLED = os.getenv("RELEVANCE_GATE_ENABLED", "true").lower() == "true"
+RELEVANCE_LOCAL_THRESHOLD = float(os.getenv("RELEVANCE_LOCAL_THRESHOLD", "0.55"))
+RELEVANCE_WEB_THRESHOLD = float(os.getenv("RELEVANCE_WEB_THRESHOLD", "0.40"))
+
+# Web Research (provider "tavily" or offline "stub", hard deadline per search, results cached on disk per normalized query;
+# with SPECULATIVE the search starts alongside the local LLM pass when relevance falls between the two thresholds)
+WEB_SEARCH_PROVIDER = os.getenv("WEB_SEARCH_PROVIDER", "tavily")
+WEB_SEARCH_TIMEOUT = float(os.getenv("WEB_SEARCH_TIMEOUT", "8"))
+WEB_SEARCH_WORKERS = int(os.getenv("WEB_SEARCH_WORKERS", "4"))
+WEB_SEARCH_SPECULATIVE = os.getenv("WEB_SEARCH_SPECULATIVE", "true").lower() == "true"
+WEB_CACHE_PATH = os.getenv("OMNISCRIBE_WEB_CACHE", os.path.join(BACKEND_DIR, "jobs", "web_cache.db"))
+WEB_CACHE_TTL = int(os.getenv("WEB_CACHE_TTL", "21600"))
+WEB_SEARCH_STUB_FILE = os.getenv("WEB_SEARCH_STUB_FILE", "")
+WEB_SEARCH_STUB_DELAY_MS = int(os.getenv("WEB_SEARCH_STUB_DELAY_MS", "0"))
+
+# Context Packing (retrieved chunks share a token budget in the prompt: near-duplicates dropped, best first,
+# the last chunk cut at a sentence boundary; tokens estimated as characters / CHARS_PER_TOKEN)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1200"))
+CONTEXT_MIN_CHUNK_TOKENS = int(os.getenv("CONTEXT_MIN_CHUNK_TOKENS", "40"))
+CONTEXT_DEDUP_SIMILARITY = float(os.getenv("CONTEXT_DEDUP_SIMILARITY", "0.8"))
+CONTEXT_CHARS_PER_TOKEN = float(os.getenv("CONTEXT_CHARS_PER_TOKEN", "4"))
+
+# Human Corrections (/feedback answers in their own index, one per normalized question; a /chat question at
+# least this similar to a corrected one, with the same numbers and names, gets the correction directly)
+CORRECTIONS_ENABLED = os.getenv("CORRECTIONS_ENABLED", "true").lower() == "true"
+CORRECTION_MATCH_SIMILARITY = float(os.getenv("CORRECTION_MATCH_SIMILARITY", "0.92"))
+
+# Answer Cache (exact + semantic reuse of /chat answers; a semantic match must also have the same numbers and
+# names, so "price in 2023" never gets the 2024 answer; cleared whenever the knowledge base changes)
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "512"))
+ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", "3600"))
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.95"))
+# Write counter shared by replicas that mount the same jobs/ directory, so chat replicas drop answers after ingest elsewhere
+KNOWLEDGE_WRITES_PATH = os.getenv("OMNISCRIBE_KNOWLEDGE_WRITES", os.path.join(BACKEND_DIR, "jobs", "knowledge_writes.db"))
+
+# Shared Embedding Service (query LRU cache + micro-batching of concurrent embed calls)
+EMBED_CACHE_SIZE = int(os.getenv("EMBED_CACHE_SIZE", "4096"))
+EMBED_MICROBATCH_SIZE = int(os.getenv("EMBED_MICROBATCH_SIZE", "32"))
+EMBED_MICROBATCH_WAIT_MS = float(os.getenv("EMBED_MICROBATCH_WAIT_MS", "5"))
+
+# Observability (Prometheus /metrics endpoint; per-request traces are opt-in with trace=true on /chat)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+# Replica Role & Startup ("all", "chat" or "ingest"; a replica never loads models it doesn't serve)
+OMNISCRIBE_ROLE = os.getenv("OMNISCRIBE_ROLE", "all").lower()
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "true").lower() == "true"
+
+def role_enabled(role):
+    return OMNISCRIBE_ROLE in ("all", role)
@@ -0,0 +1,95 @@
+"""
+Packs retrieved chunks into the LLM prompt under a token budget.
+Near-duplicate chunks are dropped, the rest are taken best-first by relevance and the
+last one that does not fit is cut at a sentence boundary. Token counts are estimated
+from characters (CONTEXT_CHARS_PER_TOKEN), close enough for Llama-style tokenizers to
+budget prefill cost without loading the model's tokenizer here.
+"""
+import math
+import re
+
+import config
+
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+")
+_WORD_RE = re.compile(r"\w+")
+
+
+def estimate_tokens(text):
+    return math.ceil(len(text) / config.CONTEXT_CHARS_PER_TOKEN) if text else 0
+
+
+def _shingles(text, size=3):
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < size:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _similarity(a, b):
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+def trim_to_tokens(text, max_tokens):
+    """Longest prefix of whole sentences within max_tokens (whole words + '...' if even one sentence is too long)."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    max_chars = int(max_tokens * config.CONTEXT_CHARS_PER_TOKEN)
+    kept = ""
+    for sentence in _SENTENCE_END_RE.split(text):
+        candidate = f"{kept} {sentence}" if kept else sentence
+        if len(candidate) > max_chars:
+            break
+        kept = candidate
+    if kept:
+        return kept
+    cut = text[:max(0, max_chars - 3)].rsplit(" ", 1)[0]
+    return f"{cut}..." if cut else ""
+
+
+def pack_context(chunks, relevance=None, budget=None):
+    """
+    Returns ([(index, text)], stats): the chunks to put in the prompt, best first, with
+    their index in `chunks` (so cited source numbers still point at the original list).
+    `relevance` is aligned with `chunks`; chunks without a score (web results, which were
+    fetched for this very query) rank first.
+    """
+    budget = budget or config.CONTEXT_TOKEN_BUDGET
+    relevance = list(relevance or [])
+    cleaned = [" ".join(chunk.split()) for chunk in chunks]
+    order = sorted(
+        range(len(cleaned)),
+        key=lambda i: relevance[i] if i < len(relevance) and relevance[i] is not None else math.inf,
+        reverse=True
+    )
+
+    packed, kept_shingles = [], []
+    stats = {"chunks": len(chunks), "used": 0, "duplicates": 0, "trimmed": 0, "dropped": 0,
+             "raw_tokens": sum(estimate_tokens(text) for text in cleaned), "packed_tokens": 0}
+    remaining = budget
+    for i in order:
+        shingles = _shingles(cleaned[i])
+        if any(_similarity(shingles, other) >= config.CONTEXT_DEDUP_SIMILARITY for other in kept_shingles):
+            stats["duplicates"] += 1
+            continue
+        text = cleaned[i]
+        if estimate_tokens(text) > remaining:
+            text = trim_to_tokens(text, remaining) if remaining >= config.CONTEXT_MIN_CHUNK_TOKENS else ""
+            if not text:
+                stats["dropped"] += 1
+                continue
+            stats["trimmed"] += 1
+        kept_shingles.append(shingles)
+        packed.append((i, text))
+        remaining -= estimate_tokens(text)
+
+    stats["used"] = len(packed)
+    stats["packed_tokens"] = budget - remaining
+    stats["saved_tokens"] = stats["raw_tokens"] - stats["packed_tokens"]
+    return packed, stats
+
+
+def merge_stats(total, stats):
+    """Adds one reasoning pass's packing stats to the running totals of a request."""
+    if not total:
+        return dict(stats)
+    return {key: total.get(key, 0) + value for key, value in stats.items()}
@@ -0,0 +1,117 @@
+"""
+Human corrections from /feedback, kept apart from the knowledge base.
+Each corrected question is stored once in its own Chroma collection, embedded from its
+normalized text and keyed by that text's hash, so new feedback for the same question
+replaces the old answer instead of piling up. /chat looks here before anything else: a
+question within CORRECTION_MATCH_SIMILARITY of a corrected one, with the same numbers and
+names (answer_cache.query_anchors), is answered directly, without retrieval or an LLM call.
+"""
+import hashlib
+import re
+import threading
+import time
+
+import config
+from answer_cache import normalize_query, query_anchors
+
+# Nearest corrections checked for one with the question's anchors
+_CANDIDATES = 5
+
+_LEGACY_RE = re.compile(r"\[HUMAN CORRECTION\] Question: (.*?)\nAnswer: (.*)", re.S)
+
+
+class CorrectionStore:
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self._ready = False
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def db(self):
+        from vector_store import open_store
+
+        if not self._ready:
+            with self._lock:
+                if not self._ready:
+                    self._migrate(open_store(config.CORRECTIONS_COLLECTION))
+                    self._ready = True
+        return open_store(config.CORRECTIONS_COLLECTION)
+
+    @staticmethod
+    def _key(question):
+        return hashlib.sha1(normalize_query(question).encode("utf-8")).hexdigest()
+
+    def _write(self, db, question, answer):
+        from vector_store import write_lock
+
+        embedding = db.embeddings.embed_query(normalize_query(question))
+        with write_lock:
+            db._collection.upsert(
+                ids=[self._key(question)],
+                embeddings=[embedding],
+                documents=[question],
+                metadatas=[{"question": question, "answer": answer, "updated_at": time.time()}]
+            )
+
+    def _migrate(self, db):
+        """Moves corrections that older versions wrote into the main collection over here."""
+        from vector_store import vector_stores, delete_where
+
+        where = {"source": "human_feedback"}
+        legacy = [text for store in vector_stores() for text in store._collection.get(where=where, include=["documents"])["documents"]]
+        if not legacy:
+            return
+        for text in legacy:
+            match = _LEGACY_RE.match(text or "")
+            if match:
+                self._write(db, match.group(1).strip(), match.group(2).strip())
+        delete_where(where)
+        print(f"✅ Moved {len(legacy)} human correction(s) into the corrections index")
+
+    def upsert(self, question, answer):
+        """Stores (or replaces) the answer for a question; returns its id."""
+        self._write(self.db, question, answer)
+        return self._key(question)
+
+    def lookup(self, question):
+        """Returns (correction or None, similarity): {"question", "answer", "updated_at"} of the closest match."""
+        from vector_store import swap_guard
+
+        db = self.db
+        with swap_guard.reading():
+            count = db._collection.count()
+        if not count:
+            with self._stats_lock:
+                self.misses += 1
+            return None, 0.0
+        embedding = db.embeddings.embed_query(normalize_query(question))
+        with swap_guard.reading():
+            found = db._collection.query(
+                query_embeddings=[embedding], n_results=min(_CANDIDATES, count), include=["metadatas", "distances"]
+            )
+        # Squared L2 between normalized vectors: cosine = 1 - d / 2
+        similarities = [1.0 - distance / 2 for distance in found["distances"][0]]
+        anchors = query_anchors(question)
+        match = next((
+            (meta, similarity) for meta, similarity in zip(found["metadatas"][0], similarities)
+            if similarity >= self.threshold and query_anchors(meta["question"]) == anchors
+        ), None)
+        with self._stats_lock:
+            if match:
+                self.hits += 1
+            else:
+                self.misses += 1
+        correction, similarity = match or (None, similarities[0])
+        return correction, round(similarity, 4)
+
+    def stats(self):
+        with self._stats_lock:
+            stats = {"hits": self.hits, "misses": self.misses}
+        stats["entries"] = self.db._collection.count() if self._ready else None
+        return stats
+
+
+corrections = CorrectionStore(config.CORRECTION_MATCH_SIMILARITY)
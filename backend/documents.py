@@ -0,0 +1,83 @@
+"""
+Document parsing helpers.
+Kept free of model/DB imports: these functions run inside the parse process pool,
+and every worker process imports this module.
+"""
+import hashlib
+
+import config
+
+SUPPORTED_DOCUMENTS = ['.txt', '.md', '.pdf', '.docx']
+
+
+def file_sha256(path, block_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _iter_text_paragraphs(filepath):
+    """Reads a text file line by line and yields blank-line separated paragraphs."""
+    lines = []
+    with open(filepath, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                lines.append(line)
+            elif lines:
+                yield "".join(lines)
+                lines = []
+    if lines:
+        yield "".join(lines)
+
+
+def iter_document_units(filepath, file_ext, page_texts=None, scanned_pages=None):
+    """
+    Lazily yields (page, text) units of a document: one per PDF page, DOCX paragraph
+    or text paragraph. `page` is the 1-based PDF page number, None for other formats.
+    The document is never concatenated into one string.
+    PDF pages found in `page_texts` (OCR output) use that text instead of the text layer;
+    pages with no usable text layer are appended to `scanned_pages` if given.
+    """
+    if file_ext in ['.txt', '.md']:
+        for paragraph in _iter_text_paragraphs(filepath):
+            yield None, paragraph
+    elif file_ext == '.pdf':
+        from pypdf import PdfReader
+        pdf_reader = PdfReader(filepath)
+        for number, page in enumerate(pdf_reader.pages, start=1):
+            if page_texts and number in page_texts:
+                yield number, page_texts[number]
+                continue
+            text = page.extract_text() or ""
+            if scanned_pages is not None and len(text.strip()) < config.PDF_OCR_MIN_CHARS:
+                scanned_pages.append(number)
+            yield number, text
+    elif file_ext == '.docx':
+        from docx import Document
+        doc = Document(filepath)
+        for para in doc.paragraphs:
+            if para.text.strip():
+                yield None, para.text
+    else:
+        raise ValueError(f"Unsupported document type: {file_ext}")
+
+
+def render_pdf_page(filepath, number, dpi=None, max_side=None):
+    """
+    Rasterizes one PDF page (1-based) to a BGR array for OCR, at `dpi` but never larger
+    than `max_side` pixels. Runs on the parse pool, one page at a time.
+    """
+    import fitz  # PyMuPDF
+    import numpy as np
+
+    dpi = dpi or config.PDF_OCR_DPI
+    max_side = max_side or config.OCR_MAX_IMAGE_SIDE
+    with fitz.open(filepath) as pdf:
+        page = pdf[number - 1]
+        zoom = min(dpi / 72, max_side / max(page.rect.width, page.rect.height))
+        pixmap = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+        image = np.frombuffer(pixmap.samples, dtype=np.uint8).reshape(pixmap.height, pixmap.width, pixmap.n)
+    # PyMuPDF renders RGB; PaddleOCR expects OpenCV's BGR order
+    return np.ascontiguousarray(image[:, :, 2::-1])
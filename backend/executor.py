@@ -0,0 +1,190 @@
+import asyncio
+import contextlib
+import contextvars
+import functools
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+import config
+import metrics
+
+
+class PoolSaturated(Exception):
+    """Raised when a worker pool has no free slot (running + queued)."""
+
+    def __init__(self, pool_name, retry_after):
+        super().__init__(f"The '{pool_name}' worker pool is busy. Please retry shortly.")
+        self.pool_name = pool_name
+        self.retry_after = retry_after
+
+
+class WorkerPool:
+    """
+    Bounded executor for one class of blocking work (audio, OCR, embedding, LLM...).
+    At most `max_workers` calls run at once and at most `max_queue` more wait for a
+    worker. Anything beyond that is rejected with PoolSaturated (backpressure).
+    """
+
+    def __init__(self, name, max_workers, max_queue, kind="thread", retry_after=5):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.kind = kind
+        self.retry_after = retry_after
+        self._executor = None
+        self._gate = None
+        self._running = 0
+        self._waiting = 0
+        self._rejected = 0
+        self._completed = 0
+
+    def _get_executor(self):
+        # Executors are created lazily so importing this module never spawns workers
+        if self._executor is None:
+            if self.kind == "process":
+                # spawn: never fork a process that already holds model threads/CUDA state
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix=f"omni-{self.name}"
+                )
+        return self._executor
+
+    def _get_gate(self):
+        if self._gate is None:
+            self._gate = asyncio.Semaphore(self.max_workers + self.max_queue)
+        return self._gate
+
+    def check_capacity(self):
+        """Raises PoolSaturated now if a non-blocking run() would be rejected."""
+        if self._get_gate().locked():
+            self._rejected += 1
+            raise PoolSaturated(self.name, self.retry_after)
+
+    async def run(self, fn, *args, block=False, **kwargs):
+        """
+        Runs `fn(*args, **kwargs)` on the pool without blocking the event loop.
+        With block=False (HTTP handlers) a full pool raises PoolSaturated straight away;
+        with block=True (background jobs) the caller waits for a free slot instead.
+        """
+        gate = self._get_gate()
+        if not block:
+            self.check_capacity()
+
+        queued = time.perf_counter()
+        self._waiting += 1
+        try:
+            await gate.acquire()
+        finally:
+            self._waiting -= 1
+
+        self._running += 1
+        try:
+            loop = asyncio.get_running_loop()
+            call = functools.partial(fn, *args, **kwargs)
+            if self.kind == "process":
+                metrics.QUEUE_WAIT_SECONDS.labels(self.name).observe(time.perf_counter() - queued)
+            else:
+                call = functools.partial(self._started, contextvars.copy_context(), queued, call)
+            return await loop.run_in_executor(self._get_executor(), call)
+        finally:
+            self._running -= 1
+            self._completed += 1
+            gate.release()
+
+    def _started(self, context, queued, call):
+        # Thread pools: the wait ends when a worker picks the call up; the caller's trace comes along
+        metrics.QUEUE_WAIT_SECONDS.labels(self.name).observe(time.perf_counter() - queued)
+        return context.run(call)
+
+    async def stream(self, gen_fn, *args, block=True, maxsize=8, **kwargs):
+        """
+        Runs the generator `gen_fn(*args, **kwargs)` on the pool and yields its items on the
+        event loop as they are produced. The hand-off queue holds at most `maxsize` items:
+        a fast producer blocks until the consumer catches up, keeping memory flat.
+        Leaving the loop early stops the producer at its next item (wrap the call in
+        contextlib.aclosing so that happens immediately rather than at garbage collection).
+        """
+        loop = asyncio.get_running_loop()
+        items = asyncio.Queue(maxsize=maxsize)
+        stop = threading.Event()
+        done = object()
+
+        def put(item):
+            if not stop.is_set():
+                asyncio.run_coroutine_threadsafe(items.put(item), loop).result()
+
+        def produce():
+            try:
+                with contextlib.closing(gen_fn(*args, **kwargs)) as gen:
+                    for item in gen:
+                        if stop.is_set():
+                            return
+                        put((item, None))
+            except BaseException as e:
+                put((done, e))
+                return
+            put((done, None))
+
+        # Capacity is checked up front; once admitted the producer always gets its slot
+        if not block:
+            self.check_capacity()
+        producer = asyncio.ensure_future(self.run(produce, block=True))
+        try:
+            while True:
+                item, error = await items.get()
+                if item is done:
+                    if error is not None:
+                        raise error
+                    break
+                yield item
+            await producer
+        finally:
+            stop.set()
+            # Unblock a producer waiting on a full queue so its thread is released
+            while not items.empty():
+                items.get_nowait()
+
+    def stats(self):
+        return {
+            "kind": self.kind,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": self._running,
+            "waiting": self._waiting,
+            "completed": self._completed,
+            "rejected": self._rejected,
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# One pool per workload so a long Whisper job can never starve /chat
+audio_pool = WorkerPool("audio", config.AUDIO_POOL_WORKERS, config.AUDIO_POOL_QUEUE, retry_after=30)
+ocr_pool = WorkerPool("ocr", config.OCR_POOL_WORKERS, config.OCR_POOL_QUEUE, retry_after=10)
+# pypdf / python-docx are pure Python and hold the GIL, so parsing runs in processes
+parse_pool = WorkerPool("parse", config.PARSE_POOL_WORKERS, config.PARSE_POOL_QUEUE, kind=config.PARSE_POOL_KIND)
+embed_pool = WorkerPool("embed", config.EMBED_POOL_WORKERS, config.EMBED_POOL_QUEUE)
+# Ingest keeps embed_pool full; embedding one question for /chat must not queue behind it
+query_pool = WorkerPool("query", config.QUERY_POOL_WORKERS, config.QUERY_POOL_QUEUE)
+llm_pool = WorkerPool("llm", config.LLM_POOL_WORKERS, config.LLM_POOL_QUEUE, retry_after=10)
+
+ALL_POOLS = [audio_pool, ocr_pool, parse_pool, embed_pool, query_pool, llm_pool]
+
+
+def pool_stats():
+    return {pool.name: pool.stats() for pool in ALL_POOLS}
+
+
+def shutdown_pools():
+    for pool in ALL_POOLS:
+        pool.shutdown()
@@ -1,59 +1,346 @@
 import os
 import config
+import itertools
 import logging
+import metrics
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
-try:
-    from patch import apply_langchain_patch
-    apply_langchain_patch()
-except: pass
+# Semantic Tags (prefixed to every indexed chunk)
+AUDIO_TAG = "[AUDIO TRANSCRIPT]"
+IMAGE_TAG = "[IMAGE CONTENT]"
+
+# Whisper works on 16 kHz mono audio
+SAMPLE_RATE = 16000
+
+@metrics.timed("image_decode")
+def load_image(file_path, max_side=None):
+    """Decodes an image file to a BGR array, downscaled so its longest side is at most `max_side`."""
+    import cv2
+    import numpy as np
+
+    # imdecode(fromfile) instead of imread: imread cannot open non-ASCII paths on Windows
+    image = cv2.imdecode(np.fromfile(file_path, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError(f"Could not decode image {os.path.basename(file_path)}")
+
+    max_side = max_side or config.OCR_MAX_IMAGE_SIDE
+    height, width = image.shape[:2]
+    scale = max_side / max(height, width)
+    if scale < 1:
+        image = cv2.resize(image, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+    return image
+
+
+def audio_duration(file_path):
+    """Duration in seconds from the container header (None when the format does not record it)."""
+    import av
+
+    with av.open(file_path, mode="r", metadata_errors="ignore") as container:
+        return container.duration / av.time_base if container.duration else None
+
+
+def iter_audio_blocks(file_path, block_seconds):
+    """
+    Decodes an audio file to 16 kHz mono float32 like faster_whisper.decode_audio, but yields
+    it in blocks of about `block_seconds` so a long recording is never in memory whole.
+    """
+    import av
+    import numpy as np
+
+    resampler = av.audio.resampler.AudioResampler(format="s16", layout="mono", rate=SAMPLE_RATE)
+    block_samples = int(block_seconds * SAMPLE_RATE)
+    buffered, samples = [], 0
+    with av.open(file_path, mode="r", metadata_errors="ignore") as container:
+        frames = container.decode(audio=0)
+        while True:
+            try:
+                frame = next(frames)
+                frame.pts = None  # Ignore timestamp checks, as decode_audio does
+            except StopIteration:
+                frame = None  # Flushes the resampler
+            except av.error.InvalidDataError:
+                continue
+            for resampled in resampler.resample(frame):
+                array = resampled.to_ndarray().reshape(-1)
+                buffered.append(array)
+                samples += len(array)
+            if buffered and (samples >= block_samples or frame is None):
+                yield np.concatenate(buffered).astype(np.float32) / 32768.0
+                buffered, samples = [], 0
+            if frame is None:
+                return
 
-from faster_whisper import WhisperModel
-from paddleocr import PaddleOCR
 
 class IngestionEngine:
+    """
+    Whisper + PaddleOCR front-end. Each model is loaded on first use (thread-safe),
+    so chat-only replicas never pay for them and startup stays fast.
+    """
+
     def __init__(self):
-        print("⏳ Initializing Ingestion Engine...")
-        
-        # Load Whisper (CPU Mode)
-        self.whisper = WhisperModel(
+        self._whisper = None
+        self._ocr = None
+        self._whisper_lock = threading.Lock()
+        self._whisper_executor = None
+        self._ocr_lock = threading.Lock()
+        # One PaddleOCR instance is shared by every OCR worker and it isn't thread-safe
+        self._ocr_infer_lock = threading.Lock()
+
+    @property
+    def whisper(self):
+        if self._whisper is None:
+            with self._whisper_lock:
+                if self._whisper is None:
+                    self._whisper = self._load_whisper()
+        return self._whisper
+
+    @property
+    def ocr(self):
+        if self._ocr is None:
+            with self._ocr_lock:
+                if self._ocr is None:
+                    self._ocr = self._load_ocr()
+        return self._ocr
+
+    def _load_whisper(self):
+        print("⏳ Loading Whisper...")
+        # Import torch first to initialize CUDA DLLs
+        import torch  # noqa: F401
+        from faster_whisper import WhisperModel
+
+        # Load Whisper (CPU Mode). num_workers lets that many transcribe() calls run in
+        # parallel, each on its own slice of cpu_threads
+        model = WhisperModel(
             config.WHISPER_MODEL_PATH,
             device=config.WHISPER_DEVICE,
-            compute_type=config.WHISPER_COMPUTE_TYPE
+            compute_type=config.WHISPER_COMPUTE_TYPE,
+            cpu_threads=config.WHISPER_CPU_THREADS,
+            num_workers=config.WHISPER_WORKERS
         )
-        print(f"✅ Whisper Loaded ({config.WHISPER_DEVICE})")
+        self._whisper_executor = ThreadPoolExecutor(config.WHISPER_WORKERS, thread_name_prefix="whisper")
+        print(f"✅ Whisper Loaded ({config.WHISPER_DEVICE}, {config.WHISPER_WORKERS} x {config.WHISPER_CPU_THREADS} threads)")
+        return model
+
+    def _load_ocr(self):
+        print("⏳ Loading PaddleOCR...")
+        # Import torch first to initialize CUDA DLLs
+        import torch  # noqa: F401
+        try:
+            from patch import apply_langchain_patch
+            apply_langchain_patch()
+        except: pass
+        from paddleocr import PaddleOCR
 
         # Load PaddleOCR (CPU Mode)
         logging.getLogger("ppocr").setLevel(logging.ERROR)
-        
+
         det_path = os.path.join(config.OCR_MODEL_DIR, "ch_PP-OCRv4_det_infer")
         rec_path = os.path.join(config.OCR_MODEL_DIR, "en_PP-OCRv4_rec_infer")
         cls_path = os.path.join(config.OCR_MODEL_DIR, "ch_ppocr_mobile_v2.0_cls_infer")
 
-        self.ocr = PaddleOCR(
+        model = PaddleOCR(
             use_angle_cls=True,
             lang='en',
-            use_gpu=False, 
+            use_gpu=False,
             show_log=False,
             det_model_dir=det_path,
             rec_model_dir=rec_path,
-            cls_model_dir=cls_path
+            cls_model_dir=cls_path,
+            rec_batch_num=config.OCR_REC_BATCH_SIZE
         )
         print("✅ PaddleOCR Loaded (CPU Mode)")
+        return model
 
-    def transcribe_audio(self, file_path):
-        segments, _ = self.whisper.transcribe(file_path, beam_size=5)
-        raw_text = " ".join([s.text for s in segments])
-        # Semantic Tag
-        return f"[AUDIO TRANSCRIPT]: {raw_text}"
+    def warm_up(self):
+        """Loads both models now (used by the optional background warm-up)."""
+        self.whisper
+        self.ocr
 
-    def extract_text_from_image(self, file_path):
-        result = self.ocr.ocr(file_path, cls=True)
+    def loaded(self):
+        return {"whisper": self._whisper is not None, "ocr": self._ocr is not None}
+
+    def _transcribe(self, audio, offset=0.0):
+        segments, info = self.whisper.transcribe(
+            audio, beam_size=config.WHISPER_BEAM_SIZE, vad_filter=config.WHISPER_VAD_FILTER
+        )
+        return ((offset + s.start, offset + s.end, s.text) for s in segments), info.duration
+
+    def split_on_silence(self, audio, max_seconds=None):
+        """
+        Cuts 16 kHz audio into (start, end) sample ranges of roughly `max_seconds`, always
+        cutting in the middle of a silence found by the Silero VAD.
+        """
+        from faster_whisper.vad import VadOptions, get_speech_timestamps
+
+        max_seconds = max_seconds or config.AUDIO_SPLIT_SECONDS
+        limit = int(max_seconds * SAMPLE_RATE)
+        # Capping speech runs at max_seconds guarantees a cut point at least that often
+        speech = get_speech_timestamps(audio, VadOptions(max_speech_duration_s=max_seconds, min_silence_duration_ms=500))
+
+        pieces, start, prev_end = [], 0, 0
+        for ts in speech:
+            if ts["end"] - start > limit and prev_end > start:
+                cut = (prev_end + ts["start"]) // 2
+                pieces.append((start, cut))
+                start = cut
+            prev_end = ts["end"]
+        if start < len(audio):
+            pieces.append((start, len(audio)))
+        return pieces
+
+    def _iter_file_pieces(self, file_path):
+        """
+        Yields (start_sample, audio) pieces of roughly AUDIO_SPLIT_SECONDS cut at silences.
+        The file is decoded block by block: only the tail carried into the next block and
+        the pieces being transcribed are held in memory, whatever the recording's length.
+        """
+        import numpy as np
+
+        limit = int(config.AUDIO_SPLIT_SECONDS * SAMPLE_RATE)
+        carry, offset = None, 0
+        blocks = metrics.timed_iter(iter_audio_blocks(file_path, config.AUDIO_SPLIT_SECONDS), "audio_decode")
+        for block in blocks:
+            audio = block if carry is None else np.concatenate([carry, block])
+            *done, (start, end) = self.split_on_silence(audio)
+            # The last piece may stop mid-word at the block boundary: it is cut again with the next
+            # block, unless no silence was found for long enough to bound what is carried
+            if end - start > 2 * limit:
+                done.append((start, end))
+                start = end
+            for piece_start, piece_end in done:
+                yield offset + piece_start, audio[piece_start:piece_end].copy()
+            carry, offset = audio[start:].copy(), offset + start
+        if carry is not None and len(carry):
+            yield offset, carry
+
+    def _transcribe_piece(self, start, audio):
+        segments, _ = self._transcribe(audio, offset=start / SAMPLE_RATE)
+        return list(segments)
+
+    def _iter_pieces(self, pieces):
+        # Keeps every worker busy while yielding the pieces strictly in order
+        executor = self._whisper_executor
+        todo = iter(pieces)
+        pending = deque(
+            executor.submit(self._transcribe_piece, start, audio)
+            for start, audio in itertools.islice(todo, config.WHISPER_WORKERS * 2)
+        )
+        try:
+            while pending:
+                segments = pending.popleft().result()
+                piece = next(todo, None)
+                if piece is not None:
+                    pending.append(executor.submit(self._transcribe_piece, *piece))
+                yield from segments
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def transcribe_segments(self, file_path):
+        """
+        Returns (segments, duration) where `segments` lazily yields (start, end, text) in
+        order. With WHISPER_WORKERS > 1, recordings longer than AUDIO_SPLIT_SECONDS are
+        decoded block by block, split at silences and the pieces transcribed in parallel.
+        """
+        self.whisper  # Loads the model (and its worker threads) on first use
+        duration = audio_duration(file_path) if config.WHISPER_WORKERS > 1 else None
+        if config.WHISPER_WORKERS <= 1 or (duration is not None and duration <= config.AUDIO_SPLIT_SECONDS):
+            segments, duration = self._transcribe(file_path)
+        else:
+            print(f"🎤 Transcribing {duration or 0:.0f}s of audio in pieces for {config.WHISPER_WORKERS} Whisper workers")
+            segments = self._iter_pieces(self._iter_file_pieces(file_path))
+
+        metrics.AUDIO_SECONDS.inc(duration or 0)
+        # Segments are decoded lazily, so Whisper time is what the consumer spends waiting for them
+        return metrics.timed_iter(segments, "whisper"), duration
+
+    def iter_transcript_windows(self, file_path, window_seconds=None, max_tokens=None):
+        """
+        Generator: consumes Whisper segments as they are decoded and yields time windows
+        {"text", "start", "end", "progress"} of at most `window_seconds` seconds and
+        `max_tokens` tokens. Only the current window is held in memory.
+        """
+        from chunking import count_tokens
+
+        window_seconds = window_seconds or config.TRANSCRIPT_WINDOW_SECONDS
+        max_tokens = max_tokens or config.CHUNK_MAX_TOKENS
+        segments, duration = self.transcribe_segments(file_path)
+
+        def make_window(window):
+            end = window[-1]["end"]
+            return {
+                "text": " ".join(s["text"] for s in window),
+                "start": round(window[0]["start"], 2),
+                "end": round(end, 2),
+                "progress": min(end / duration, 1.0) if duration else None,
+            }
+
+        window, window_tokens = [], 0
+        for start, end, text in segments:
+            text = text.strip()
+            if not text:
+                continue
+            tokens = count_tokens(text)
+            if window and (end - window[0]["start"] > window_seconds or window_tokens + tokens > max_tokens):
+                yield make_window(window)
+                window, window_tokens = [], 0
+            window.append({"text": text, "start": start, "end": end})
+            window_tokens += tokens
+
+        if window:
+            yield make_window(window)
+
+    def ocr_image(self, image):
+        """
+        Runs detection + recognition on a file path or decoded BGR array; returns the text lines.
+        Calls from different workers take turns on the model.
+        """
+        ocr = self.ocr
+        with self._ocr_infer_lock, metrics.stage("ocr"):
+            result = ocr.ocr(image, cls=True)
+        metrics.IMAGES_OCR.inc()
         text_content = []
         if result and result[0]:
             text_content = [line[1][0] for line in result[0]]
-        
-        raw_text = "\n".join(text_content)
-        # Semantic Tag
-        return f"[IMAGE CONTENT]:\n{raw_text}"
+
+        return "\n".join(text_content)
+
+    def extract_text_from_image(self, file_path):
+        return self.ocr_image(load_image(file_path))
+
+    def ocr_batch(self, paths):
+        """
+        OCRs a batch of image files. Decoding and resizing run in parallel on a few threads
+        ahead of the model, so detection never waits on disk or JPEG decoding; detection and
+        recognition still run one image at a time (see ocr_image).
+        Returns one {"path", "text", "decode_ms", "ocr_ms"} (or {"path", "error"}) per image, in order.
+        """
+        self.ocr  # Load before the decoders start
+
+        def decode(path):
+            started = time.perf_counter()
+            try:
+                return load_image(path), (time.perf_counter() - started) * 1000, None
+            except Exception as e:
+                return None, 0.0, e
+
+        results = []
+        with ThreadPoolExecutor(config.OCR_DECODE_WORKERS, thread_name_prefix="ocr-decode") as decoders:
+            for path, (image, decode_ms, error) in zip(paths, decoders.map(decode, paths)):
+                if error is not None:
+                    results.append({"path": path, "error": str(error)})
+                    continue
+                started = time.perf_counter()
+                text = self.ocr_image(image)
+                results.append({
+                    "path": path,
+                    "text": text,
+                    "decode_ms": round(decode_ms, 1),
+                    "ocr_ms": round((time.perf_counter() - started) * 1000, 1),
+                })
+        return results
 
 ingestion_engine = IngestionEngine()
@@ -0,0 +1,270 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+
+import config
+import metrics
+from lazy_sqlite import LazyConnection
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class JobStore:
+    """
+    SQLite-backed ingestion job table. Every state change is committed immediately,
+    so a restarted backend can pick up uploads that were queued or half-processed.
+    """
+
+    _conn = LazyConnection(sqlite3.Row)
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _create_schema(conn):
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                filename TEXT,
+                status TEXT NOT NULL,
+                stage TEXT,
+                progress REAL DEFAULT 0,
+                payload TEXT,
+                result TEXT,
+                error TEXT,
+                attempts INTEGER DEFAULT 0,
+                created_at REAL,
+                started_at REAL,
+                finished_at REAL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, created_at)")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS job_events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_id TEXT NOT NULL,
+                ts REAL,
+                data TEXT
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_job_events ON job_events(job_id, id)")
+
+    def create(self, kind, payload, filename=None, job_id=None):
+        job_id = job_id or uuid.uuid4().hex
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, filename, status, stage, payload, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, filename, QUEUED, QUEUED, json.dumps(payload), time.time())
+            )
+        return self.get(job_id)
+
+    def create_finished(self, kind, payload, result, filename=None, job_id=None):
+        """Records a job that completed without running (e.g. served from a cache)."""
+        job_id = job_id or uuid.uuid4().hex
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, filename, status, stage, progress, payload, result, created_at, started_at, finished_at) "
+                "VALUES (?, ?, ?, ?, ?, 1, ?, ?, ?, ?, ?)",
+                (job_id, kind, filename, SUCCEEDED, "done", json.dumps(payload), json.dumps(result), now, now, now)
+            )
+        return self.get(job_id)
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _row_to_dict(row) if row else None
+
+    def list(self, status=None, limit=50):
+        query = "SELECT * FROM jobs"
+        params = []
+        if status:
+            query += " WHERE status = ?"
+            params.append(status)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [_row_to_dict(r) for r in rows]
+
+    def count(self, status):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (status,)).fetchone()[0]
+
+    def active_payloads(self):
+        """Payloads of queued and running jobs."""
+        with self._lock:
+            rows = self._conn.execute("SELECT payload FROM jobs WHERE status IN (?, ?)", (QUEUED, RUNNING)).fetchall()
+        return [json.loads(r["payload"]) if r["payload"] else None for r in rows]
+
+    def claim_next(self):
+        """Atomically moves the oldest queued job to 'running' and returns it."""
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT id FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (QUEUED,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, stage = ?, started_at = ?, attempts = attempts + 1 WHERE id = ?",
+                (RUNNING, "starting", time.time(), row["id"])
+            )
+        return self.get(row["id"])
+
+    def update_progress(self, job_id, stage, progress=None):
+        with self._lock, self._conn:
+            if progress is None:
+                self._conn.execute("UPDATE jobs SET stage = ? WHERE id = ?", (stage, job_id))
+            else:
+                self._conn.execute(
+                    "UPDATE jobs SET stage = ?, progress = ? WHERE id = ?",
+                    (stage, max(0.0, min(1.0, progress)), job_id)
+                )
+
+    def add_event(self, job_id, data):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO job_events (job_id, ts, data) VALUES (?, ?, ?)",
+                (job_id, time.time(), json.dumps(data))
+            )
+
+    def events_since(self, job_id, after_id=0, limit=500):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, ts, data FROM job_events WHERE job_id = ? AND id > ? ORDER BY id LIMIT ?",
+                (job_id, after_id, limit)
+            ).fetchall()
+        return [{"id": r["id"], "ts": r["ts"], **json.loads(r["data"])} for r in rows]
+
+    def finish(self, job_id, result):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, stage = ?, progress = 1, result = ?, finished_at = ? WHERE id = ?",
+                (SUCCEEDED, "done", json.dumps(result), time.time(), job_id)
+            )
+
+    def fail(self, job_id, error):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+                (FAILED, error, time.time(), job_id)
+            )
+
+    def requeue_interrupted(self, max_attempts):
+        """
+        Jobs left 'running' by a crash/restart go back to the queue, unless they
+        have already been retried too often (a poison upload must not loop forever).
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE status = ? AND attempts >= ?",
+                (FAILED, "Interrupted too many times", time.time(), RUNNING, max_attempts)
+            )
+            cur = self._conn.execute(
+                "UPDATE jobs SET status = ?, stage = ?, started_at = NULL WHERE status = ?",
+                (QUEUED, QUEUED, RUNNING)
+            )
+            return cur.rowcount
+
+
+def _row_to_dict(row):
+    job = dict(row)
+    job["payload"] = json.loads(job["payload"]) if job["payload"] else None
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+
+    # Derived timings for the dashboard
+    now = time.time()
+    started, finished = job["started_at"], job["finished_at"]
+    job["queue_seconds"] = round((started or finished or now) - job["created_at"], 3)
+    job["run_seconds"] = round((finished or now) - started, 3) if started else None
+    return job
+
+
+class JobRunner:
+    """
+    Pulls queued jobs from the JobStore and runs the handler registered for their kind.
+    Handlers are `async def handler(job, progress)` where `progress(stage, fraction, event)`
+    records what the job is doing (plus an optional event dict for streaming clients);
+    their return value becomes the job result.
+    """
+
+    def __init__(self, store, concurrency=2, max_attempts=3):
+        self.store = store
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self._handlers = {}
+        self._tasks = []
+        self._wakeup = None
+
+    def register(self, kind, handler):
+        self._handlers[kind] = handler
+
+    def submit(self, kind, payload, filename=None, job_id=None):
+        job = self.store.create(kind, payload, filename=filename, job_id=job_id)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job
+
+    async def start(self):
+        self._wakeup = asyncio.Event()
+        resumed = self.store.requeue_interrupted(self.max_attempts)
+        if resumed:
+            print(f"♻️ Resuming {resumed} interrupted ingestion job(s)")
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _worker(self):
+        while True:
+            job = self.store.claim_next()
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=1.0)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                continue
+            await self._run(job)
+
+    async def _run(self, job):
+        handler = self._handlers.get(job["kind"])
+        if handler is None:
+            self.store.fail(job["id"], f"No handler registered for job kind '{job['kind']}'")
+            return
+
+        def progress(stage, fraction=None, event=None):
+            self.store.update_progress(job["id"], stage, fraction)
+            if event is not None:
+                self.store.add_event(job["id"], event)
+
+        metrics.QUEUE_WAIT_SECONDS.labels("jobs").observe(max(0.0, job["started_at"] - job["created_at"]))
+        try:
+            with metrics.stage(f"job_{job['kind']}"):
+                result = await handler(job, progress)
+            self.store.finish(job["id"], result)
+            metrics.JOBS.labels(job["kind"], SUCCEEDED).inc()
+        except asyncio.CancelledError:
+            # Shutdown mid-job: leave it 'running' so the next start re-queues it
+            raise
+        except Exception as e:
+            traceback.print_exc()
+            self.store.fail(job["id"], str(e))
+            metrics.JOBS.labels(job["kind"], FAILED).inc()
+
+
+job_store = JobStore(config.JOBS_DB_PATH)
+job_runner = JobRunner(job_store, concurrency=config.JOB_WORKERS, max_attempts=config.JOB_MAX_ATTEMPTS)
@@ -0,0 +1,39 @@
+"""
+SQLite connections for the backend's small on-disk stores, opened on first use so importing
+a module that creates one of these stores (jobs, scan manifest, web results...) writes no
+files or directories.
+"""
+import os
+import sqlite3
+import threading
+
+
+class LazyConnection:
+    """
+    Descriptor for a store's `_conn`: the first access opens `store.db_path` (creating its
+    directory) and runs `store._create_schema(conn)` in a transaction.
+    """
+
+    def __init__(self, row_factory=None):
+        self.row_factory = row_factory
+        self._lock = threading.Lock()
+
+    def __set_name__(self, owner, name):
+        self._attribute = f"_lazy{name}"
+
+    def __get__(self, store, owner=None):
+        if store is None:
+            return self
+        conn = store.__dict__.get(self._attribute)
+        if conn is None:
+            with self._lock:
+                conn = store.__dict__.get(self._attribute)
+                if conn is None:
+                    os.makedirs(os.path.dirname(store.db_path), exist_ok=True)
+                    conn = sqlite3.connect(store.db_path, check_same_thread=False)
+                    if self.row_factory is not None:
+                        conn.row_factory = self.row_factory
+                    with conn:
+                        store._create_schema(conn)
+                    store.__dict__[self._attribute] = conn
+        return conn
@@ -0,0 +1,221 @@
+"""
+BM25 inverted index kept in step with the Chroma collection.
+Every chunk written through vector_store.add_texts_bulk is tokenized into a SQLite
+postings table, so exact identifiers, names and error codes are found even when the
+embedding model blurs them. Updates are incremental (per id); nothing is rebuilt on ingest.
+"""
+import json
+import math
+import re
+import threading
+from collections import Counter
+
+import config
+from lazy_sqlite import LazyConnection
+
+# Compound tokens (ERR-404, v2.1, user_id) are indexed whole and as their parts
+_TOKEN_RE = re.compile(r"\w+(?:[-.]\w+)*")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have how i in is it its of on or that the this to was what "
+    "when where which who why will with does do did can you your".split()
+)
+
+# Chroma `where` operators, for filtering on the metadata stored with each chunk
+_FIELD_RE = re.compile(r"^\w+$")
+_SQL_OPS = {"$eq": "=", "$ne": "!=", "$gt": ">", "$gte": ">=", "$lt": "<", "$lte": "<="}
+
+
+def tokenize(text):
+    tokens = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        if token in _STOPWORDS:
+            continue
+        tokens.append(token)
+        if "-" in token or "." in token:
+            tokens.extend(part for part in re.split(r"[-.]", token) if part and part not in _STOPWORDS)
+    return tokens
+
+
+def where_sql(where):
+    """Translates a Chroma `where` filter ($and/$or, comparisons, $in/$nin) into SQL over docs.metadata."""
+    if len(where) == 1 and next(iter(where)) in ("$and", "$or"):
+        op, clauses = next(iter(where.items()))
+        parts = [where_sql(clause) for clause in clauses]
+        return "(" + f" {op[1:].upper()} ".join(sql for sql, _ in parts) + ")", [p for _, params in parts for p in params]
+
+    parts, params = [], []
+    for field, condition in where.items():
+        if not _FIELD_RE.match(field):
+            raise ValueError(f"Unsupported metadata field: {field}")
+        column = f"json_extract(d.metadata, '$.{field}')"
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        for op, value in condition.items():
+            if op in ("$in", "$nin"):
+                parts.append(f"{column} {'NOT IN' if op == '$nin' else 'IN'} ({','.join('?' * len(value))})")
+                params.extend(value)
+            else:
+                parts.append(f"{column} {_SQL_OPS[op]} ?")
+                params.append(value)
+    return "(" + " AND ".join(parts) + ")", params
+
+
+class LexicalIndex:
+    """BM25 (k1, b) over chunks keyed by their Chroma id."""
+
+    _conn = LazyConnection()
+
+    def __init__(self, db_path, k1=1.2, b=0.75):
+        self.db_path = db_path
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _create_schema(conn):
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS docs (
+                id TEXT PRIMARY KEY,
+                length INTEGER,
+                text TEXT,
+                metadata TEXT
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS postings (
+                term TEXT,
+                doc_id TEXT,
+                tf INTEGER,
+                PRIMARY KEY (term, doc_id)
+            ) WITHOUT ROWID
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_postings_doc ON postings(doc_id)")
+
+    def _delete_locked(self, ids):
+        for i in range(0, len(ids), 500):
+            batch = ids[i:i + 500]
+            marks = ",".join("?" * len(batch))
+            self._conn.execute(f"DELETE FROM postings WHERE doc_id IN ({marks})", batch)
+            self._conn.execute(f"DELETE FROM docs WHERE id IN ({marks})", batch)
+
+    def add(self, ids, texts, metadatas=None):
+        """Upserts chunks: an id that is already indexed is replaced."""
+        ids = list(ids)
+        metadatas = metadatas or [{} for _ in ids]
+        docs, postings = [], []
+        for doc_id, text, meta in zip(ids, texts, metadatas):
+            counts = Counter(tokenize(text))
+            docs.append((doc_id, sum(counts.values()), text, json.dumps(meta or {})))
+            postings.extend((term, doc_id, tf) for term, tf in counts.items())
+        with self._lock, self._conn:
+            self._delete_locked(ids)
+            self._conn.executemany("INSERT INTO docs (id, length, text, metadata) VALUES (?, ?, ?, ?)", docs)
+            self._conn.executemany("INSERT INTO postings (term, doc_id, tf) VALUES (?, ?, ?)", postings)
+
+    def delete(self, ids):
+        with self._lock, self._conn:
+            self._delete_locked(list(ids))
+
+    def update_metadata(self, ids, metadatas):
+        """Replaces the metadata stored with already indexed chunks (postings unchanged)."""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE docs SET metadata = ? WHERE id = ?", [(json.dumps(meta or {}), doc_id) for doc_id, meta in zip(ids, metadatas)]
+            )
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def search(self, query, k=20, where=None):
+        """Returns [(id, bm25_score)] best first, only over chunks matching a Chroma `where` filter if given."""
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+        filter_sql, filter_params = where_sql(where) if where else ("1", [])
+        with self._lock:
+            n_docs, total_length = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(length), 0) FROM docs").fetchone()
+            if not n_docs:
+                return []
+            avg_length = total_length / n_docs
+            scores = Counter()
+            for term in terms:
+                rows = self._conn.execute(
+                    f"SELECT p.doc_id, p.tf, d.length FROM postings p JOIN docs d ON d.id = p.doc_id WHERE p.term = ? AND {filter_sql}",
+                    [term, *filter_params]
+                ).fetchall()
+                if not rows:
+                    continue
+                # Document frequency over the whole index, not just the filtered chunks
+                df = self._conn.execute("SELECT COUNT(*) FROM postings WHERE term = ?", (term,)).fetchone()[0] if where else len(rows)
+                idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                for doc_id, tf, length in rows:
+                    norm = tf + self.k1 * (1 - self.b + self.b * length / avg_length)
+                    scores[doc_id] += idf * tf * (self.k1 + 1) / norm
+        return scores.most_common(k)
+
+    def coverage(self, query, ids):
+        """
+        Returns {id: share of the query's idf weight found in that chunk} (0-1) for the given ids.
+        Terms missing from the index still count, so a chunk only covers a query it really matches.
+        """
+        terms = set(tokenize(query))
+        ids = list(ids)
+        if not terms or not ids:
+            return {}
+        marks = ",".join("?" * len(ids))
+        found = Counter()
+        total = 0.0
+        with self._lock:
+            n_docs = self._conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+            for term in terms:
+                df = self._conn.execute("SELECT COUNT(*) FROM postings WHERE term = ?", (term,)).fetchone()[0]
+                idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                total += idf
+                for (doc_id,) in self._conn.execute(
+                    f"SELECT doc_id FROM postings WHERE term = ? AND doc_id IN ({marks})", [term, *ids]
+                ):
+                    found[doc_id] += idf
+        return {doc_id: found[doc_id] / total for doc_id in ids} if total else {}
+
+    def get(self, ids):
+        """Returns {id: (text, metadata)} for the given ids."""
+        ids = list(ids)
+        if not ids:
+            return {}
+        marks = ",".join("?" * len(ids))
+        with self._lock:
+            rows = self._conn.execute(f"SELECT id, text, metadata FROM docs WHERE id IN ({marks})", ids).fetchall()
+        return {doc_id: (text, json.loads(meta)) for doc_id, text, meta in rows}
+
+    def backfill(self, collection, page_size=1000):
+        """Indexes every chunk already in a Chroma collection (first start after upgrading)."""
+        offset = 0
+        while True:
+            page = collection.get(include=["documents", "metadatas"], limit=page_size, offset=offset)
+            if not page["ids"]:
+                return offset
+            self.add(page["ids"], page["documents"], page["metadatas"])
+            offset += len(page["ids"])
+
+
+_lexical_index = None
+_lexical_lock = threading.Lock()
+
+
+def get_lexical_index():
+    """The index for the main collection, backfilled from Chroma the first time it is opened empty."""
+    global _lexical_index
+    if _lexical_index is None:
+        with _lexical_lock:
+            if _lexical_index is None:
+                index = LexicalIndex(config.LEXICAL_INDEX_PATH)
+                if index.count() == 0:
+                    from vector_store import vector_stores
+                    collections = [store._collection for store in vector_stores() if store._collection.count()]
+                    if collections:
+                        print("⏳ Building BM25 index from the vector store...")
+                        print(f"✅ BM25 index built ({sum(index.backfill(c) for c in collections)} chunks)")
+                _lexical_index = index
+    return _lexical_index
@@ -1,14 +1,21 @@
-# Import torch first to initialize CUDA DLLs
-import torch
+# torch is imported by the model loaders on first use (see ingestion.py / vector_store.py)
 import os
 
 os.environ["KMP_DUPLICATE_LIB_OK"] = "TRUE"
 
 # Standard Imports
-import shutil
+import asyncio
+import contextlib
+import json
+import threading
+import time
+import uuid
 import uvicorn
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
+from datetime import datetime, timedelta
+from typing import Optional
+from fastapi import FastAPI, Form, HTTPException, Request, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 import sys
 import types
 
@@ -21,8 +28,20 @@ except: pass
 
 # Custom Modules
 from ingestion import ingestion_engine
-from vector_store import get_vector_store
-from agent_engine import agent_app
+from vector_store import vector_stores, get_embedding_service, embedding_service_stats, add_write_listener, get_client, collection_names, index_stats, knowledge_base_precision
+from quantized_index import quantized_index_stats
+from agent_engine import agent_app, stream_agent
+import config
+import metrics
+from executor import embed_pool, llm_pool, query_pool, pool_stats, shutdown_pools, PoolSaturated
+from jobs import job_store, job_runner, QUEUED, RUNNING, SUCCEEDED, FAILED
+from pipelines import run_audio_job, run_image_job, run_images_job, run_text_job, run_scan_job, run_reindex_job, run_migrate_job, cached_media_result
+from documents import SUPPORTED_DOCUMENTS
+from answer_cache import answer_cache
+from corrections import corrections
+from media_cache import media_cache
+from web_search import web_search
+from uploads import spool_upload, remove_upload, payload_paths, sweep_orphans
 
 app = FastAPI(title="Omni-Scribe API")
 
@@ -33,232 +52,460 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize Database
-try:
-    vector_db = get_vector_store()
-except Exception as e:
-    print(f"⚠️ Vector DB Init Warning: {e}")
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    # Streaming responses are timed until their headers are sent; their stages are timed separately
+    started = time.perf_counter()
+    metrics.HTTP_IN_FLIGHT.inc()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        metrics.HTTP_IN_FLIGHT.dec()
+        route = request.scope.get("route")
+        endpoint = request.scope.get("endpoint")
+        name = route.path if route else endpoint.__name__ if endpoint else "unmatched"
+        metrics.HTTP_SECONDS.labels(request.method, name, status).observe(time.perf_counter() - started)
 
-@app.get("/")
-def health_check():
-    return {"status": "Omni-Scribe Brain is Active 🧠"}
+def require_role(role):
+    """Route dependency: 404 on replicas whose OMNISCRIBE_ROLE doesn't serve `role`."""
+    def check():
+        if not config.role_enabled(role):
+            raise HTTPException(status_code=404, detail=f"This replica runs in '{config.OMNISCRIBE_ROLE}' mode and does not serve {role} requests")
+    return Depends(check)
+
+CHAT = [require_role("chat")]
+INGEST = [require_role("ingest")]
+
+@app.exception_handler(PoolSaturated)
+async def pool_saturated_handler(request: Request, exc: PoolSaturated):
+    # Backpressure: tell the client to come back instead of piling onto a busy pool
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc), "pool": exc.pool_name},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+# Any change to the knowledge base (ingest, re-scan, feedback) makes cached answers stale
+add_write_listener(answer_cache.invalidate)
+
+# Background ingestion jobs
+job_runner.register("audio", run_audio_job)
+job_runner.register("image", run_image_job)
+job_runner.register("images", run_images_job)
+job_runner.register("text", run_text_job)
+job_runner.register("scan", run_scan_job)
+job_runner.register("reindex", run_reindex_job)
+job_runner.register("migrate", run_migrate_job)
+
+_warmup_task = None
 
-@app.post("/ingest/audio")
-async def ingest_audio(file: UploadFile = File(...)):
-    temp_path = f"temp_{file.filename}"
+def _warm_up_models():
+    """Loads the models this replica's role needs, so the first request doesn't pay for it."""
     try:
-        with open(temp_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        print(f"🎤 Transcribing {file.filename}...")
-        text = ingestion_engine.transcribe_audio(temp_path)
-        
-        vector_db.add_texts(texts=[text], metadatas=[{"source": "audio", "filename": file.filename}])
-        return {"status": "success", "text_snippet": text[:100] + "..."}
-        
+        vector_stores()
+        get_embedding_service().embed_query("warm up")
+        if config.role_enabled("chat") and config.CORRECTIONS_ENABLED:
+            corrections.db  # Opens the corrections index (moving legacy corrections over once)
+        if config.role_enabled("ingest"):
+            ingestion_engine.warm_up()
+        print("🔥 Models warmed up")
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
+        print(f"⚠️ Warm-up Warning: {e}")
+
+@app.on_event("startup")
+async def on_startup():
+    global _warmup_task
+    if config.role_enabled("ingest"):
+        keep = [path for payload in job_store.active_payloads() for path in payload_paths(payload)]
+        swept = sweep_orphans(keep)
+        if swept:
+            print(f"🧹 Removed {swept} orphaned upload(s)")
+        await job_runner.start()
+    # Warm-up runs in the background: the server accepts requests immediately
+    if config.WARMUP_ON_STARTUP:
+        _warmup_task = asyncio.create_task(asyncio.to_thread(_warm_up_models))
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    if config.role_enabled("ingest"):
+        await job_runner.stop()
+    shutdown_pools()
 
-@app.post("/ingest/image")
-async def ingest_image(file: UploadFile = File(...)):
-    temp_path = f"temp_{file.filename}"
+@app.get("/")
+def health_check():
+    return {
+        "status": "Omni-Scribe Brain is Active 🧠",
+        "role": config.OMNISCRIBE_ROLE,
+        "models_loaded": {**ingestion_engine.loaded(), "embeddings": embedding_service_stats().get("loaded", True)}
+    }
+
+@app.get("/pools")
+def get_pool_stats():
+    """Reports in-flight, waiting and rejected work for each worker pool."""
+    return pool_stats()
+
+@app.get("/cache")
+def get_cache_stats():
+    """Hit/miss statistics for the answer, correction, embedding, media and web-result lookups."""
+    return {
+        "answers": answer_cache.stats(),
+        "corrections": corrections.stats(),
+        "embeddings": embedding_service_stats(),
+        "media": media_cache.stats(),
+        "web": web_search.stats()
+    }
+
+@app.get("/admin/index")
+def get_index_stats():
+    """
+    Vectors and HNSW settings (built with vs configured) per Chroma collection, plus the reduced-precision
+    index and where the knowledge base is stored (differs from VECTOR_PRECISION until a migration has run).
+    """
+    return {
+        **index_stats(),
+        "quantized": quantized_index_stats(),
+        "knowledge_base": {"stored_as": knowledge_base_precision(), "configured": config.VECTOR_PRECISION}
+    }
+
+@app.post("/admin/index/rebuild", status_code=202, dependencies=INGEST)
+async def rebuild_index(collection: Optional[str] = Form(None)):
+    """
+    Rebuilds one collection (or all) with its configured HNSW settings as a background job,
+    reclaiming space left by deleted vectors. Writes wait while a collection is copied.
+    """
+    names = collection_names(get_client(config.VECTOR_DB_PATH))
+    if collection is not None and collection not in names:
+        raise HTTPException(status_code=404, detail=f"Unknown collection: {collection}")
+    job = job_runner.submit("reindex", {"collections": [collection] if collection else sorted(names)},
+                            filename=collection or "All collections")
+    return {"status": "queued", "job_id": job["id"]}
+
+@app.post("/admin/index/migrate", status_code=202, dependencies=INGEST)
+def migrate_index():
+    """
+    Moves the knowledge base into the store VECTOR_PRECISION asks for, as a background job.
+    Until it has run, a changed VECTOR_PRECISION keeps serving the chunks from where they are.
+    """
+    current = knowledge_base_precision()
+    if current == config.VECTOR_PRECISION:
+        raise HTTPException(status_code=409, detail=f"The knowledge base is already stored as {current}")
+    job = job_runner.submit("migrate", {}, filename=f"{current} -> {config.VECTOR_PRECISION}")
+    return {"status": "queued", "job_id": job["id"]}
+
+def _job_counts():
+    return {status: job_store.count(status) for status in (QUEUED, RUNNING, SUCCEEDED, FAILED)}
+
+if config.METRICS_ENABLED:
+    metrics.register_stats(pool_stats, get_cache_stats, _job_counts)
+
+    @app.get("/metrics")
+    def get_metrics():
+        """Prometheus scrape endpoint: stage latencies, queue waits, token/chunk counters, pools, caches, jobs."""
+        body, content_type = metrics.render()
+        return Response(content=body, media_type=content_type)
+
+def _with_trace(body, trace):
+    return {**body, "trace": trace.to_dict()} if trace is not None else body
+
+async def _corrected_answer(query):
+    """The human correction for this question as a /chat answer, or None."""
+    if not config.CORRECTIONS_ENABLED:
+        return None
+    correction, similarity = await query_pool.run(corrections.lookup, query)
+    if correction is None:
+        return None
+    print(f"✅ Answered from a human correction (similarity {similarity:.2f})")
+    return {
+        "answer": correction["answer"],
+        "context_used": [f"[HUMAN CORRECTION]: Question: {correction['question']}\nAnswer: {correction['answer']}"],
+        "sources": [0],
+        "corrected": True,
+        "similarity": similarity
+    }
+
+def _single_event_stream(data):
+    async def stream():
+        yield f"event: final\ndata: {json.dumps(data)}\n\n"
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"X-Accel-Buffering": "no"})
+
+def _parse_time(value, field, end_of_day=False):
+    """Epoch seconds, or an ISO date/datetime (a bare date as `until` covers the whole day)."""
     try:
-        with open(temp_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-            
-        print(f"👁️ Analyzing Image {file.filename}...")
-        text = ingestion_engine.extract_text_from_image(temp_path)
-        
-        vector_db.add_texts(texts=[text], metadatas=[{"source": "image", "filename": file.filename}])
-        return {"status": "success", "extracted_text": text[:100] + "..."}
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{field} must be an ISO date/datetime or epoch seconds")
+    if end_of_day and len(value) == 10:
+        moment += timedelta(days=1, microseconds=-1)
+    return moment.timestamp()
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
+def chat_filters(
+    source: Optional[str] = Form(None),
+    filename: Optional[str] = Form(None),
+    path_prefix: Optional[str] = Form(None),
+    since: Optional[str] = Form(None),
+    until: Optional[str] = Form(None)
+):
+    """
+    Optional /chat scope, pushed down into Chroma as a `where` clause: comma-separated source types
+    (audio, image, document, knowledge_folder) and filenames, a folder path prefix, and an ingestion
+    date range. Returns None when unscoped.
+    """
+    def split(value):
+        return [part.strip() for part in value.split(",") if part.strip()] if value else None
 
-@app.post("/chat")
-async def chat(query: str = Form(...)):
-    print(f"💬 Processing Query: {query}")
-    inputs = {"query": query, "context": [], "response": "", "is_sufficient": False}
-    
-    # Trigger LangGraph workflow
-    result = agent_app.invoke(inputs)
+    filters = {
+        "source": split(source),
+        "filename": split(filename),
+        "path_prefix": path_prefix or None,
+        "since": _parse_time(since, "since") if since else None,
+        "until": _parse_time(until, "until", end_of_day=True) if until else None
+    }
+    return {key: value for key, value in filters.items() if value is not None} or None
+
+async def _cached_answer(query, filters=None):
+    """Returns (answer or None, cache_kind, token) where token is passed to _remember_answer."""
+    # Answers are cached per question, not per scope
+    if not config.ANSWER_CACHE_ENABLED or filters:
+        return None, None, None
+    answer, kind, generation, embedding = await query_pool.run(answer_cache.lookup, query)
+    return answer, kind, (generation, embedding)
+
+def _remember_answer(query, answer, token):
+    # Only cache real answers; "nothing found" should be retried once new content arrives
+    if token is not None and answer["context_used"]:
+        answer_cache.store(query, answer, *token)
+
+@app.post("/chat", dependencies=CHAT)
+async def chat(query: str = Form(...), trace: bool = Form(False), filters: Optional[dict] = Depends(chat_filters)):
+    print(f"💬 Processing Query: {query}" + (f" (filters: {filters})" if filters else ""))
+
+    with metrics.tracing(trace) as request_trace:
+        # Human corrections win over everything, including previously cached answers
+        corrected = await _corrected_answer(query)
+        if corrected is not None:
+            return _with_trace(corrected, request_trace)
+
+        cached, cache_kind, cache_token = await _cached_answer(query, filters)
+        if cached is not None:
+            print(f"⚡ Answer cache hit ({cache_kind})")
+            return _with_trace({**cached, "cached": cache_kind}, request_trace)
+
+        inputs = {"query": query, "context": [], "response": "", "is_sufficient": False, "filters": filters}
+
+        # Trigger LangGraph workflow
+        result = await llm_pool.run(agent_app.invoke, inputs)
 
     print(f"🤖 AI Response: {result['response']}")
     print("-" * 50)
     
-    return {
+    answer = {
         "answer": result["response"],
         "context_used": result["context"]
     }
+    _remember_answer(query, answer, cache_token)
+    # Per-request prompt accounting, not cached with the answer
+    return _with_trace({**answer, "context_tokens": result.get("packing")}, request_trace)
+
+@app.post("/chat/stream", dependencies=CHAT)
+async def chat_stream(query: str = Form(...), trace: bool = Form(False), filters: Optional[dict] = Depends(chat_filters)):
+    """
+    Streams the answer as Server-Sent Events: 'token' events while the LLM generates,
+    'status'/'reset' events around retrieval and web research, then one 'final' event
+    with the cleaned answer, cited source indices and source list (plus the trace if asked for).
+    """
+    print(f"💬 Streaming Query: {query}" + (f" (filters: {filters})" if filters else ""))
+
+    corrected = await _corrected_answer(query)
+    if corrected is not None:
+        return _single_event_stream(corrected)
+
+    cached, cache_kind, cache_token = await _cached_answer(query, filters)
+    if cached is not None:
+        print(f"⚡ Answer cache hit ({cache_kind})")
+        return _single_event_stream({**cached, "cached": cache_kind})
+
+    llm_pool.check_capacity()
 
-@app.post("/feedback")
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue()
+    cancelled = threading.Event()
+    request_trace = metrics.Trace() if trace else None
+
+    def produce():
+        # Runs on the LLM pool; hands events to the event loop as they are generated
+        try:
+            with metrics.attach(request_trace), contextlib.closing(stream_agent(query, filters)) as stream:
+                for event in stream:
+                    if cancelled.is_set():
+                        break
+                    loop.call_soon_threadsafe(events.put_nowait, event)
+        except Exception as e:
+            loop.call_soon_threadsafe(events.put_nowait, ("error", {"detail": str(e)}))
+        finally:
+            loop.call_soon_threadsafe(events.put_nowait, None)
+
+    async def event_stream():
+        producer = asyncio.ensure_future(llm_pool.run(produce, block=True))
+        producer.add_done_callback(lambda _: events.put_nowait(None))
+        try:
+            while (event := await events.get()) is not None:
+                name, data = event
+                if name == "final":
+                    _remember_answer(query, {"answer": data["answer"], "context_used": data["context_used"], "sources": data["sources"]}, cache_token)
+                    data = _with_trace(data, request_trace)
+                yield f"event: {name}\ndata: {json.dumps(data)}\n\n"
+        finally:
+            # Client went away: stop pulling tokens from Ollama
+            cancelled.set()
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers={"X-Accel-Buffering": "no"})
+
+@app.post("/feedback", dependencies=CHAT)
 async def learn_from_feedback(
     original_query: str = Form(...), 
     correct_answer: str = Form(...)
 ):
     """
     Implements the Self-Learning Memory System.
-    Ingests human corrections as 'High Priority' context.
+    Stores the human correction in the corrections index (replacing any earlier answer to
+    the same question); from now on /chat answers that question straight from it.
     """
     print(f"🧠 Self-Learning triggered for: {original_query}")
     
-    # Create a synthetic document with the correction
-    learning_text = f"[HUMAN CORRECTION] Question: {original_query}\nAnswer: {correct_answer}"
+    correction_id = await query_pool.run(corrections.upsert, original_query, correct_answer)
+    # Cached answers to this question are now wrong
+    answer_cache.invalidate()
     
-    # Save to Vector DB immediately
-    vector_db.add_texts(
-        texts=[learning_text],
-        metadatas=[{"source": "human_feedback", "type": "correction"}]
-    )
-    
-    return {"status": "learned", "message": "Memory updated. I won't make that mistake again."}
+    return {"status": "learned", "id": correction_id, "message": "Memory updated. I won't make that mistake again."}
+
+def _check_queue_depth():
+    if job_store.count(QUEUED) >= config.JOB_MAX_QUEUED:
+        raise HTTPException(status_code=429, detail="Ingestion queue is full. Please retry later.", headers={"Retry-After": "30"})
+
+def _upload_body(field, many=False):
+    """OpenAPI request body for the ingest endpoints, which read their multipart body themselves."""
+    schema = {"type": "string", "format": "binary"}
+    if many:
+        schema = {"type": "array", "items": schema}
+    return {"requestBody": {"required": True, "content": {"multipart/form-data": {"schema": {
+        "type": "object", "required": [field], "properties": {field: schema}
+    }}}}}
+
+async def _enqueue_upload(kind, request, extensions=None, **payload):
+    _check_queue_depth()
+    job_id = uuid.uuid4().hex
+    [upload] = await spool_upload(request, kind, job_id, extensions=extensions)
+    payload["path"], payload["sha256"], filename = upload["path"], upload["sha256"], upload["filename"]
+
+    if kind in ("audio", "image"):
+        # Same bytes already extracted and indexed: answer now with an already finished job
+        try:
+            result = await embed_pool.run(cached_media_result, kind, payload["sha256"], block=True)
+        except BaseException:
+            remove_upload(payload["path"])
+            raise
+        if result is not None:
+            remove_upload(payload["path"])
+            print(f"♻️ Duplicate upload {filename}, served from the media cache")
+            job = job_store.create_finished(kind, {"sha256": payload["sha256"]}, result, filename=filename, job_id=job_id)
+            return JSONResponse({"status": "cached", "job_id": job["id"], "filename": filename, "result": result})
+    if kind == "text":
+        payload["file_ext"] = os.path.splitext(filename)[1].lower()
+
+    job = job_runner.submit(kind, payload, filename=filename, job_id=job_id)
+    return {"status": "queued", "job_id": job["id"], "filename": filename}
+
+@app.post("/ingest/audio", status_code=202, dependencies=INGEST, openapi_extra=_upload_body("file"))
+async def ingest_audio(request: Request):
+    return await _enqueue_upload("audio", request)
 
-@app.post("/ingest/text")
-async def ingest_text(file: UploadFile = File(...)):
+@app.post("/ingest/image", status_code=202, dependencies=INGEST, openapi_extra=_upload_body("file"))
+async def ingest_image(request: Request):
+    return await _enqueue_upload("image", request)
+
+@app.post("/ingest/images", status_code=202, dependencies=INGEST, openapi_extra=_upload_body("files", many=True))
+async def ingest_images(request: Request):
+    """
+    Queues many images as a single batch OCR job: decoded in parallel ahead of PaddleOCR,
+    which reads them one at a time, and written to the knowledge base in bulk. One oversized image rejects the whole batch.
+    """
+    _check_queue_depth()
+    job_id = uuid.uuid4().hex
+    uploads = await spool_upload(request, "image", job_id, max_files=config.OCR_MAX_BATCH_FILES)
+    spooled = [{"path": item["path"], "sha256": item["sha256"], "filename": item["filename"]} for item in uploads]
+    job = job_runner.submit("images", {"files": spooled}, filename=f"{len(spooled)} images", job_id=job_id)
+    return {"status": "queued", "job_id": job["id"], "files": len(spooled)}
+
+@app.post("/ingest/text", status_code=202, dependencies=INGEST, openapi_extra=_upload_body("file"))
+async def ingest_text(request: Request):
     """
     Ingest document files (.txt, .md, .pdf, .docx) into the knowledge base.
     Splits large files into chunks for better retrieval.
     """
-    # Validate file type
-    allowed_extensions = ['.txt', '.md', '.pdf', '.docx']
-    file_ext = os.path.splitext(file.filename)[1].lower()
-    if file_ext not in allowed_extensions:
-        raise HTTPException(status_code=400, detail=f"Only {allowed_extensions} files are supported")
-    
-    try:
-        # Read file content based on type
-        content = await file.read()
-        
-        if file_ext in ['.txt', '.md']:
-            text = content.decode('utf-8')
-        elif file_ext == '.pdf':
-            from pypdf import PdfReader
-            import io
-            pdf_reader = PdfReader(io.BytesIO(content))
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-        elif file_ext == '.docx':
-            from docx import Document
-            import io
-            doc = Document(io.BytesIO(content))
-            text = "\n".join([para.text for para in doc.paragraphs])
-        
-        print(f"📄 Processing document: {file.filename} ({len(text)} chars)")
-        
-        # Split into chunks if large (>1000 chars per chunk)
-        chunk_size = 1000
-        chunks = []
-        if len(text) > chunk_size:
-            # Split by paragraphs first, then by size
-            paragraphs = text.split('\n\n')
-            current_chunk = ""
-            for para in paragraphs:
-                if len(current_chunk) + len(para) < chunk_size:
-                    current_chunk += para + "\n\n"
-                else:
-                    if current_chunk:
-                        chunks.append(current_chunk.strip())
-                    current_chunk = para + "\n\n"
-            if current_chunk:
-                chunks.append(current_chunk.strip())
-        else:
-            chunks = [text]
-        
-        # Add to vector DB
-        for i, chunk in enumerate(chunks):
-            tagged_text = f"[DOCUMENT - {file_ext.upper()}]: {chunk}"
-            vector_db.add_texts(
-                texts=[tagged_text], 
-                metadatas=[{"source": "document", "type": file_ext, "filename": file.filename, "chunk": i}]
-            )
-        
-        return {
-            "status": "success", 
-            "filename": file.filename,
-            "file_type": file_ext,
-            "chunks_created": len(chunks),
-            "text_snippet": text[:100] + "..." if len(text) > 100 else text
-        }
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return await _enqueue_upload("text", request, extensions=SUPPORTED_DOCUMENTS)
 
-@app.post("/ingest/scan")
+@app.post("/ingest/scan", status_code=202, dependencies=INGEST)
 async def scan_knowledge_folder():
     """
     Scan the knowledge folder and ingest all document files.
     Supports: .txt, .md, .pdf, .docx
     Directory: D:\\AIML-Projects\\OmniScribe\\knowledge
     """
-    import config
-    import glob
-    
-    knowledge_dir = config.KNOWLEDGE_DIR
-    
-    if not os.path.exists(knowledge_dir):
-        os.makedirs(knowledge_dir)
-        return {"status": "created", "message": f"Created empty knowledge folder at {knowledge_dir}", "files_processed": 0}
-    
-    # Find all document files
-    patterns = ['*.txt', '*.md', '*.pdf', '*.docx']
-    files_found = []
-    for pattern in patterns:
-        files_found.extend(glob.glob(os.path.join(knowledge_dir, pattern)))
-    
-    if not files_found:
-        return {"status": "empty", "message": "No document files found in knowledge folder", "files_processed": 0}
-    
-    processed = []
-    errors = []
-    
-    for filepath in files_found:
-        try:
-            filename = os.path.basename(filepath)
-            file_ext = os.path.splitext(filename)[1].lower()
-            
-            # Extract text based on file type
-            if file_ext in ['.txt', '.md']:
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    text = f.read()
-            elif file_ext == '.pdf':
-                from pypdf import PdfReader
-                pdf_reader = PdfReader(filepath)
-                text = ""
-                for page in pdf_reader.pages:
-                    text += page.extract_text() + "\n"
-            elif file_ext == '.docx':
-                from docx import Document
-                doc = Document(filepath)
-                text = "\n".join([para.text for para in doc.paragraphs])
-            else:
-                continue
-            
-            print(f"📂 Scanning: {filename} ({len(text)} chars)")
-            
-            # Add to vector DB with file tag
-            tagged_text = f"[DOCUMENT - {filename}]: {text}"
-            vector_db.add_texts(
-                texts=[tagged_text], 
-                metadatas=[{"source": "knowledge_folder", "type": file_ext, "filename": filename, "path": filepath}]
-            )
-            processed.append(filename)
-            
-        except Exception as e:
-            errors.append({"file": filename, "error": str(e)})
-    
-    return {
-        "status": "success",
-        "files_processed": len(processed),
-        "files": processed,
-        "errors": errors if errors else None
-    }
+    _check_queue_depth()
+    job = job_runner.submit("scan", {}, filename="Knowledge Folder")
+    return {"status": "queued", "job_id": job["id"]}
+
+@app.get("/jobs", dependencies=INGEST)
+def list_jobs(status: Optional[str] = None, limit: int = 50):
+    """Lists recent ingestion jobs, newest first."""
+    return {"jobs": job_store.list(status=status, limit=min(limit, 500))}
+
+@app.get("/jobs/{job_id}", dependencies=INGEST)
+def get_job(job_id: str):
+    """Reports stage, progress, timing, result and error for one ingestion job."""
+    job = job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/jobs/{job_id}/events", dependencies=INGEST)
+async def stream_job_events(job_id: str, format: str = "sse"):
+    """
+    Streams a job's progress events (one per scanned file) as they happen, then a final
+    'done' event with the job record. format=sse (default) or format=ndjson.
+    """
+    if job_store.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    def encode(event_type, data):
+        if format == "ndjson":
+            return json.dumps({"event": event_type, **data}) + "\n"
+        return f"event: {event_type}\ndata: {json.dumps(data)}\n\n"
+
+    async def event_stream():
+        last_id = 0
+        while True:
+            # Read status first so no event written before completion is missed
+            job = job_store.get(job_id)
+            events = job_store.events_since(job_id, last_id)
+            for event in events:
+                last_id = event["id"]
+                yield encode("progress", event)
+            if job["status"] in (SUCCEEDED, FAILED) and len(events) < 500:
+                yield encode("done", job)
+                return
+            if not events:
+                await asyncio.sleep(0.5)
+
+    media_type = "application/x-ndjson" if format == "ndjson" else "text/event-stream"
+    return StreamingResponse(event_stream(), media_type=media_type, headers={"X-Accel-Buffering": "no"})
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
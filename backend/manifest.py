@@ -0,0 +1,74 @@
+import sqlite3
+import threading
+import time
+
+import config
+from lazy_sqlite import LazyConnection
+
+
+class ScanManifest:
+    """
+    Index of knowledge-folder files already ingested, keyed by path.
+    size + mtime is the fast pre-check; the SHA-256 decides whether content really changed.
+    """
+
+    _conn = LazyConnection(sqlite3.Row)
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _create_schema(conn):
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                size INTEGER,
+                mtime REAL,
+                sha256 TEXT,
+                chunks INTEGER,
+                ingested_at REAL,
+                dirs INTEGER DEFAULT 0
+            )
+        """)
+        # Manifests from before chunks carried their directories (see chunking.directory_fields)
+        if "dirs" not in [column[1] for column in conn.execute("PRAGMA table_info(files)")]:
+            conn.execute("ALTER TABLE files ADD COLUMN dirs INTEGER DEFAULT 0")
+
+    def get(self, path):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM files WHERE path = ?", (path,)).fetchone()
+        return dict(row) if row else None
+
+    def paths(self):
+        with self._lock:
+            return [r["path"] for r in self._conn.execute("SELECT path FROM files")]
+
+    def record(self, path, size, mtime, sha256, chunks):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files (path, size, mtime, sha256, chunks, ingested_at, dirs) VALUES (?, ?, ?, ?, ?, ?, 1)",
+                (path, size, mtime, sha256, chunks, time.time())
+            )
+
+    def touch(self, path, size, mtime):
+        """Content unchanged (same hash) but stat moved on: refresh the fast pre-check."""
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE files SET size = ?, mtime = ? WHERE path = ?", (size, mtime, path))
+
+    def mark_directories(self, path):
+        """The file's chunks now carry their directory fields."""
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE files SET dirs = 1 WHERE path = ?", (path,))
+
+    def remove(self, path):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM files WHERE path = ?", (path,))
+
+
+def stat_matches(entry, st):
+    """Fast pre-check: same size and mtime as when the file was last ingested."""
+    return entry is not None and entry["size"] == st.st_size and entry["mtime"] == st.st_mtime
+
+
+scan_manifest = ScanManifest(config.SCAN_MANIFEST_PATH)
@@ -0,0 +1,91 @@
+import json
+import os
+import threading
+import uuid
+
+import config
+
+
+class MediaCache:
+    """
+    Content-addressed store of extraction results (transcripts, OCR text) keyed by the
+    SHA-256 of the uploaded bytes, so a re-upload never goes through Whisper/PaddleOCR
+    again. One JSON file per entry; once the directory exceeds `max_bytes` the least
+    recently used entries are evicted.
+    """
+
+    def __init__(self, directory, max_bytes, enabled=True):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _path(self, kind, sha256):
+        return os.path.join(self.directory, f"{kind}-{sha256}.json")
+
+    def get(self, kind, sha256):
+        if not self.enabled or not sha256:
+            return None
+        path = self._path(kind, sha256)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(path)  # mtime doubles as the LRU clock
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return entry
+
+    def put(self, kind, sha256, result):
+        if not self.enabled or not sha256:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(kind, sha256)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(result, f)
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def _entries(self):
+        try:
+            with os.scandir(self.directory) as it:
+                return [(e.path, e.stat()) for e in it if e.name.endswith(".json")]
+        except FileNotFoundError:
+            return []
+
+    def _evict(self):
+        with self._lock:
+            entries = self._entries()
+            total = sum(st.st_size for _, st in entries)
+            for path, st in sorted(entries, key=lambda e: e[1].st_mtime):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= st.st_size
+                self.evictions += 1
+
+    def stats(self):
+        entries = self._entries()
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "entries": len(entries),
+                "bytes": sum(st.st_size for _, st in entries),
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+media_cache = MediaCache(config.MEDIA_CACHE_DIR, config.MEDIA_CACHE_MAX_MB * 1024 * 1024, config.MEDIA_CACHE_ENABLED)
@@ -0,0 +1,168 @@
+"""
+Prometheus instrumentation and opt-in per-request traces.
+`stage(name)` times a block into omniscribe_stage_seconds{stage} and tracks how many
+calls are inside it; if a trace is active (tracing()), the span is recorded there too.
+Cache, pool and job-queue figures are read from the existing stats() at scrape time.
+"""
+import contextlib
+import contextvars
+import functools
+import threading
+import time
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest, REGISTRY
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+STAGE_SECONDS = Histogram("omniscribe_stage_seconds", "Time spent per pipeline stage", ["stage"], buckets=BUCKETS)
+STAGE_IN_FLIGHT = Gauge("omniscribe_stage_in_flight", "Calls currently inside a stage", ["stage"])
+QUEUE_WAIT_SECONDS = Histogram(
+    "omniscribe_queue_wait_seconds", "Time work waited for a worker-pool slot or the job runner", ["queue"], buckets=BUCKETS
+)
+HTTP_SECONDS = Histogram("omniscribe_http_request_seconds", "HTTP request latency", ["method", "route", "status"], buckets=BUCKETS)
+HTTP_IN_FLIGHT = Gauge("omniscribe_http_in_flight", "HTTP requests being served")
+LLM_TOKENS = Counter("omniscribe_llm_tokens_total", "LLM tokens: prompt (in) and generated (out)", ["direction"])
+CONTEXT_TOKENS = Counter("omniscribe_context_tokens_total", "Retrieved-context tokens before (raw) and after (packed) packing", ["kind"])
+CHUNKS_WRITTEN = Counter("omniscribe_chunks_written_total", "Chunks upserted into the vector store")
+AUDIO_SECONDS = Counter("omniscribe_audio_seconds_total", "Seconds of audio transcribed")
+IMAGES_OCR = Counter("omniscribe_images_ocr_total", "Images run through OCR")
+JOBS = Counter("omniscribe_jobs_total", "Finished ingestion jobs", ["kind", "status"])
+
+_trace = contextvars.ContextVar("omniscribe_trace", default=None)
+
+
+class Trace:
+    """Spans (stage, start offset, duration) recorded for one request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def add(self, name, started, seconds):
+        with self._lock:
+            self.spans.append({
+                "stage": name,
+                "start_ms": round((started - self.started) * 1000, 1),
+                "ms": round(seconds * 1000, 1),
+            })
+
+    def to_dict(self):
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span["start_ms"])
+        return {"total_ms": round((time.perf_counter() - self.started) * 1000, 1), "spans": spans}
+
+
+@contextlib.contextmanager
+def attach(trace):
+    """Records every stage() below this point (same thread, or pool work started from it) into `trace` (None: no-op)."""
+    if trace is None:
+        yield None
+        return
+    token = _trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _trace.reset(token)
+
+
+def tracing(enabled=True):
+    """attach() a new Trace when enabled."""
+    return attach(Trace() if enabled else None)
+
+
+@contextlib.contextmanager
+def stage(name):
+    started = time.perf_counter()
+    gauge = STAGE_IN_FLIGHT.labels(name)
+    gauge.inc()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        gauge.dec()
+        STAGE_SECONDS.labels(name).observe(seconds)
+        trace = _trace.get()
+        if trace is not None:
+            trace.add(name, started, seconds)
+
+
+def timed(name):
+    """Decorator form of stage()."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def timed_iter(iterable, name):
+    """Yields from a lazy iterable, timing only the time spent producing items (one observation at the end)."""
+    started, busy = time.perf_counter(), 0.0
+    iterator = iter(iterable)
+    try:
+        while True:
+            t = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                busy += time.perf_counter() - t
+            yield item
+    finally:
+        STAGE_SECONDS.labels(name).observe(busy)
+        trace = _trace.get()
+        if trace is not None:
+            trace.add(name, started, busy)
+
+
+def record_llm_usage(message):
+    """Counts prompt/generated tokens from a LangChain message's usage_metadata (Ollama fills it in)."""
+    usage = getattr(message, "usage_metadata", None)
+    if usage:
+        LLM_TOKENS.labels("in").inc(usage.get("input_tokens", 0))
+        LLM_TOKENS.labels("out").inc(usage.get("output_tokens", 0))
+
+
+class StatsCollector:
+    """Exposes the pools' and caches' own stats() dicts at scrape time."""
+
+    def __init__(self, pool_stats, cache_stats, job_counts):
+        self.pool_stats = pool_stats
+        self.cache_stats = cache_stats
+        self.job_counts = job_counts
+
+    def collect(self):
+        in_flight = GaugeMetricFamily("omniscribe_pool_in_flight", "Calls running on a worker pool", labels=["pool"])
+        waiting = GaugeMetricFamily("omniscribe_pool_waiting", "Calls waiting for a worker-pool slot", labels=["pool"])
+        rejected = CounterMetricFamily("omniscribe_pool_rejected", "Calls rejected by a full worker pool (503)", labels=["pool"])
+        for name, stats in self.pool_stats().items():
+            in_flight.add_metric([name], stats["in_flight"])
+            waiting.add_metric([name], stats["waiting"])
+            rejected.add_metric([name], stats["rejected"])
+
+        lookups = CounterMetricFamily("omniscribe_cache_lookups", "Cache lookups by result", labels=["cache", "result"])
+        for name, stats in self.cache_stats().items():
+            hits = stats.get("hits")
+            if hits is None:
+                continue  # Not loaded yet
+            lookups.add_metric([name, "hit"], sum(hits.values()) if isinstance(hits, dict) else hits)
+            lookups.add_metric([name, "miss"], stats.get("misses", 0))
+
+        jobs = GaugeMetricFamily("omniscribe_jobs_by_status", "Ingestion jobs by status", labels=["status"])
+        for status, count in self.job_counts().items():
+            jobs.add_metric([status], count)
+        return [in_flight, waiting, rejected, lookups, jobs]
+
+
+def register_stats(pool_stats, cache_stats, job_counts):
+    REGISTRY.register(StatsCollector(pool_stats, cache_stats, job_counts))
+
+
+def render():
+    """(body, content type) for the /metrics endpoint."""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
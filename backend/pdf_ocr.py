@@ -0,0 +1,50 @@
+"""
+OCR fallback for scanned PDFs.
+Pages without a text layer are rasterized on the parse pool and recognized on the OCR pool.
+At most PDF_OCR_CONCURRENCY pages of a document are in flight, so memory stays bounded however
+many pages it has. Rendering runs concurrently; recognition takes one page at a time.
+"""
+import asyncio
+
+import config
+import metrics
+from chunking import chunk_document
+from documents import render_pdf_page
+from executor import parse_pool, ocr_pool
+from ingestion import ingestion_engine
+
+
+async def ocr_pdf_pages(path, pages, progress=None):
+    """OCRs the given 1-based pages of a PDF; returns {page: text}."""
+    slots = asyncio.Semaphore(config.PDF_OCR_CONCURRENCY)
+    page_texts = {}
+
+    async def ocr_page(number):
+        async with slots:
+            with metrics.stage("pdf_render"):
+                image = await parse_pool.run(render_pdf_page, path, number, block=True)
+            # Pages rendered while another is being recognized wait for the model (see ocr_image)
+            page_texts[number] = await ocr_pool.run(ingestion_engine.ocr_image, image, block=True)
+        if progress:
+            progress(len(page_texts), len(pages))
+
+    await asyncio.gather(*(ocr_page(number) for number in pages))
+    return page_texts
+
+
+async def chunk_document_with_ocr(path, ext, progress=None):
+    """
+    chunk_document() on the parse pool, plus OCR for PDF pages that have no text layer.
+    Returns (chunks, ocr_pages). `progress(done, total)` is called as scanned pages finish.
+    """
+    # Parsing and chunking are one streaming pass inside the parse process, timed from here
+    with metrics.stage("parse"):
+        chunks, scanned_pages = await parse_pool.run(chunk_document, path, ext, block=True)
+    if not scanned_pages or not config.PDF_OCR_ENABLED:
+        return chunks, 0
+
+    print(f"🖨️ {len(scanned_pages)} scanned page(s) in {path}, running OCR...")
+    page_texts = await ocr_pdf_pages(path, scanned_pages, progress)
+    with metrics.stage("parse"):
+        chunks, _ = await parse_pool.run(chunk_document, path, ext, page_texts, block=True)
+    return chunks, len(scanned_pages)
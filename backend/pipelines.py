@@ -0,0 +1,311 @@
+"""
+Ingestion pipelines executed by the job runner.
+Each pipeline is `async def run_x_job(job, progress)` and returns the job result.
+Blocking work always goes through the worker pools (block=True: background jobs
+wait for a slot instead of being rejected).
+"""
+import asyncio
+import contextlib
+import os
+import time
+import uuid
+
+import config
+from ingestion import ingestion_engine, AUDIO_TAG, IMAGE_TAG
+from chunking import chunk_text, chunk_metadata
+from pdf_ocr import chunk_document_with_ocr
+from vector_store import add_texts_bulk, existing_ids, rebuild_collection, knowledge_base_precision, migrate_knowledge_base
+from media_cache import media_cache
+from executor import audio_pool, ocr_pool, embed_pool
+from scanner import scan_folder
+from uploads import consuming
+
+
+def media_ids(kind, sha256, start, count):
+    """Content-addressed vector ids: re-indexing the same bytes upserts instead of duplicating."""
+    if not sha256:
+        return None
+    return [f"{kind}:{sha256}:{i}" for i in range(start, start + count)]
+
+
+def index_chunks(chunks, tag, ids=None, **base_metadata):
+    """Writes chunks (from chunking.py) with their semantic tag and position metadata."""
+    add_texts_bulk(
+        texts=[f"{tag}: {chunk['text']}" for chunk in chunks],
+        metadatas=[chunk_metadata(chunk, i, **base_metadata) for i, chunk in enumerate(chunks)],
+        ids=ids
+    )
+    return len(chunks)
+
+
+def _index_image_text(text, filename, sha256):
+    chunks = chunk_text(text)
+    return index_chunks(chunks, IMAGE_TAG, ids=media_ids("image", sha256, 0, len(chunks)), source="image", filename=filename)
+
+
+def _snippet(chunks):
+    text = chunks[0]["text"] if chunks else ""
+    return text[:100] + "..." if len(text) > 100 else text
+
+
+def _index_transcript_windows(windows, first_index, filename, sha256):
+    add_texts_bulk(
+        texts=[f"{AUDIO_TAG}: {window['text']}" for window in windows],
+        metadatas=[{
+            "source": "audio", "filename": filename, "chunk": first_index + i,
+            "start": window["start"], "end": window["end"]
+        } for i, window in enumerate(windows)],
+        ids=media_ids("audio", sha256, first_index, len(windows))
+    )
+
+
+def _short(text):
+    return text[:100] + "..." if len(text) > 100 else text
+
+
+def _audio_result(windows, cached=False):
+    return {
+        "status": "success",
+        "text_snippet": _short(windows[0]["text"] if windows else ""),
+        "chunks_created": len(windows),
+        "duration_seconds": windows[-1]["end"] if windows else 0.0,
+        "cached": cached
+    }
+
+
+def _image_result(text, cached=False):
+    return {"status": "success", "extracted_text": _short(text), "cached": cached}
+
+
+def cached_media_result(kind, sha256):
+    """
+    Job result for an upload whose bytes were already extracted AND indexed, or None.
+    Lets the endpoint answer a re-upload without queuing anything.
+    """
+    entry = media_cache.get(kind, sha256)
+    if entry is None or not existing_ids(media_ids(kind, sha256, 0, 1)):
+        return None
+    if kind == "audio":
+        return _audio_result(entry["windows"], cached=True)
+    return _image_result(entry["text"], cached=True)
+
+
+async def run_audio_job(job, progress):
+    """
+    Indexes the transcript window by window while Whisper is still decoding, so a long
+    recording becomes searchable progressively and memory stays flat. Bytes transcribed
+    before are re-indexed from the media cache without running Whisper.
+    """
+    payload = job["payload"]
+    filename = job["filename"]
+    sha256 = payload.get("sha256")
+    with consuming(payload["path"]):
+        cached = media_cache.get("audio", sha256)
+        if cached is not None:
+            progress("indexing cached transcript", 0.5)
+            await embed_pool.run(_index_transcript_windows, cached["windows"], 0, filename, sha256, block=True)
+            return _audio_result(cached["windows"], cached=True)
+
+        progress("transcribing", 0.0)
+        print(f"🎤 Transcribing {filename}...")
+        collected = []
+        windows = audio_pool.stream(ingestion_engine.iter_transcript_windows, payload["path"])
+        async with contextlib.aclosing(windows):
+            async for window in windows:
+                await embed_pool.run(_index_transcript_windows, [window], len(collected), filename, sha256, block=True)
+                collected.append({"text": window["text"], "start": window["start"], "end": window["end"]})
+                progress("transcribing", window["progress"], {"chunk": len(collected) - 1, "start": window["start"], "end": window["end"]})
+
+        media_cache.put("audio", sha256, {"windows": collected})
+        return _audio_result(collected)
+
+
+async def run_image_job(job, progress):
+    payload = job["payload"]
+    filename = job["filename"]
+    sha256 = payload.get("sha256")
+    with consuming(payload["path"]):
+        cached = media_cache.get("image", sha256)
+        if cached is not None:
+            text = cached["text"]
+        else:
+            progress("ocr", 0.1)
+            print(f"👁️ Analyzing Image {filename}...")
+            text = await ocr_pool.run(ingestion_engine.extract_text_from_image, payload["path"], block=True)
+            media_cache.put("image", sha256, {"text": text})
+
+        progress("indexing", 0.8)
+        await embed_pool.run(_index_image_text, text, filename, sha256, block=True)
+        return _image_result(text, cached=cached is not None)
+
+
+def _index_ocr_results(results):
+    """Chunks every OCR'd image of a batch and writes them with one bulk upsert."""
+    texts, metadatas, ids = [], [], []
+    for item in results:
+        if "error" in item:
+            continue
+        chunks = chunk_text(item["text"])
+        item["chunks"] = len(chunks)
+        ids.extend(media_ids("image", item["sha256"], 0, len(chunks)) or [str(uuid.uuid4()) for _ in chunks])
+        for i, chunk in enumerate(chunks):
+            texts.append(f"{IMAGE_TAG}: {chunk['text']}")
+            metadatas.append(chunk_metadata(chunk, i, source="image", filename=item["filename"]))
+    if texts:
+        add_texts_bulk(texts, metadatas, ids)
+
+
+async def run_images_job(job, progress):
+    """
+    Batch OCR: images go to the OCR pool OCR_BATCH_SIZE at a time and every finished batch is
+    written to Chroma in bulk. Within a batch images are decoded in parallel ahead of the model;
+    the model itself reads one image at a time, so concurrent batches only overlap decoding and
+    indexing with each other's inference. Reports per-image latency and overall throughput.
+    """
+    files = job["payload"]["files"]
+    total = len(files)
+    results = [None] * total
+    done = 0
+    started = time.perf_counter()
+
+    async def process(offset, batch):
+        nonlocal done
+        # Images seen before come from the media cache; only the rest go through PaddleOCR
+        items = [None] * len(batch)
+        for i, f in enumerate(batch):
+            cached = media_cache.get("image", f.get("sha256"))
+            if cached is not None:
+                items[i] = {"path": f["path"], "text": cached["text"], "decode_ms": 0.0, "ocr_ms": 0.0, "cached": True}
+        todo = [i for i, item in enumerate(items) if item is None]
+        if todo:
+            ocr_items = await ocr_pool.run(ingestion_engine.ocr_batch, [batch[i]["path"] for i in todo], block=True)
+            for i, item in zip(todo, ocr_items):
+                items[i] = item
+                if "error" not in item:
+                    media_cache.put("image", batch[i].get("sha256"), {"text": item["text"]})
+
+        for f, item in zip(batch, items):
+            item["filename"] = f["filename"]
+            item["sha256"] = f.get("sha256")
+        await embed_pool.run(_index_ocr_results, items, block=True)
+
+        for i, item in enumerate(items):
+            done += 1
+            if "error" in item:
+                event = {"file": item["filename"], "status": "error", "error": item["error"]}
+            else:
+                item["latency_ms"] = round(item["decode_ms"] + item["ocr_ms"], 1)
+                event = {"file": item["filename"], "status": "indexed", "chunks": item["chunks"], "latency_ms": item["latency_ms"]}
+            progress("ocr", done / total, event)
+            results[offset + i] = item
+
+    size = config.OCR_BATCH_SIZE
+    with consuming(*(f["path"] for f in files)):
+        progress("ocr", 0.0, {"images": total})
+        print(f"👁️ Analyzing {total} images...")
+        await asyncio.gather(*(process(i, files[i:i + size]) for i in range(0, total, size)))
+
+    elapsed = time.perf_counter() - started
+    images = []
+    for item in results:
+        if "error" in item:
+            images.append({"filename": item["filename"], "status": "error", "error": item["error"]})
+        else:
+            images.append({
+                "filename": item["filename"],
+                "status": "success",
+                "chunks_created": item["chunks"],
+                "extracted_text": item["text"][:100] + "..." if len(item["text"]) > 100 else item["text"],
+                "decode_ms": item["decode_ms"],
+                "ocr_ms": item["ocr_ms"],
+                "latency_ms": item["latency_ms"],
+                "cached": item.get("cached", False),
+            })
+    succeeded = [img for img in images if img["status"] == "success"]
+    latencies = sorted(img["latency_ms"] for img in succeeded)
+
+    return {
+        "status": "success" if succeeded else "failed",
+        "images_processed": len(succeeded),
+        "images_failed": total - len(succeeded),
+        "elapsed_seconds": round(elapsed, 2),
+        "images_per_second": round(total / elapsed, 2) if elapsed else None,
+        "latency_ms_p50": latencies[len(latencies) // 2] if latencies else None,
+        "latency_ms_max": latencies[-1] if latencies else None,
+        "images": images
+    }
+
+
+async def run_text_job(job, progress):
+    payload = job["payload"]
+    filename = job["filename"]
+    file_ext = payload["file_ext"]
+    with consuming(payload["path"]):
+        progress("parsing", 0.1)
+
+        def ocr_progress(done, total):
+            progress("ocr", 0.1 + 0.4 * done / total, {"pages_ocr": done, "pages_scanned": total})
+
+        chunks, ocr_pages = await chunk_document_with_ocr(payload["path"], file_ext, ocr_progress)
+        print(f"📄 Processing document: {filename} ({len(chunks)} chunks)")
+
+        progress("indexing", 0.5)
+        await embed_pool.run(
+            index_chunks, chunks, f"[DOCUMENT - {filename}]",
+            source="document", type=file_ext, filename=filename,
+            block=True
+        )
+
+        return {
+            "status": "success",
+            "filename": filename,
+            "file_type": file_ext,
+            "chunks_created": len(chunks),
+            "ocr_pages": ocr_pages,
+            "text_snippet": _snippet(chunks)
+        }
+
+
+async def run_scan_job(job, progress):
+    knowledge_dir = config.KNOWLEDGE_DIR
+
+    if not os.path.exists(knowledge_dir):
+        os.makedirs(knowledge_dir)
+        return {"status": "created", "message": f"Created empty knowledge folder at {knowledge_dir}", "files_processed": 0}
+
+    summary = await scan_folder(knowledge_dir, progress)
+    if not summary["files_found"] and not summary["removed"]:
+        return {"status": "empty", "message": "No document files found in knowledge folder", "files_processed": 0}
+
+    return {
+        "status": "success",
+        "files_processed": len(summary["processed"]),
+        "files": summary["processed"],
+        "files_unchanged": summary["unchanged"],
+        "files_removed": summary["removed"],
+        "errors": summary["errors"] or None
+    }
+
+
+async def run_reindex_job(job, progress):
+    """Rebuilds the requested Chroma collections one by one, then compacts the reduced-precision index."""
+    names = job["payload"]["collections"]
+    rebuilt = []
+    for i, name in enumerate(names):
+        progress(f"rebuilding {name}", i / len(names))
+        rebuilt.append(await embed_pool.run(rebuild_collection, name, block=True))
+        progress(f"rebuilding {name}", (i + 1) / len(names), rebuilt[-1])
+
+    result = {"status": "success", "collections": rebuilt}
+    if knowledge_base_precision() != "float32":
+        from quantized_index import get_quantized_store
+        progress("compacting vector codes", 1.0)
+        result["quantized"] = await embed_pool.run(get_quantized_store()._collection.compact, block=True)
+    return result
+
+
+async def run_migrate_job(job, progress):
+    """Moves the knowledge base to the store VECTOR_PRECISION asks for (see migrate_knowledge_base)."""
+    progress("migrating", 0.0)
+    result = await embed_pool.run(migrate_knowledge_base, block=True)
+    return {"status": "success", **result}
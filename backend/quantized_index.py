@@ -0,0 +1,409 @@
+"""
+Reduced-precision vector store for the knowledge base (VECTOR_PRECISION float16 or int8).
+Replaces the Chroma knowledge collection(s) in that mode: each chunk's float32 vector, text
+and metadata are stored once in SQLite and only a float16 / int8 code per vector is held in
+memory; no HNSW graph is built. A query scans all the codes (a flat O(N) pass, not a graph
+walk), then re-scores the best `k x rescore_factor` with the float32 vectors, so the final
+ranking uses exact distances. Only memory shrinks: the float32 vectors stay on disk.
+QuantizedIndex answers the part of Chroma's collection API the backend uses, so the rest of
+the code reads and writes it through `store._collection` like a Chroma store.
+Writes by other processes are picked up from a change log, which prunes itself.
+"""
+import json
+import os
+import sqlite3
+import threading
+
+import numpy as np
+
+import config
+from lexical_index import where_sql
+
+PRECISIONS = ("float16", "int8")
+# Codes an index not yet migrated back to float32 is served with (see vector_store.knowledge_base_precision)
+SERVING_PRECISION = "float16"
+_BLOCK_ROWS = 16384  # Codes widened to float32 per scoring block
+# Change-log rows kept; a process further behind than that reloads everything
+_CHANGE_LOG_ROWS = 100000
+
+
+def encode(vectors, precision):
+    """(codes, scales): float16 as is, int8 with one symmetric scale per vector."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if precision == "float16":
+        return vectors.astype(np.float16), np.ones(len(vectors), dtype=np.float32)
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    return np.round(vectors / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+
+
+class QuantizedIndex:
+    """
+    Codes in memory; float32 vectors, documents and metadata in SQLite, keyed by chunk id.
+    upsert / get / delete / count / query take the same arguments as a Chroma collection's.
+    """
+
+    def __init__(self, db_path, precision="int8", rescore_factor=4):
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unsupported precision: {precision} (use one of {PRECISIONS})")
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.precision = precision
+        self.rescore_factor = rescore_factor
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS vectors (
+                    id TEXT PRIMARY KEY,
+                    vector BLOB,
+                    document TEXT,
+                    metadata TEXT
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS changes (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    id TEXT
+                )
+            """)
+        # In-memory codes; deleted rows are only marked until compaction
+        self._ids = []
+        self._rows = {}
+        self._codes = None
+        self._scales = None
+        self._alive = None
+        self._size = 0
+        self._deleted = 0
+        self._synced = None  # Last change applied (None: not loaded yet)
+
+    # Writes (SQLite only; memory catches up on the next search)
+    def upsert(self, ids, embeddings, documents=None, metadatas=None):
+        ids = list(ids)
+        documents = documents if documents is not None else [None] * len(ids)
+        metadatas = metadatas if metadatas is not None else [None] * len(ids)
+        rows = [
+            (doc_id, np.asarray(vector, dtype=np.float32).tobytes(), document, json.dumps(meta or {}))
+            for doc_id, vector, document, meta in zip(ids, embeddings, documents, metadatas)
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO vectors (id, vector, document, metadata) VALUES (?, ?, ?, ?)", rows)
+            self._conn.executemany("INSERT INTO changes (id) VALUES (?)", [(doc_id,) for doc_id in ids])
+            self._prune_changes_locked()
+
+    def update(self, ids, metadatas):
+        """Replaces the metadata of existing chunks (vectors and codes unchanged)."""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE vectors SET metadata = ? WHERE id = ?", [(json.dumps(meta or {}), doc_id) for doc_id, meta in zip(ids, metadatas)]
+            )
+
+    def delete(self, ids=None, where=None):
+        with self._lock, self._conn:
+            if where:
+                matching = self._matching_locked(where)
+                if ids is not None:
+                    matching = set(matching)
+                    matching = [doc_id for doc_id in ids if doc_id in matching]
+                ids = matching
+            ids = [(doc_id,) for doc_id in ids or []]
+            self._conn.executemany("DELETE FROM vectors WHERE id = ?", ids)
+            self._conn.executemany("INSERT INTO changes (id) VALUES (?)", ids)
+            self._prune_changes_locked()
+
+    def _prune_changes_locked(self):
+        """Keeps the change log under _CHANGE_LOG_ROWS (pruned by half of that at a time)."""
+        # Separate MIN / MAX queries: SQLite answers each from the primary key alone
+        last = self._conn.execute("SELECT MAX(seq) FROM changes").fetchone()[0]
+        first = self._conn.execute("SELECT MIN(seq) FROM changes").fetchone()[0]
+        if last is not None and last - first >= _CHANGE_LOG_ROWS:
+            self._conn.execute("DELETE FROM changes WHERE seq <= ?", (last - _CHANGE_LOG_ROWS // 2,))
+
+    def clear(self):
+        """Drops every vector (after they were moved back into Chroma)."""
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM vectors")
+                self._conn.execute("DELETE FROM changes")
+            self._conn.execute("VACUUM")
+            self._synced = None
+
+    # Chroma-style reads
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+
+    def _matching_locked(self, where):
+        sql, params = where_sql(where)
+        return [doc_id for doc_id, in self._conn.execute(f"SELECT id FROM vectors d WHERE {sql}", params)]
+
+    def get(self, ids=None, where=None, include=("metadatas", "documents"), limit=None, offset=0):
+        """Chunks by id and/or `where` filter, in insertion order; `limit` / `offset` page through them."""
+        clauses, params = [], []
+        if where:
+            sql, where_params = where_sql(where)
+            clauses.append(sql)
+            params.extend(where_params)
+        rows = []
+        with self._lock:
+            for i in range(0, len(ids), 500) if ids is not None else [None]:
+                batch_clauses, batch_params = list(clauses), list(params)
+                if i is not None:
+                    batch = list(ids)[i:i + 500]
+                    batch_clauses.append(f"d.id IN ({','.join('?' * len(batch))})")
+                    batch_params.extend(batch)
+                sql = "SELECT d.id, d.vector, d.document, d.metadata FROM vectors d"
+                if batch_clauses:
+                    sql += " WHERE " + " AND ".join(batch_clauses)
+                sql += " ORDER BY d.rowid"
+                if limit and ids is None:
+                    sql += " LIMIT ? OFFSET ?"
+                    batch_params.extend([limit, offset])
+                rows.extend(self._conn.execute(sql, batch_params).fetchall())
+        return {
+            "ids": [row[0] for row in rows],
+            "embeddings": [np.frombuffer(row[1], dtype=np.float32).tolist() for row in rows] if "embeddings" in include else None,
+            "documents": [row[2] for row in rows] if "documents" in include else None,
+            "metadatas": [json.loads(row[3]) for row in rows] if "metadatas" in include else None,
+        }
+
+    def query(self, query_embeddings, n_results=10, where=None, include=("metadatas", "documents", "distances")):
+        """Nearest chunks per query embedding (squared L2 distances, like Chroma's default space)."""
+        result = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        for query_vector in query_embeddings:
+            hits = self.search(query_vector, n_results, where)
+            found = self.get(ids=[doc_id for doc_id, _ in hits], include=include)
+            by_id = {doc_id: i for i, doc_id in enumerate(found["ids"])}
+            hits = [(doc_id, distance) for doc_id, distance in hits if doc_id in by_id]
+            result["ids"].append([doc_id for doc_id, _ in hits])
+            result["distances"].append([distance for _, distance in hits])
+            for key in ("documents", "metadatas"):
+                result[key].append([found[key][by_id[doc_id]] for doc_id, _ in hits] if found[key] is not None else None)
+        return result
+
+    # In-memory codes
+    def _grow_locked(self, needed, dim):
+        capacity = 0 if self._codes is None else len(self._codes)
+        if needed <= capacity:
+            return
+        capacity = max(needed, capacity * 2, 1024)
+        dtype = np.float16 if self.precision == "float16" else np.int8
+        codes = np.zeros((capacity, dim), dtype=dtype)
+        scales = np.zeros(capacity, dtype=np.float32)
+        alive = np.zeros(capacity, dtype=bool)
+        if self._codes is not None:
+            codes[:self._size] = self._codes[:self._size]
+            scales[:self._size] = self._scales[:self._size]
+            alive[:self._size] = self._alive[:self._size]
+        self._codes, self._scales, self._alive = codes, scales, alive
+
+    def _set_locked(self, ids, blobs):
+        vectors = np.stack([np.frombuffer(blob, dtype=np.float32) for blob in blobs])
+        codes, scales = encode(vectors, self.precision)
+        self._grow_locked(self._size + len(ids), vectors.shape[1])
+        for doc_id, code, scale in zip(ids, codes, scales):
+            row = self._rows.get(doc_id)
+            if row is None:
+                row = self._rows[doc_id] = self._size
+                self._ids.append(doc_id)
+                self._size += 1
+            self._codes[row] = code
+            self._scales[row] = scale
+            self._alive[row] = True
+
+    def _remove_locked(self, doc_id):
+        row = self._rows.pop(doc_id, None)
+        if row is not None:
+            self._alive[row] = False
+            self._ids[row] = None
+            self._deleted += 1
+
+    def _compact_locked(self):
+        """Drops deleted rows from memory (new arrays, so searches in progress keep their snapshot)."""
+        if not self._deleted:
+            return
+        keep = np.flatnonzero(self._alive[:self._size])
+        self._codes = self._codes[keep]
+        self._scales = self._scales[keep]
+        self._alive = np.ones(len(keep), dtype=bool)
+        self._ids = [self._ids[row] for row in keep]
+        self._rows = {doc_id: row for row, doc_id in enumerate(self._ids)}
+        self._size = len(keep)
+        self._deleted = 0
+
+    def _reload_locked(self):
+        self._ids, self._rows, self._codes, self._scales, self._alive = [], {}, None, None, None
+        self._size = self._deleted = 0
+        last = self._conn.execute("SELECT COALESCE(MAX(seq), 0) FROM changes").fetchone()[0]
+        cursor = self._conn.execute("SELECT id, vector FROM vectors")
+        while rows := cursor.fetchmany(10000):
+            self._set_locked([doc_id for doc_id, _ in rows], [blob for _, blob in rows])
+        self._synced = last
+
+    def _sync_locked(self):
+        """Applies changes logged since the last sync (by this or another process)."""
+        if self._synced is None:
+            return self._reload_locked()
+        # Separate MIN / MAX queries: SQLite answers each from the primary key alone
+        last = self._conn.execute("SELECT MAX(seq) FROM changes").fetchone()[0]
+        if last is None or last <= self._synced:
+            return
+        if self._conn.execute("SELECT MIN(seq) FROM changes").fetchone()[0] > self._synced + 1:
+            return self._reload_locked()  # The log was pruned past us
+        rows = self._conn.execute(
+            "SELECT c.seq, c.id, v.vector FROM changes c LEFT JOIN vectors v ON v.id = c.id WHERE c.seq > ? ORDER BY c.seq",
+            (self._synced,)
+        ).fetchall()
+        # The joined vector is each id's current state, so only the last change per id matters
+        current = {doc_id: blob for _, doc_id, blob in rows}
+        for doc_id, blob in current.items():
+            if blob is None:
+                self._remove_locked(doc_id)
+        updated = [(doc_id, blob) for doc_id, blob in current.items() if blob is not None]
+        if updated:
+            self._set_locked([doc_id for doc_id, _ in updated], [blob for _, blob in updated])
+        self._synced = rows[-1][0] if rows else self._synced
+        if self._deleted > max(1000, self._size // 4):
+            self._compact_locked()
+
+    # Search
+    def _vectors(self, ids):
+        """{id: float32 vector} from disk."""
+        ids = list(ids)
+        found = {}
+        with self._lock:
+            for i in range(0, len(ids), 500):
+                batch = ids[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT id, vector FROM vectors WHERE id IN ({','.join('?' * len(batch))})", batch
+                ).fetchall()
+                found.update((doc_id, np.frombuffer(blob, dtype=np.float32)) for doc_id, blob in rows)
+        return found
+
+    def search(self, query_vector, k=20, where=None):
+        """Returns [(id, squared L2)] best first, over chunks matching a Chroma `where` filter if given."""
+        query = np.asarray(query_vector, dtype=np.float32)
+        with self._lock:
+            self._sync_locked()
+            size, codes, scales, alive, ids = self._size, self._codes, self._scales, self._alive, self._ids
+            allowed = None
+            if where:
+                matching = self._matching_locked(where)
+                allowed = np.array(sorted(self._rows[doc_id] for doc_id in matching if doc_id in self._rows), dtype=np.int64)
+        if not size or (allowed is not None and not len(allowed)):
+            return []
+
+        # 1. Approximate scores from the codes (dot product: vectors are normalized)
+        keep = max(k * self.rescore_factor, k)
+        total = size if allowed is None else len(allowed)
+        best_rows, best_scores = [], []
+        for start in range(0, total, _BLOCK_ROWS):
+            if allowed is None:
+                rows = np.arange(start, min(start + _BLOCK_ROWS, total))
+                block = slice(start, start + len(rows))
+            else:
+                rows = block = allowed[start:start + _BLOCK_ROWS]
+            scores = (codes[block].astype(np.float32) @ query) * scales[block]
+            scores[~alive[block]] = -np.inf
+            if len(scores) > keep:
+                top = np.argpartition(-scores, keep)[:keep]
+                rows, scores = rows[top], scores[top]
+            best_rows.append(rows)
+            best_scores.append(scores)
+        rows, scores = np.concatenate(best_rows), np.concatenate(best_scores)
+        order = np.argsort(-scores)[:keep]
+        candidates = [ids[row] for row, score in zip(rows[order], scores[order]) if np.isfinite(score) and ids[row] is not None]
+
+        # 2. Exact re-scoring with the float32 vectors
+        exact = self._vectors(candidates)
+        scored = [(doc_id, float(np.sum((exact[doc_id] - query) ** 2))) for doc_id in candidates if doc_id in exact]
+        return sorted(scored, key=lambda pair: pair[1])[:k]
+
+    # Maintenance
+    def compact(self):
+        """Drops deleted rows from memory and prunes the change log (other processes reload)."""
+        with self._lock:
+            self._sync_locked()
+            self._compact_locked()
+            with self._conn:
+                self._conn.execute("DELETE FROM changes WHERE seq < ?", (self._synced,))
+            self._conn.execute("VACUUM")
+        return self.stats()
+
+    def stats(self):
+        with self._lock:
+            if self._synced is not None:
+                self._sync_locked()
+            live = self._size - self._deleted
+            dim = self._codes.shape[1] if self._codes is not None else 0
+            memory = (self._codes.nbytes + self._scales.nbytes + self._alive.nbytes) if self._codes is not None else 0
+            return {
+                "precision": self.precision,
+                "loaded": self._synced is not None,
+                "vectors": live,
+                "deleted_in_memory": self._deleted,
+                "memory_bytes": memory,
+                "bytes_per_vector": (self._codes.itemsize * dim + 5) if dim else 0,
+                "float32_bytes": live * dim * 4,
+                "rescore_factor": self.rescore_factor
+            }
+
+
+class QuantizedStore:
+    """The part of a langchain Chroma store the backend uses (`_collection`, `embeddings`), over a QuantizedIndex."""
+    _client = None
+
+    def __init__(self, index, embeddings):
+        self._collection = index
+        self.embeddings = embeddings
+
+
+def copy_collection(source, target, page_size=1000):
+    """Copies every chunk (text, metadata, embedding) from one collection-like object to another."""
+    copied = 0
+    while True:
+        page = source.get(include=["embeddings", "documents", "metadatas"], limit=page_size, offset=copied)
+        if not len(page["ids"]):
+            return copied
+        target.upsert(ids=page["ids"], embeddings=page["embeddings"], documents=page["documents"], metadatas=page["metadatas"])
+        copied += len(page["ids"])
+
+
+_quantized_store = None
+_quantized_lock = threading.Lock()
+
+
+def get_quantized_store():
+    """
+    The knowledge-base store when it is kept as float16 / int8 codes. Moving chunks in or out
+    of it is vector_store.migrate_knowledge_base()'s job, never a side effect of opening it.
+    """
+    global _quantized_store
+    if _quantized_store is None:
+        with _quantized_lock:
+            if _quantized_store is None:
+                from vector_store import get_embedding_service
+
+                precision = config.VECTOR_PRECISION if config.VECTOR_PRECISION in PRECISIONS else SERVING_PRECISION
+                index = QuantizedIndex(config.QUANTIZED_INDEX_PATH, precision, config.VECTOR_RESCORE_FACTOR)
+                _quantized_store = QuantizedStore(index, get_embedding_service())
+    return _quantized_store
+
+
+def close_quantized_store():
+    """Forgets the store (after its chunks moved back into Chroma) so its codes leave memory."""
+    global _quantized_store
+    with _quantized_lock:
+        _quantized_store = None
+
+
+def quantized_index_stats():
+    """Stats without forcing the store to open (None while the knowledge base is in Chroma)."""
+    from vector_store import knowledge_base_precision
+
+    if knowledge_base_precision() == "float32":
+        return None
+    if _quantized_store is None:
+        return {"precision": config.VECTOR_PRECISION, "loaded": False}
+    # Codes shrink memory only: the float32 vectors are still all on disk
+    return {**_quantized_store._collection.stats(), "disk_bytes": os.path.getsize(config.QUANTIZED_INDEX_PATH)}
@@ -0,0 +1,225 @@
+"""
+Hybrid retrieval for the agent.
+Vector hits (Chroma) and BM25 hits (lexical_index) are merged with reciprocal rank
+fusion and optionally re-ordered by a small cross-encoder. Every result keeps a relevance
+on Chroma's scale so the relevance gate in agent_engine works the same for both sources:
+the better of its vector relevance and its BM25 coverage of the query.
+/chat filters become one Chroma `where` clause, applied by Chroma and by the BM25 index;
+with PARTITION_BY_SOURCE only the partitions of the requested source types are searched.
+"""
+import contextvars
+import math
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+import metrics
+
+# Query tokens as lexical_index splits them; identifiers among them are picked by _identifiers
+_IDENTIFIER_RE = re.compile(r"\w+(?:[-.]\w+)*")
+_CAMEL_CASE_RE = re.compile(r"[a-z][A-Z]")
+
+_reranker = None
+_reranker_lock = threading.Lock()
+_partition_executor = None
+_partition_executor_lock = threading.Lock()
+
+
+def get_reranker():
+    """Cross-encoder loaded on first use (only when RERANK_ENABLED)."""
+    global _reranker
+    if _reranker is None:
+        with _reranker_lock:
+            if _reranker is None:
+                print("⏳ Loading reranker...")
+                from sentence_transformers import CrossEncoder
+                _reranker = CrossEncoder(config.RERANKER_MODEL_PATH, device=config.EMBEDDING_DEVICE, max_length=512)
+                print("✅ Reranker Loaded")
+    return _reranker
+
+
+def build_where(filters):
+    """
+    Chroma `where` clause for /chat filters: {"source": [...], "filename": [...], "path_prefix": str,
+    "since": epoch, "until": epoch} (all optional). Returns None when unfiltered.
+    """
+    if not filters:
+        return None
+    clauses = []
+    for field in ("source", "filename"):
+        values = filters.get(field)
+        if values:
+            clauses.append({field: values[0]} if len(values) == 1 else {field: {"$in": list(values)}})
+    if filters.get("path_prefix"):
+        from chunking import directory_filter
+        clauses.append(directory_filter(filters["path_prefix"]))
+    if filters.get("since") is not None:
+        clauses.append({"ingested_at": {"$gte": filters["since"]}})
+    if filters.get("until") is not None:
+        clauses.append({"ingested_at": {"$lte": filters["until"]}})
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def _stores_for(filters):
+    """Stores to search: only the requested source types' partitions (path filters imply knowledge-folder files)."""
+    from vector_store import vector_stores
+    filters = filters or {}
+    return vector_stores(filters.get("source") or (["knowledge_folder"] if filters.get("path_prefix") else None))
+
+
+def _get_partition_executor():
+    global _partition_executor
+    if _partition_executor is None:
+        with _partition_executor_lock:
+            if _partition_executor is None:
+                from vector_store import SOURCE_TYPES
+                _partition_executor = ThreadPoolExecutor(len(SOURCE_TYPES) + 1, thread_name_prefix="partition-search")
+    return _partition_executor
+
+
+def _vector_hits(stores, query_vector, n, where=None):
+    """[(id, text, metadata, squared L2)] best first across `stores`, queried in parallel when there are several."""
+    from vector_store import swap_guard
+
+    def query(store):
+        with swap_guard.reading():
+            hits = store._collection.query(
+                query_embeddings=[query_vector], n_results=n, where=where or None,
+                include=["documents", "metadatas", "distances"]
+            )
+        return list(zip(hits["ids"][0], hits["documents"][0], hits["metadatas"][0], hits["distances"][0]))
+
+    if len(stores) == 1:
+        results = [query(stores[0])]
+    else:
+        executor = _get_partition_executor()
+        futures = [executor.submit(contextvars.copy_context().run, query, store) for store in stores]
+        results = [future.result() for future in futures]
+    return sorted((hit for hits in results for hit in hits), key=lambda hit: hit[3])[:n]
+
+
+def reciprocal_rank_fusion(rankings, k=None):
+    """Fuses ranked id lists: score(id) = sum over lists of 1 / (k + rank)."""
+    k = k or config.RRF_K
+    scores = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+def _relevance(squared_l2):
+    # Same scale as Chroma.similarity_search_with_relevance_scores (default L2 space)
+    return 1.0 - squared_l2 / math.sqrt(2)
+
+
+def _vector_relevance(stores, query_vector, ids):
+    """Relevance of chunks found only by BM25, from their stored embeddings."""
+    from vector_store import swap_guard
+
+    relevance = {}
+    for store in stores:
+        missing = [doc_id for doc_id in ids if doc_id not in relevance]
+        if not missing:
+            break
+        with swap_guard.reading():
+            stored = store._collection.get(ids=missing, include=["embeddings"])
+        for doc_id, vector in zip(stored["ids"], stored["embeddings"]):
+            squared_l2 = float(sum((a - b) ** 2 for a, b in zip(query_vector, vector)))
+            relevance[doc_id] = _relevance(squared_l2)
+    return relevance
+
+
+def _identifiers(query):
+    """Query tokens shaped like identifiers: a digit, `_`, camelCase or a capitalised hyphenated name (not plain acronyms)."""
+    return {
+        token.lower() for token in _IDENTIFIER_RE.findall(query)
+        if len(token) >= 3 and (
+            any(c.isdigit() for c in token) or "_" in token or _CAMEL_CASE_RE.search(token)
+            or ("-" in token and any(c.isupper() for c in token))
+        )
+    }
+
+
+def hybrid_search(query, k=5, vector_db=None, lexical_index=None, candidates=None, rerank=None, filters=None):
+    """
+    Returns [(Document, relevance)] best first, restricted to chunks matching `filters` (see build_where).
+    Relevance is the better of the vector relevance and the chunk's BM25 coverage of the query
+    (share of its idf weight, scaled so full coverage reaches RELEVANCE_LOCAL_THRESHOLD), so a
+    chunk only BM25 found still passes the gate when it contains the query's rare terms.
+    Chunks containing an identifier from the query (error code, version, snake_case / camelCase
+    name) as a whole token get at least RELEVANCE_LOCAL_THRESHOLD.
+    """
+    from lexical_index import tokenize
+    from langchain_core.documents import Document
+
+    where = build_where(filters)
+    stores = [vector_db] if vector_db is not None else _stores_for(filters)
+    candidates = candidates or config.HYBRID_CANDIDATES
+    rerank = config.RERANK_ENABLED if rerank is None else rerank
+    if lexical_index is None:
+        from lexical_index import get_lexical_index
+        lexical_index = get_lexical_index()
+
+    with metrics.stage("embed_query"):
+        query_vector = stores[0].embeddings.embed_query(query)
+    with metrics.stage("vector_search"):
+        hits = _vector_hits(stores, query_vector, candidates, where)
+    with metrics.stage("bm25_search"):
+        lexical_hits = lexical_index.search(query, k=candidates, where=where)
+
+    docs, relevance, vector_ranking = {}, {}, []
+    for doc_id, text, metadata, distance in hits:
+        docs[doc_id] = Document(page_content=text, metadata=metadata or {}, id=doc_id)
+        relevance[doc_id] = _relevance(distance)
+        vector_ranking.append(doc_id)
+    lexical_ranking = [doc_id for doc_id, _ in lexical_hits]
+
+    fused = reciprocal_rank_fusion([vector_ranking, lexical_ranking])[:candidates if rerank else k]
+
+    missing = [doc_id for doc_id in fused if doc_id not in docs]
+    for doc_id, (text, metadata) in lexical_index.get(missing).items():
+        docs[doc_id] = Document(page_content=text, metadata=metadata, id=doc_id)
+    relevance.update(_vector_relevance(stores, query_vector, missing))
+    fused = [doc_id for doc_id in fused if doc_id in docs]
+
+    lexical_found = set(lexical_ranking) & set(fused)
+    for doc_id, share in lexical_index.coverage(query, lexical_found).items():
+        relevance[doc_id] = max(relevance.get(doc_id, 0.0), share * config.RELEVANCE_LOCAL_THRESHOLD)
+
+    identifiers = _identifiers(query)
+    if identifiers:
+        for doc_id in fused:
+            if identifiers & set(tokenize(docs[doc_id].page_content)):
+                relevance[doc_id] = max(relevance.get(doc_id, 0.0), config.RELEVANCE_LOCAL_THRESHOLD)
+
+    if rerank and fused:
+        with metrics.stage("rerank"):
+            scores = get_reranker().predict([(query, docs[doc_id].page_content) for doc_id in fused])
+        fused = [doc_id for _, doc_id in sorted(zip(scores, fused), key=lambda pair: pair[0], reverse=True)]
+
+    return [(docs[doc_id], relevance.get(doc_id, 0.0)) for doc_id in fused[:k]]
+
+
+def vector_search(query, k=5, filters=None):
+    """Returns [(Document, relevance)] from the vector store(s) alone."""
+    from langchain_core.documents import Document
+
+    where = build_where(filters)
+    stores = _stores_for(filters)
+    with metrics.stage("embed_query"):
+        query_vector = stores[0].embeddings.embed_query(query)
+    with metrics.stage("vector_search"):
+        hits = _vector_hits(stores, query_vector, k, where)
+    return [(Document(page_content=text, metadata=metadata or {}, id=doc_id), _relevance(distance))
+            for doc_id, text, metadata, distance in hits]
+
+
+def search(query, k=5, filters=None):
+    """Retrieval used by the agent: hybrid when enabled, plain vector search otherwise."""
+    if config.HYBRID_SEARCH_ENABLED:
+        return hybrid_search(query, k=k, filters=filters)
+    return vector_search(query, k=k, filters=filters)
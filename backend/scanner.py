@@ -0,0 +1,147 @@
+"""
+Recursive knowledge-folder scanner.
+Discovery walks the whole tree, parsing fans out over the parse process pool, and a
+single bounded embedding stage batches the parsed files into bulk upserts. Every file
+reports a progress event as it finishes.
+"""
+import asyncio
+import os
+
+import config
+from chunking import chunk_metadata, directory_fields
+from documents import SUPPORTED_DOCUMENTS, file_sha256
+from executor import parse_pool, embed_pool
+from manifest import scan_manifest, stat_matches
+from pdf_ocr import chunk_document_with_ocr
+from vector_store import add_texts_bulk, delete_where, update_metadata_where
+
+_DONE = object()
+
+
+def discover_documents(root):
+    """Yields absolute paths of supported documents anywhere under `root` (hidden dirs skipped)."""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+        for name in filenames:
+            if os.path.splitext(name)[1].lower() in SUPPORTED_DOCUMENTS:
+                yield os.path.abspath(os.path.join(dirpath, name))
+
+
+def _index_files(parsed):
+    """Replaces the vectors of a batch of parsed files with one delete and one bulk upsert."""
+    paths = [item["path"] for item in parsed]
+    delete_where({"path": {"$in": paths}} if len(paths) > 1 else {"path": paths[0]})
+
+    texts, metadatas = [], []
+    for item in parsed:
+        filename = os.path.basename(item["path"])
+        dirs = directory_fields(item["path"])
+        for i, chunk in enumerate(item["chunks"]):
+            texts.append(f"[DOCUMENT - {filename}]: {chunk['text']}")
+            metadatas.append(chunk_metadata(
+                chunk, i, source="knowledge_folder", type=item["ext"], filename=filename, path=item["path"], **dirs
+            ))
+    if texts:
+        add_texts_bulk(texts, metadatas)
+    return {item["path"]: len(item["chunks"]) for item in parsed}
+
+
+async def scan_folder(root, progress):
+    """
+    Incrementally syncs the vector store with every document under `root`.
+    `progress(stage, fraction, event)` receives one event per file.
+    """
+    files = await asyncio.to_thread(lambda: sorted(discover_documents(root)))
+    total = len(files)
+    summary = {"processed": [], "unchanged": 0, "removed": [], "errors": []}
+    done = 0
+
+    def report(path, status, **extra):
+        nonlocal done
+        done += 1
+        rel = os.path.relpath(path, root)
+        progress(f"scanning {rel}", done / max(total, 1), {"file": rel, "status": status, **extra})
+        if status == "indexed":
+            summary["processed"].append(rel)
+        elif status == "unchanged":
+            summary["unchanged"] += 1
+        elif status == "error":
+            summary["errors"].append({"file": rel, "error": extra.get("error")})
+
+    progress("discovering", 0.0, {"files_found": total})
+
+    # Bounded hand-off between the parse fan-out and the embedding stage
+    embed_queue = asyncio.Queue(maxsize=config.SCAN_EMBED_QUEUE)
+    parse_slots = asyncio.Semaphore(parse_pool.max_workers * 2)
+
+    async def unchanged(path, entry):
+        if not entry["dirs"]:
+            # Indexed before chunks carried their directories: add them, no re-embedding
+            await embed_pool.run(update_metadata_where, {"path": path}, directory_fields(path), block=True)
+            scan_manifest.mark_directories(path)
+        report(path, "unchanged")
+
+    async def parse_one(path):
+        async with parse_slots:
+            try:
+                ext = os.path.splitext(path)[1].lower()
+                st = os.stat(path)
+                entry = scan_manifest.get(path)
+                if stat_matches(entry, st):
+                    await unchanged(path, entry)
+                    return
+
+                sha256 = await parse_pool.run(file_sha256, path, block=True)
+                if entry and entry["sha256"] == sha256:
+                    scan_manifest.touch(path, st.st_size, st.st_mtime)
+                    await unchanged(path, entry)
+                    return
+
+                chunks, ocr_pages = await chunk_document_with_ocr(path, ext)
+                await embed_queue.put({"path": path, "ext": ext, "st": st, "sha256": sha256, "chunks": chunks, "ocr_pages": ocr_pages})
+            except Exception as e:
+                report(path, "error", error=str(e))
+
+    async def embed_stage():
+        finished = False
+        while not finished:
+            batch = [await embed_queue.get()]
+            while len(batch) < config.SCAN_EMBED_BATCH_FILES and not embed_queue.empty():
+                batch.append(embed_queue.get_nowait())
+            if batch[-1] is _DONE:
+                finished = True
+                batch.pop()
+            if not batch:
+                continue
+            try:
+                chunk_counts = await embed_pool.run(_index_files, batch, block=True)
+                for item in batch:
+                    st = item["st"]
+                    scan_manifest.record(item["path"], st.st_size, st.st_mtime, item["sha256"], chunk_counts[item["path"]])
+                    extra = {"ocr_pages": item["ocr_pages"]} if item["ocr_pages"] else {}
+                    report(item["path"], "indexed", chunks=chunk_counts[item["path"]], **extra)
+            except Exception as e:
+                for item in batch:
+                    report(item["path"], "error", error=str(e))
+
+    embedder = asyncio.create_task(embed_stage())
+    try:
+        await asyncio.gather(*(parse_one(path) for path in files))
+        await embed_queue.put(_DONE)
+        await embedder
+    finally:
+        embedder.cancel()
+
+    # Files that disappeared since the last scan
+    present = set(files)
+    root_prefix = os.path.join(os.path.abspath(root), "")
+    gone = [p for p in scan_manifest.paths() if p.startswith(root_prefix) and p not in present]
+    for path in gone:
+        await embed_pool.run(delete_where, {"path": path}, block=True)
+        scan_manifest.remove(path)
+        rel = os.path.relpath(path, root)
+        summary["removed"].append(rel)
+        progress("removing deleted files", 1.0, {"file": rel, "status": "removed"})
+
+    summary["files_found"] = total
+    return summary
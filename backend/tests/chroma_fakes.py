@@ -0,0 +1,80 @@
+"""In-memory stand-ins for the parts of chromadb / langchain_chroma the backend touches."""
+
+
+class FakeCollection:
+    """A Chroma collection reduced to what rebuild_collection touches; renames go through the client like Chroma's."""
+
+    def __init__(self, client, name, metadata=None):
+        self.client, self.name, self.metadata, self.rows = client, name, metadata or {}, {}
+
+    def _check(self):
+        if self.client.collections.get(self.name) is not self:
+            raise ValueError(f"Collection {self.name} does not exist")
+
+    def modify(self, name=None):
+        self._check()
+        if name in self.client.collections:
+            raise ValueError(f"Collection {name} already exists")
+        del self.client.collections[self.name]
+        self.name = name
+        self.client.collections[name] = self
+
+    def upsert(self, ids, embeddings=None, documents=None, metadatas=None):
+        self._check()
+        for i, doc_id in enumerate(ids):
+            self.rows[doc_id] = (documents[i], metadatas[i], embeddings[i])
+
+    def get(self, ids=None, include=None, limit=None, offset=0, where=None):
+        self._check()
+        keys = sorted(self.rows) if ids is None else [doc_id for doc_id in ids if doc_id in self.rows]
+        if limit:
+            keys = keys[offset:offset + limit]
+        return {
+            "ids": keys,
+            "documents": [self.rows[k][0] for k in keys],
+            "metadatas": [self.rows[k][1] for k in keys],
+            "embeddings": [self.rows[k][2] for k in keys],
+        }
+
+    def delete(self, ids):
+        self._check()
+        for doc_id in ids:
+            self.rows.pop(doc_id, None)
+
+    def count(self):
+        self._check()
+        return len(self.rows)
+
+
+class FakeClient:
+    def __init__(self):
+        self.collections = {}
+
+    def list_collections(self):
+        return list(self.collections)
+
+    def get_collection(self, name):
+        return self.collections[name]
+
+    def create_collection(self, name, metadata=None):
+        if name in self.collections:
+            raise ValueError(f"Collection {name} already exists")
+        self.collections[name] = FakeCollection(self, name, metadata)
+        return self.collections[name]
+
+    def get_or_create_collection(self, name, metadata=None):
+        return self.collections.get(name) or self.create_collection(name, metadata)
+
+    def delete_collection(self, name):
+        del self.collections[name]
+
+
+class FakeStore:
+    """Stands in for langchain_chroma.Chroma: the collection behind a read-only `_collection`."""
+
+    def __init__(self, collection):
+        self._chroma_collection = collection
+
+    @property
+    def _collection(self):
+        return self._chroma_collection
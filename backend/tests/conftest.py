@@ -0,0 +1,23 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Backend modules import each other flat (`import config`), and nothing a test writes should land in the checkout
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OMNISCRIBE_BASE_DIR", tempfile.mkdtemp(prefix="omniscribe_tests_"))
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """A fake Chroma client registered for VECTOR_DB_PATH, with no stores opened yet."""
+    import config
+    import vector_store
+    from chroma_fakes import FakeClient
+
+    fake = FakeClient()
+    monkeypatch.setitem(vector_store._clients, config.VECTOR_DB_PATH, fake)
+    monkeypatch.setattr(vector_store, "_stores", {})
+    monkeypatch.setattr(vector_store, "_knowledge_base_precision", None)
+    return fake
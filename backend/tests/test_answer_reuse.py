@@ -0,0 +1,86 @@
+import re
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import config
+import vector_store
+from answer_cache import AnswerCache, WriteMarker, query_anchors
+from corrections import CorrectionStore
+from quantized_index import QuantizedIndex
+
+
+def blind_embed(text):
+    """An embedding that cannot see digits or case, like a real one that barely can: near-duplicates score 1.0."""
+    vector = np.zeros(64, dtype=np.float32)
+    for word in re.findall(r"[a-z]+", text.lower()):
+        vector[hash(word) % 64] += 1
+    return vector / np.linalg.norm(vector)
+
+
+def reworded(question):
+    """Same words in another order: no exact match, embedding similarity 1.0."""
+    first, *rest = question.rstrip("?").split()
+    return " ".join([first, *reversed(rest)]) + "?"
+
+
+NEAR_DUPLICATES = [
+    ("What was the price in 2023?", "What was the price in 2024?"),
+    ("Who is the CEO of Acme?", "Who is the CEO of Globex?"),
+    ("Why does ERR-4242 happen?", "Why does ERR-4243 happen?"),
+]
+
+
+def test_anchors_ignore_sentence_case():
+    assert query_anchors("What is the refund policy? Does it apply to me?") == set()
+    assert query_anchors("Can I get the AWS bill for Q3 from Marta?") == {"aws", "q3", "marta"}
+
+
+@pytest.mark.parametrize("cached, asked", NEAR_DUPLICATES)
+def test_cache_never_serves_a_near_duplicate_with_other_numbers_or_names(cached, asked):
+    cache = AnswerCache(max_entries=10, ttl_seconds=60, threshold=0.95, embed_fn=blind_embed)
+    _, _, generation, embedding = cache.lookup(cached)
+    cache.store(cached, f"answer to {cached}", generation, embedding)
+
+    assert cache.lookup(asked)[0] is None
+    assert cache.lookup(reworded(asked))[0] is None
+    assert cache.lookup(reworded(cached))[:2] == (f"answer to {cached}", "semantic")
+
+
+def test_write_in_another_process_invalidates_the_cache(tmp_path):
+    # Two replicas: each has its own cache and its own connection to the shared write counter
+    chat = AnswerCache(10, 60, 0.95, blind_embed, marker=WriteMarker(str(tmp_path / "writes.db")))
+    ingest = AnswerCache(10, 60, 0.95, blind_embed, marker=WriteMarker(str(tmp_path / "writes.db")))
+    _, _, generation, embedding = chat.lookup("What is the refund policy?")
+    chat.store("What is the refund policy?", "30 days", generation, embedding)
+    assert chat.lookup("What is the refund policy?")[0] == "30 days"
+
+    _, _, generation, embedding = chat.lookup("Who signs off refunds?")
+    ingest.invalidate()
+    chat.store("Who signs off refunds?", "Finance", generation, embedding)
+
+    assert chat.lookup("What is the refund policy?")[0] is None
+    assert chat.lookup("Who signs off refunds?")[0] is None
+
+
+@pytest.fixture
+def corrections(tmp_path, monkeypatch):
+    store = SimpleNamespace(
+        _collection=QuantizedIndex(str(tmp_path / "corrections.db")),
+        embeddings=SimpleNamespace(embed_query=lambda text: blind_embed(text).tolist()),
+    )
+    monkeypatch.setattr(vector_store, "open_store", lambda name: store)
+    found = CorrectionStore(config.CORRECTION_MATCH_SIMILARITY)
+    found._ready = True
+    return found
+
+
+def test_correction_only_answers_its_own_numbers(corrections):
+    corrections.upsert("What was the price in 2023?", "$10")
+    corrections.upsert("What was the price in 2024?", "$12")
+    corrections.upsert("What was the price in 2025?", "$15")
+
+    assert corrections.lookup("what was the price in 2024")[0]["answer"] == "$12"
+    assert corrections.lookup(reworded("What was the price in 2023?"))[0]["answer"] == "$10"
+    assert corrections.lookup("What was the price in 2022?")[0] is None
@@ -0,0 +1,85 @@
+import os
+from types import SimpleNamespace
+
+import pytest
+
+import retrieval
+import vector_store
+from chunking import directory_fields
+from lexical_index import LexicalIndex
+from quantized_index import QuantizedIndex
+
+
+@pytest.fixture
+def knowledge(tmp_path):
+    root = str(tmp_path / "knowledge")
+    files = {name: os.path.join(root, *name.split("/")) for name in
+             ("finance/q1/a.pdf", "finance/b.pdf", "financial/c.pdf", "hr/d.pdf")}
+    return root, files
+
+
+def index(tmp_path, files, with_dirs=True):
+    ids = list(files)
+    metadatas = [{"source": "knowledge_folder", "path": path, **(directory_fields(path) if with_dirs else {})}
+                 for path in files.values()]
+    lexical = LexicalIndex(str(tmp_path / "lexical.db"))
+    lexical.add(ids, [f"quarterly report {name}" for name in ids], metadatas)
+    vectors = QuantizedIndex(str(tmp_path / "codes.db"))
+    vectors.upsert(ids, [[1.0, float(i)] for i in range(len(ids))], metadatas=metadatas)
+    return lexical, vectors
+
+
+def under(lexical, vectors, prefix):
+    where = retrieval.build_where({"path_prefix": prefix})
+    return (
+        sorted(doc_id for doc_id, _ in lexical.search("quarterly report", where=where)),
+        sorted(vectors.get(where=where, include=[])["ids"]),
+    )
+
+
+def test_path_prefix_is_one_equality_however_many_files(knowledge):
+    root, _ = knowledge
+    depth = len(directory_fields(os.path.join(root, "finance", "x")))
+
+    assert retrieval.build_where({"path_prefix": os.path.join(root, "finance", "")}) == {
+        "$or": [{f"dir_{depth}": os.path.join(root, "finance")}, {"path": os.path.join(root, "finance")}]
+    }
+
+
+def test_path_prefix_matches_whole_directories_and_single_files(tmp_path, knowledge):
+    root, files = knowledge
+    lexical, vectors = index(tmp_path, files)
+
+    finance = ["finance/b.pdf", "finance/q1/a.pdf"]
+    assert under(lexical, vectors, os.path.join(root, "finance")) == (finance, finance)
+    assert under(lexical, vectors, root) == (sorted(files), sorted(files))
+    assert under(lexical, vectors, files["hr/d.pdf"]) == (["hr/d.pdf"], ["hr/d.pdf"])
+    assert under(lexical, vectors, os.path.join(root, "fin")) == ([], [])
+
+
+def test_chunks_indexed_before_directory_fields_are_stamped_in_place(tmp_path, knowledge):
+    root, files = knowledge
+    lexical, vectors = index(tmp_path, files, with_dirs=False)
+    assert under(lexical, vectors, os.path.join(root, "hr")) == ([], [])
+
+    store = SimpleNamespace(_collection=vectors)
+    for path in files.values():
+        vector_store.update_metadata_where({"path": path}, directory_fields(path), vector_db=store, lexical_index=lexical)
+
+    assert under(lexical, vectors, os.path.join(root, "hr")) == (["hr/d.pdf"], ["hr/d.pdf"])
+    assert vectors.get(ids=["hr/d.pdf"], include=["embeddings"])["embeddings"][0] == [1.0, 3.0]
+
+
+def test_only_deletes_that_removed_chunks_count_as_writes(tmp_path, knowledge, monkeypatch):
+    _, files = knowledge
+    lexical, vectors = index(tmp_path, files)
+    writes = []
+    monkeypatch.setattr(vector_store, "_write_listeners", [lambda: writes.append(1)])
+    store = SimpleNamespace(_collection=vectors)
+
+    vector_store.delete_where({"path": "/nowhere.pdf"}, vector_db=store, lexical_index=lexical)
+    assert writes == []
+
+    vector_store.delete_where({"path": files["hr/d.pdf"]}, vector_db=store, lexical_index=lexical)
+    assert writes == [1]
+    assert vectors.count() == 3
@@ -0,0 +1,60 @@
+import wave
+
+import numpy as np
+import pytest
+
+import config
+import ingestion
+
+pytest.importorskip("av")
+faster_whisper = pytest.importorskip("faster_whisper")
+from faster_whisper import vad  # noqa: E402
+
+
+def energy_vad(audio, options):
+    """Stands in for Silero: every run of non-silent 512-sample windows is speech."""
+    loud = np.abs(audio[: len(audio) // 512 * 512]).reshape(-1, 512).max(axis=1) > 1e-3
+    runs, start = [], None
+    for i, on in enumerate(np.append(loud, False)):
+        if on and start is None:
+            start = i
+        elif not on and start is not None:
+            runs.append({"start": start * 512, "end": i * 512})
+            start = None
+    return runs
+
+
+@pytest.fixture
+def recording(tmp_path):
+    # 44.1 kHz stereo: 4 s of sound, 1 s of silence, repeated for 5 minutes
+    rate, rng = 44100, np.random.default_rng(0)
+    sound = np.concatenate([np.append(rng.normal(0, 0.3, rate * 4), np.zeros(rate)) for _ in range(60)])
+    path = str(tmp_path / "long.wav")
+    with wave.open(path, "wb") as out:
+        out.setnchannels(2)
+        out.setsampwidth(2)
+        out.setframerate(rate)
+        out.writeframes(np.repeat((np.clip(sound, -1, 1) * 32767).astype(np.int16), 2).tobytes())
+    return path
+
+
+def test_blocks_decode_the_same_samples_as_decode_audio(recording):
+    blocks = list(ingestion.iter_audio_blocks(recording, 30))
+
+    assert len(blocks) == 10
+    assert np.array_equal(np.concatenate(blocks), faster_whisper.decode_audio(recording, sampling_rate=ingestion.SAMPLE_RATE))
+    assert ingestion.audio_duration(recording) == pytest.approx(300)
+
+
+def test_pieces_are_cut_at_silences_without_decoding_everything(recording, monkeypatch):
+    monkeypatch.setattr(vad, "get_speech_timestamps", energy_vad)
+    monkeypatch.setattr(config, "AUDIO_SPLIT_SECONDS", 30)
+    whole = faster_whisper.decode_audio(recording, sampling_rate=ingestion.SAMPLE_RATE)
+
+    pieces = list(ingestion.IngestionEngine()._iter_file_pieces(recording))
+
+    starts = [start for start, _ in pieces]
+    assert np.array_equal(np.concatenate([audio for _, audio in pieces]), whole)
+    assert all(start + len(audio) == following for (start, audio), following in zip(pieces, starts[1:]))
+    assert all(np.abs(whole[start - 800:start + 800]).max() == 0 for start in starts[1:])
+    assert max(len(audio) for _, audio in pieces) <= 2 * 30 * ingestion.SAMPLE_RATE
@@ -0,0 +1,137 @@
+import numpy as np
+import pytest
+
+import config
+import quantized_index
+import vector_store
+from chroma_fakes import FakeStore
+from quantized_index import QuantizedIndex
+
+
+def unit_vectors(n, dim=32, seed=0):
+    vectors = np.random.default_rng(seed).normal(size=(n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def chunks(n, dim=32):
+    return {
+        "ids": [f"c{i}" for i in range(n)],
+        "embeddings": unit_vectors(n, dim).tolist(),
+        "documents": [f"chunk {i}" for i in range(n)],
+        "metadatas": [{"source": "audio" if i % 2 else "document", "i": i} for i in range(n)],
+    }
+
+
+@pytest.mark.parametrize("precision", ["float16", "int8"])
+def test_query_ranks_like_exact_search(tmp_path, precision):
+    index = QuantizedIndex(str(tmp_path / "codes.db"), precision, rescore_factor=4)
+    data = chunks(500)
+    index.upsert(**data)
+    query = unit_vectors(1, seed=1)[0]
+
+    found = index.query(query_embeddings=[query.tolist()], n_results=10, include=["documents", "metadatas", "distances"])
+
+    exact = np.argsort(((np.asarray(data["embeddings"]) - query) ** 2).sum(axis=1))[:10]
+    assert found["ids"][0] == [data["ids"][i] for i in exact]
+    assert found["documents"][0][0] == data["documents"][exact[0]]
+    assert found["distances"][0] == sorted(found["distances"][0])
+
+
+def test_where_filters_query_get_and_delete(tmp_path):
+    index = QuantizedIndex(str(tmp_path / "codes.db"))
+    index.upsert(**chunks(20))
+    query = unit_vectors(1, seed=2)[0].tolist()
+
+    hits = index.query(query_embeddings=[query], n_results=20, where={"source": "audio"}, include=["metadatas"])
+    assert len(hits["ids"][0]) == 10
+    assert all(meta["source"] == "audio" for meta in hits["metadatas"][0])
+    assert index.get(where={"i": {"$lt": 3}}, include=[])["ids"] == ["c0", "c1", "c2"]
+
+    index.delete(where={"source": "audio"})
+    assert index.count() == 10
+    assert index.query(query_embeddings=[query], n_results=20, where={"source": "audio"})["ids"] == [[]]
+
+
+def test_get_pages_through_everything_once(tmp_path):
+    index = QuantizedIndex(str(tmp_path / "codes.db"))
+    data = chunks(25)
+    index.upsert(**data)
+
+    pages = [index.get(include=["embeddings"], limit=10, offset=offset) for offset in (0, 10, 20, 30)]
+
+    assert [len(page["ids"]) for page in pages] == [10, 10, 5, 0]
+    assert sum((page["ids"] for page in pages), []) == data["ids"]
+    assert np.allclose(pages[0]["embeddings"][3], data["embeddings"][3])
+
+
+def test_codes_take_less_memory_than_float32(tmp_path):
+    index = QuantizedIndex(str(tmp_path / "codes.db"), "int8")
+    index.upsert(**chunks(10, dim=384))
+    index.search(unit_vectors(1, dim=384)[0], 1)  # Loads the codes
+
+    assert index.stats()["bytes_per_vector"] < 384 * 4 / 3
+
+
+def test_change_log_prunes_itself_and_lagging_readers_reload(tmp_path, monkeypatch):
+    monkeypatch.setattr(quantized_index, "_CHANGE_LOG_ROWS", 10)
+    writer = QuantizedIndex(str(tmp_path / "codes.db"))
+    reader = QuantizedIndex(str(tmp_path / "codes.db"))
+    data = chunks(40)
+    writer.upsert(**{key: values[:5] for key, values in data.items()})
+    reader.search(unit_vectors(1)[0], 1)  # Loads the codes
+
+    for i in range(5, 40):
+        writer.upsert(**{key: values[i:i + 1] for key, values in data.items()})
+    writer.delete(ids=["c0"])
+
+    assert writer._conn.execute("SELECT COUNT(*) FROM changes").fetchone()[0] <= 10
+    assert reader.stats()["vectors"] == 39
+
+
+@pytest.fixture
+def knowledge_base(client, tmp_path, monkeypatch):
+    """Six chunks split over the single knowledge collection and a partition, plus corrections."""
+    data = chunks(6)
+    client.create_collection("omni_knowledge").upsert(**{key: values[:4] for key, values in data.items()})
+    client.create_collection("omni_knowledge_audio").upsert(**{key: values[4:] for key, values in data.items()})
+    client.create_collection("omni_corrections").upsert(ids=["q"], embeddings=[[0.0] * 32], documents=["q"], metadatas=[{}])
+    monkeypatch.setattr(config, "QUANTIZED_INDEX_PATH", str(tmp_path / "codes.db"))
+    monkeypatch.setattr(vector_store, "get_embedding_service", lambda: None)
+    monkeypatch.setattr(vector_store, "open_store", lambda name: vector_store._stores.setdefault(
+        name, FakeStore(client.get_or_create_collection(name))
+    ))
+    monkeypatch.setattr(quantized_index, "_quantized_store", None)
+    return client
+
+
+def test_changing_precision_waits_for_the_migration(knowledge_base, monkeypatch):
+    # float32 -> int8: Chroma keeps serving until the migration runs
+    monkeypatch.setattr(config, "VECTOR_PRECISION", "int8")
+    assert vector_store.knowledge_base_precision() == "float32"
+    assert vector_store.get_vector_store()._collection.count() == 4
+    assert "omni_knowledge_audio" in knowledge_base.collections
+
+    assert vector_store.migrate_knowledge_base() == {"from": "float32", "to": "int8", "moved": 6}
+    assert sorted(knowledge_base.collections) == ["omni_corrections"]
+    assert vector_store.get_vector_store()._collection.count() == 6
+    assert vector_store.existing_ids(["c0", "c5", "x"]) == {"c0", "c5"}
+
+    # int8 -> float32 after a restart: the codes keep serving until the chunks are moved back
+    monkeypatch.setattr(config, "VECTOR_PRECISION", "float32")
+    monkeypatch.setattr(vector_store, "_knowledge_base_precision", None)
+    assert vector_store.existing_ids(["c0", "c5"]) == {"c0", "c5"}
+
+    assert vector_store.migrate_knowledge_base()["moved"] == 6
+    assert vector_store.get_vector_store()._collection.count() == 6
+    assert QuantizedIndex(config.QUANTIZED_INDEX_PATH).count() == 0
+
+
+def test_migration_drops_nothing_unless_every_chunk_arrived(knowledge_base, monkeypatch):
+    monkeypatch.setattr(config, "VECTOR_PRECISION", "int8")
+    monkeypatch.setattr(quantized_index, "copy_collection", lambda source, target, page_size: 0)
+
+    with pytest.raises(RuntimeError, match="nothing was dropped"):
+        vector_store.migrate_knowledge_base()
+
+    assert sorted(knowledge_base.collections) == ["omni_corrections", "omni_knowledge", "omni_knowledge_audio"]
+    assert vector_store.knowledge_base_precision() == "float32"
@@ -0,0 +1,105 @@
+import threading
+import time
+
+import config
+import vector_store
+from chroma_fakes import FakeStore
+
+
+def fill(collection, n):
+    collection.upsert(
+        ids=[str(i) for i in range(n)], embeddings=[[float(i), 0.0] for i in range(n)],
+        documents=[f"chunk {i}" for i in range(n)], metadatas=[{"i": i} for i in range(n)]
+    )
+
+
+def test_rebuild_swaps_in_a_copy_with_the_configured_settings(client):
+    fill(client.create_collection("omni_knowledge", metadata={"hnsw:M": 8}), 25)
+
+    result = vector_store.rebuild_collection("omni_knowledge", page_size=10)
+
+    assert result["vectors"] == 25
+    assert sorted(client.collections) == ["omni_knowledge"]
+    live = client.get_collection("omni_knowledge")
+    assert live.count() == 25
+    assert live.metadata == config.hnsw_settings("omni_knowledge")
+
+
+def test_open_store_follows_the_swap(client):
+    fill(client.create_collection("omni_knowledge"), 5)
+    store = vector_store._stores["omni_knowledge"] = FakeStore(client.get_collection("omni_knowledge"))
+
+    vector_store.rebuild_collection("omni_knowledge")
+
+    assert store._collection is client.get_collection("omni_knowledge")
+    assert vector_store.existing_ids(["1", "4", "9"], vector_db=store) == {"1", "4"}
+
+
+def test_interrupted_swap_restores_the_original(client):
+    # Renamed to the backup, stopped before the copy took its place
+    fill(client.create_collection("omni_knowledge_backup"), 7)
+    fill(client.create_collection("omni_knowledge_rebuild"), 3)
+
+    vector_store.recover_collections(client)
+
+    assert sorted(client.collections) == ["omni_knowledge"]
+    assert client.get_collection("omni_knowledge").count() == 7
+
+
+def test_finished_swap_drops_the_backup(client):
+    fill(client.create_collection("omni_knowledge"), 7)
+    fill(client.create_collection("omni_knowledge_backup"), 7)
+
+    vector_store.recover_collections(client)
+
+    assert sorted(client.collections) == ["omni_knowledge"]
+
+
+def test_copy_is_kept_when_it_is_the_only_one(client):
+    fill(client.create_collection("omni_knowledge_rebuild"), 4)
+
+    vector_store.recover_collections(client)
+
+    assert client.get_collection("omni_knowledge").count() == 4
+
+
+def test_partial_copy_next_to_the_live_collection_is_dropped(client):
+    fill(client.create_collection("omni_knowledge"), 9)
+    fill(client.create_collection("omni_knowledge_rebuild"), 2)
+
+    vector_store.rebuild_collection("omni_knowledge")
+
+    assert sorted(client.collections) == ["omni_knowledge"]
+    assert client.get_collection("omni_knowledge").count() == 9
+
+
+def test_swap_waits_for_running_reads():
+    guard = vector_store.SwapGuard()
+    events = []
+    reading = threading.Event()
+
+    def reader():
+        with guard.reading():
+            reading.set()
+            time.sleep(0.05)
+            events.append("read done")
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    reading.wait()
+    with guard.swapping():
+        events.append("swapped")
+    thread.join()
+    assert events == ["read done", "swapped"]
+
+
+def test_rebuild_needed_compares_against_chroma_defaults(client, monkeypatch):
+    monkeypatch.setattr(config, "HNSW_M", 16)
+    monkeypatch.setattr(config, "HNSW_EF_CONSTRUCTION", 100)
+    monkeypatch.setattr(config, "HNSW_EF_SEARCH", 10)
+    client.create_collection("omni_knowledge")  # Created before the settings existed: no hnsw:* metadata
+    client.create_collection("omni_corrections", metadata={"hnsw:M": 8})
+
+    needed = {c["name"]: c["rebuild_needed"] for c in vector_store.index_stats()["collections"]}
+
+    assert needed == {"omni_knowledge": False, "omni_corrections": True}
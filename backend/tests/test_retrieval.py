@@ -0,0 +1,95 @@
+from types import SimpleNamespace
+
+import pytest
+
+import config
+import retrieval
+from lexical_index import LexicalIndex
+
+
+class FakeCollection:
+    """Just enough of a Chroma collection for hybrid_search: fixed 2-d vectors, squared L2 distances."""
+
+    def __init__(self, chunks):
+        self.chunks = chunks  # {id: (text, vector)}
+
+    def query(self, query_embeddings, n_results, where=None, include=None):
+        query = query_embeddings[0]
+        distance = {doc_id: sum((a - b) ** 2 for a, b in zip(query, vector)) for doc_id, (_, vector) in self.chunks.items()}
+        ids = sorted(distance, key=distance.get)[:n_results]
+        return {
+            "ids": [ids],
+            "documents": [[self.chunks[doc_id][0] for doc_id in ids]],
+            "metadatas": [[{} for _ in ids]],
+            "distances": [[distance[doc_id] for doc_id in ids]],
+        }
+
+    def get(self, ids=None, include=None):
+        ids = [doc_id for doc_id in ids if doc_id in self.chunks]
+        return {
+            "ids": ids,
+            "embeddings": [self.chunks[doc_id][1] for doc_id in ids],
+            "documents": [self.chunks[doc_id][0] for doc_id in ids],
+            "metadatas": [{} for _ in ids],
+        }
+
+
+# The query embeds to NEAR; FAR is what the embedding makes of chunks it does not relate to the query
+NEAR, FAR = [1.0, 0.0], [0.0, 1.0]
+
+
+@pytest.fixture
+def search(tmp_path):
+    def run(query, chunks, k=5):
+        store = SimpleNamespace(_collection=FakeCollection(chunks), embeddings=SimpleNamespace(embed_query=lambda text: NEAR))
+        lexical = LexicalIndex(str(tmp_path / "lexical.db"))
+        lexical.add(list(chunks), [text for text, _ in chunks.values()])
+        results = retrieval.hybrid_search(query, k=k, vector_db=store, lexical_index=lexical, rerank=False)
+        return {doc.id: relevance for doc, relevance in results}
+    return run
+
+
+def test_identifiers_need_identifier_shape():
+    assert retrieval._identifiers("What is AI?") == set()
+    assert retrieval._identifiers("US GDP growth") == set()
+    assert retrieval._identifiers("what is ERR-4242 and user_id in v2.1 or getUserById, X-Request-Id") == {
+        "err-4242", "user_id", "v2.1", "getuserbyid", "x-request-id"
+    }
+
+
+def test_acronym_question_does_not_floor_unrelated_chunks(search):
+    relevance = search("What is AI?", {
+        "said": ("He said it again and again.", FAR),
+        "rain": ("Spain had more rain than usual this year.", FAR),
+    })
+    assert relevance
+    assert all(score < config.RELEVANCE_WEB_THRESHOLD for score in relevance.values())
+
+
+def test_identifier_matches_whole_tokens_only(search):
+    relevance = search("Why did ERR-4242 happen?", {
+        "code": ("The proxy returned ERR-4242 after the certificate expired.", FAR),
+        "longer": ("ERR-42421 is an unrelated disk warning.", FAR),
+    })
+    assert relevance["code"] >= config.RELEVANCE_LOCAL_THRESHOLD
+    assert relevance.get("longer", 0.0) < config.RELEVANCE_WEB_THRESHOLD
+
+
+def test_chunk_only_bm25_finds_passes_the_gate(search):
+    relevance = search("Who handled the Kowalczyk refund?", {
+        "answer": ("Kowalczyk refund handled by Marta from the Gdansk office.", FAR),
+        "revenue": ("Quarterly revenue grew in the northern region.", NEAR),
+        "hiring": ("The hiring plan for next year adds two engineers.", NEAR),
+        "office": ("The office moves to a new building in spring.", NEAR),
+    })
+    assert "answer" in relevance
+    assert relevance["answer"] >= config.RELEVANCE_WEB_THRESHOLD
+
+
+def test_partial_term_overlap_stays_below_the_gate(search):
+    relevance = search("Who handled the Kowalczyk refund?", {
+        "answer": ("Kowalczyk refund handled by Marta from the Gdansk office.", FAR),
+        "partial": ("Refund requests are answered within two days.", FAR),
+        "other": ("The office moves to a new building in spring.", FAR),
+    })
+    assert relevance["partial"] < config.RELEVANCE_WEB_THRESHOLD
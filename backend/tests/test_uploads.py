@@ -0,0 +1,89 @@
+import asyncio
+import hashlib
+import os
+
+import pytest
+from fastapi import HTTPException
+
+import config
+import uploads
+
+BOUNDARY = "omniboundary"
+
+
+class FakeRequest:
+    """A request whose body arrives in blocks; `sent` counts the blocks the server has read."""
+
+    def __init__(self, files, block_size=1024, content_length=True):
+        body = b""
+        for name, data in files:
+            body += (
+                f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="file"; filename="{name}"\r\n'
+                f"Content-Type: application/octet-stream\r\n\r\n"
+            ).encode() + data + b"\r\n"
+        body += f"--{BOUNDARY}--\r\n".encode()
+        self.blocks = [body[i:i + block_size] for i in range(0, len(body), block_size)]
+        self.headers = {"content-type": f"multipart/form-data; boundary={BOUNDARY}"}
+        if content_length:
+            self.headers["content-length"] = str(len(body))
+        self.sent = 0
+
+    async def stream(self):
+        for block in self.blocks:
+            self.sent += 1
+            yield block
+
+
+@pytest.fixture(autouse=True)
+def upload_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setitem(uploads.UPLOAD_LIMITS_MB, "image", 1)
+    return tmp_path
+
+
+def spool(request, **kwargs):
+    return asyncio.run(uploads.spool_upload(request, "image", "job", **kwargs))
+
+
+def test_files_are_written_and_hashed_as_they_arrive(upload_dir):
+    first, second = os.urandom(5000), os.urandom(300)
+
+    spooled = spool(FakeRequest([("a b.png", first), ("c.png", second)]), max_files=2)
+
+    assert [item["filename"] for item in spooled] == ["a b.png", "c.png"]
+    assert [os.path.basename(item["path"]) for item in spooled] == ["job_0_a_b.png", "job_1_c.png"]
+    for item, data in zip(spooled, (first, second)):
+        assert open(item["path"], "rb").read() == data
+        assert item["sha256"] == hashlib.sha256(data).hexdigest()
+
+
+def test_declared_length_over_the_limit_is_rejected_before_reading(upload_dir):
+    request = FakeRequest([("big.png", b"x" * (2 * 1024 * 1024))])
+
+    with pytest.raises(HTTPException) as error:
+        spool(request)
+
+    assert error.value.status_code == 413
+    assert request.sent == 0
+
+
+def test_streamed_body_is_cut_off_at_the_limit(upload_dir):
+    request = FakeRequest([("big.png", b"x" * (3 * 1024 * 1024))], block_size=64 * 1024, content_length=False)
+
+    with pytest.raises(HTTPException) as error:
+        spool(request)
+
+    assert error.value.status_code == 413
+    assert request.sent < len(request.blocks) / 2
+    assert os.listdir(upload_dir) == []
+
+
+def test_wrong_type_and_extra_files_leave_nothing_behind(upload_dir):
+    with pytest.raises(HTTPException) as error:
+        spool(FakeRequest([("notes.exe", b"MZ")]), extensions=[".png"])
+    assert error.value.status_code == 400
+
+    with pytest.raises(HTTPException) as error:
+        spool(FakeRequest([("a.png", b"1"), ("b.png", b"2")]))
+    assert error.value.status_code == 400
+    assert os.listdir(upload_dir) == []
@@ -0,0 +1,192 @@
+"""
+Upload spooling shared by every ingest endpoint.
+The multipart body is parsed as it arrives from the client (not from Starlette's own spooled
+copy), each file part written straight to a unique file under UPLOAD_DIR and hashed on the
+way. Parsing, hashing and file writes run on a worker thread, one received block at a time,
+so a large upload never blocks the event loop. Uploads over the limit for their type get a
+413 from Content-Length before any of the body is read, or as soon as a part passes the
+limit; nothing runs a model before that.
+Jobs receive the file path and delete it when they are done; files orphaned by a crash are
+swept at startup.
+"""
+import asyncio
+import contextlib
+import hashlib
+import os
+import re
+import time
+
+from fastapi import HTTPException
+
+import config
+import metrics
+
+try:
+    from python_multipart import MultipartParser
+    from python_multipart.multipart import parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    from multipart import MultipartParser
+    from multipart.multipart import parse_options_header
+
+UPLOAD_LIMITS_MB = {
+    "audio": config.MAX_AUDIO_UPLOAD_MB,
+    "image": config.MAX_IMAGE_UPLOAD_MB,
+    "text": config.MAX_DOCUMENT_UPLOAD_MB,
+}
+
+# Boundaries and part headers allowed on top of the file bytes, per file
+_PART_OVERHEAD = 64 * 1024
+
+
+def _too_large(filename, limit_mb):
+    return HTTPException(status_code=413, detail=f"{filename} exceeds the {limit_mb} MB upload limit")
+
+
+def _safe_name(filename):
+    name = os.path.basename(filename or "upload")
+    return re.sub(r"[^\w.\-]", "_", name)[-100:] or "upload"
+
+
+class _Spool:
+    """python-multipart callbacks that write every file part to its own spool file."""
+
+    def __init__(self, kind, prefix, max_files, extensions):
+        self.limit_mb = UPLOAD_LIMITS_MB[kind]
+        self.limit = self.limit_mb * 1024 * 1024
+        self.prefix = prefix
+        self.max_files = max_files
+        self.extensions = extensions
+        self.files = []
+        self._headers = {}
+        self._field = self._value = b""
+        self._out = None
+
+    def callbacks(self):
+        names = ("on_part_begin", "on_header_field", "on_header_value", "on_header_end",
+                 "on_headers_finished", "on_part_data", "on_part_end")
+        return {name: getattr(self, name) for name in names}
+
+    def on_part_begin(self):
+        self._headers = {}
+
+    def on_header_field(self, data, start, end):
+        self._field += data[start:end]
+
+    def on_header_value(self, data, start, end):
+        self._value += data[start:end]
+
+    def on_header_end(self):
+        self._headers[self._field.lower()] = self._value
+        self._field = self._value = b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        if b"filename" not in options:
+            return  # A plain form field: nothing to spool
+        filename = options[b"filename"].decode("utf-8", "replace")
+        if len(self.files) == self.max_files:
+            raise HTTPException(status_code=400, detail=f"At most {self.max_files} files per upload")
+        if self.extensions and os.path.splitext(filename)[1].lower() not in self.extensions:
+            raise HTTPException(status_code=400, detail=f"Only {self.extensions} files are supported")
+        name = self.prefix if self.max_files == 1 else f"{self.prefix}_{len(self.files)}"
+        path = os.path.join(config.UPLOAD_DIR, f"{name}_{_safe_name(filename)}")
+        self.files.append({"path": path, "filename": filename, "size": 0, "digest": hashlib.sha256()})
+        self._out = open(path, "wb")
+
+    def on_part_data(self, data, start, end):
+        if self._out is None:
+            return
+        current = self.files[-1]
+        current["size"] += end - start
+        if current["size"] > self.limit:
+            raise _too_large(current["filename"], self.limit_mb)
+        current["digest"].update(data[start:end])
+        self._out.write(data[start:end])
+
+    def on_part_end(self):
+        if self._out is not None:
+            self.close()
+            self.files[-1]["sha256"] = self.files[-1].pop("digest").hexdigest()
+
+    def close(self):
+        if self._out is not None:
+            self._out.close()
+            self._out = None
+
+
+async def spool_upload(request, kind, prefix, max_files=1, extensions=None):
+    """
+    Streams the file part(s) of a multipart/form-data request to UPLOAD_DIR/<prefix>_<name>
+    and returns [{"path", "sha256", "filename", "size"}] in upload order.
+    `prefix` must be unique (job id), so concurrent uploads with the same name never collide;
+    `extensions` rejects other file types as soon as a part's headers arrive.
+    """
+    spool = _Spool(kind, prefix, max_files, extensions)
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or not options.get(b"boundary"):
+        raise HTTPException(status_code=400, detail="Expected a multipart/form-data upload")
+    length = request.headers.get("content-length", "")
+    if length.isdigit() and int(length) > (spool.limit + _PART_OVERHEAD) * max_files:
+        raise _too_large("Upload", spool.limit_mb)
+
+    os.makedirs(config.UPLOAD_DIR, exist_ok=True)
+    parser = MultipartParser(options[b"boundary"], spool.callbacks())
+    try:
+        with metrics.stage("upload_spool"):
+            async for block in request.stream():
+                await asyncio.to_thread(parser.write, block)
+            await asyncio.to_thread(parser.finalize)
+        if not spool.files or any("sha256" not in item for item in spool.files):
+            raise HTTPException(status_code=400, detail="The upload contains no complete file")
+    except BaseException:
+        spool.close()
+        for item in spool.files:
+            remove_upload(item["path"])
+        raise
+    return spool.files
+
+
+def remove_upload(path):
+    if path and os.path.exists(path):
+        os.remove(path)
+
+
+@contextlib.contextmanager
+def consuming(*paths):
+    """
+    Deletes spool files once a job is done with them, whether it succeeded or failed.
+    A job cancelled by shutdown keeps its files: it is re-queued on the next start.
+    """
+    cancelled = False
+    try:
+        yield
+    except asyncio.CancelledError:
+        cancelled = True
+        raise
+    finally:
+        if not cancelled:
+            for path in paths:
+                remove_upload(path)
+
+
+def payload_paths(payload):
+    """Spool files referenced by a job payload."""
+    if not payload:
+        return []
+    paths = [payload["path"]] if payload.get("path") else []
+    return paths + [f["path"] for f in payload.get("files", [])]
+
+
+def sweep_orphans(keep, min_age_seconds=3600):
+    """Deletes spool files no queued/running job refers to (left behind by a crash)."""
+    if not os.path.isdir(config.UPLOAD_DIR):
+        return 0
+    keep = {os.path.abspath(p) for p in keep}
+    cutoff = time.time() - min_age_seconds
+    removed = 0
+    with os.scandir(config.UPLOAD_DIR) as entries:
+        for entry in entries:
+            if entry.is_file() and os.path.abspath(entry.path) not in keep and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                removed += 1
+    return removed
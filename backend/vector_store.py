@@ -1,32 +1,650 @@
+import hashlib
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
+
 import config
-from langchain_chroma import Chroma
-from langchain_huggingface import HuggingFaceEmbeddings
+import metrics
+from langchain_core.embeddings import Embeddings
 
-# Global variable to hold the singleton instance
-_db_instance = None
+# Global variables to hold the singleton instances
+_clients = {}
+_client_lock = threading.Lock()
+_stores = {}
+_store_lock = threading.Lock()
+_embedding_service = None
+_embedding_lock = threading.Lock()
 
-def get_vector_store():
-    global _db_instance
-    
-    # Return existing instance if created (Singleton Pattern)
-    if _db_instance is not None:
-        return _db_instance
+# Chroma writes wait while rebuild_collection() copies a collection
+write_lock = threading.RLock()
+
+# Names rebuild_collection() gives the copy being built and the original while they are swapped
+_REBUILD_SUFFIX = "_rebuild"
+_BACKUP_SUFFIX = "_backup"
+
+
+class SwapGuard:
+    """
+    Reads share it; the rename in rebuild_collection() takes it alone, so a read never sees a
+    collection half-swapped and new reads wait only for the rename, never for the copy.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._swapping = False
+
+    @contextmanager
+    def reading(self):
+        with self._cond:
+            while self._swapping:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def swapping(self):
+        with self._cond:
+            while self._swapping:
+                self._cond.wait()
+            self._swapping = True
+            while self._readers:
+                self._cond.wait()
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._swapping = False
+                self._cond.notify_all()
+
+
+swap_guard = SwapGuard()
+
+# Callbacks fired after every write/delete through this module (e.g. answer cache invalidation)
+_write_listeners = []
+
+def add_write_listener(callback):
+    _write_listeners.append(callback)
+
+def _notify_write():
+    for callback in _write_listeners:
+        callback()
+
+def create_embeddings():
+    # Imported here: pulls in torch + sentence-transformers, only needed once we embed
+    from langchain_huggingface import HuggingFaceEmbeddings
 
-    print("🔌 Connecting to Vector Database...")
-    
     # Initialize Local Embeddings (Running on CPU)
-    embeddings = HuggingFaceEmbeddings(
+    return HuggingFaceEmbeddings(
         model_name=config.EMBEDDING_MODEL_PATH,
         model_kwargs={'device': config.EMBEDDING_DEVICE},
-        encode_kwargs={'normalize_embeddings': True}
+        encode_kwargs={'normalize_embeddings': True, 'batch_size': config.EMBED_BATCH_SIZE}
     )
 
-    # Connect to ChromaDB
-    _db_instance = Chroma(
-        persist_directory=config.VECTOR_DB_PATH,
-        embedding_function=embeddings,
-        collection_name=config.COLLECTION_NAME
+class EmbeddingService(Embeddings):
+    """
+    Shared front-end to the BGE model.
+    Queries go through an LRU cache keyed by text hash, and cache misses from concurrent
+    callers are merged by a micro-batcher into one forward pass (it waits up to
+    `max_wait_ms` for company). Bulk document embedding goes straight to the model,
+    which already batches it.
+    """
+
+    def __init__(self, model, cache_size=4096, max_batch=32, max_wait_ms=5):
+        self.model = model
+        self.cache_size = cache_size
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._pending = queue.Queue()
+        self._batcher = None
+        self._batcher_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "batches": 0, "batched_texts": 0, "max_batch_size": 0, "documents_embedded": 0}
+
+    @staticmethod
+    def _key(text):
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    def _count(self, **deltas):
+        with self._stats_lock:
+            for name, value in deltas.items():
+                self._stats[name] += value
+
+    def embed_documents(self, texts):
+        self._count(documents_embedded=len(texts))
+        return self.model.embed_documents(texts)
+
+    def embed_query(self, text):
+        key = self._key(text)
+        with self._cache_lock:
+            vector = self._cache.get(key)
+            if vector is not None:
+                self._cache.move_to_end(key)
+        if vector is not None:
+            self._count(hits=1)
+            return list(vector)
+
+        self._count(misses=1)
+        if self.max_wait <= 0:
+            vector = self.model.embed_query(text)
+        else:
+            future = Future()
+            self._ensure_batcher()
+            self._pending.put((text, future))
+            vector = future.result()
+
+        with self._cache_lock:
+            self._cache[key] = tuple(vector)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return list(vector)
+
+    def _ensure_batcher(self):
+        if self._batcher is None:
+            with self._batcher_lock:
+                if self._batcher is None:
+                    self._batcher = threading.Thread(target=self._batch_loop, name="omni-embed-batcher", daemon=True)
+                    self._batcher.start()
+
+    def _batch_loop(self):
+        while True:
+            batch = [self._pending.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._pending.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            unique = list(dict.fromkeys(text for text, _ in batch))
+            try:
+                vectors = dict(zip(unique, self.model.embed_documents(unique)))
+                for text, future in batch:
+                    future.set_result(vectors[text])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+
+            with self._stats_lock:
+                self._stats["batches"] += 1
+                self._stats["batched_texts"] += len(unique)
+                self._stats["max_batch_size"] = max(self._stats["max_batch_size"], len(unique))
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        stats["avg_batch_size"] = round(stats["batched_texts"] / stats["batches"], 2) if stats["batches"] else 0.0
+        with self._cache_lock:
+            stats["cached"] = len(self._cache)
+        return stats
+
+def embedding_service_stats():
+    """Stats without forcing the model to load."""
+    return _embedding_service.stats() if _embedding_service is not None else {"loaded": False}
+
+def get_embedding_service():
+    global _embedding_service
+    if _embedding_service is None:
+        with _embedding_lock:
+            if _embedding_service is None:
+                _embedding_service = EmbeddingService(
+                    create_embeddings(),
+                    cache_size=config.EMBED_CACHE_SIZE,
+                    max_batch=config.EMBED_MICROBATCH_SIZE,
+                    max_wait_ms=config.EMBED_MICROBATCH_WAIT_MS
+                )
+    return _embedding_service
+
+def get_client(persist_directory):
+    """One Chroma client per directory, shared by every store opened on it."""
+    with _client_lock:
+        client = _clients.get(persist_directory)
+        if client is None:
+            import chromadb
+            client = chromadb.PersistentClient(path=persist_directory)
+            recover_collections(client)
+            _clients[persist_directory] = client
+    return client
+
+def _is_rebuild_leftover(name):
+    return name.endswith(_REBUILD_SUFFIX) or name.endswith(_BACKUP_SUFFIX)
+
+def collection_names(client, include_rebuilds=False):
+    """Live collection names (copies and backups of a running or interrupted rebuild only if asked)."""
+    # list_collections() returns names on newer Chroma, Collection objects on older ones
+    names = [getattr(collection, "name", collection) for collection in client.list_collections()]
+    return names if include_rebuilds else [name for name in names if not _is_rebuild_leftover(name)]
+
+def _recover_collection(client, name):
+    """
+    Puts a collection back together after a rebuild was interrupted; never drops the only copy.
+    A missing collection comes back from its backup (the original) or, failing that, from the copy;
+    whatever is left over next to a live collection is dropped.
+    """
+    names = set(collection_names(client, include_rebuilds=True))
+    backup, temp = name + _BACKUP_SUFFIX, name + _REBUILD_SUFFIX
+    if name not in names:
+        restore = backup if backup in names else temp if temp in names else None
+        if restore is None:
+            return
+        client.get_collection(restore).modify(name=name)
+        names.discard(restore)
+        print(f"⚠️ Restored collection {name} from {restore} (interrupted rebuild)")
+    for leftover in (backup, temp):
+        if leftover in names:
+            client.delete_collection(leftover)
+            print(f"🧹 Dropped {leftover} left over from an interrupted rebuild")
+
+def recover_collections(client):
+    """Runs _recover_collection for every collection with rebuild leftovers (on first use of a client)."""
+    names = collection_names(client, include_rebuilds=True)
+    for name in names:
+        for suffix in (_REBUILD_SUFFIX, _BACKUP_SUFFIX):
+            if name.endswith(suffix):
+                _recover_collection(client, name[:-len(suffix)])
+
+def create_vector_store(persist_directory, collection_name, embeddings=None):
+    """
+    Builds a Chroma store (used by the singletons and by benchmarks on scratch dirs).
+    A new collection is created with its HNSW settings (config.hnsw_settings); an existing
+    one keeps the settings it was built with until rebuild_collection().
+    """
+    from langchain_chroma import Chroma
+
+    client = get_client(persist_directory)
+    if collection_name not in collection_names(client):
+        client.get_or_create_collection(collection_name, metadata=config.hnsw_settings(collection_name))
+    return Chroma(
+        client=client,
+        embedding_function=embeddings or get_embedding_service(),
+        collection_name=collection_name
     )
-    
+
+def open_store(collection_name):
+    """Shared store for a collection in VECTOR_DB_PATH (rebuild_collection repoints it at the new copy)."""
+    store = _stores.get(collection_name)
+    if store is None:
+        with _store_lock:
+            store = _stores.get(collection_name)
+            if store is None:
+                store = _stores[collection_name] = create_vector_store(config.VECTOR_DB_PATH, collection_name)
+    return store
+
+def get_vector_store():
+    # Reduced precision: the knowledge base lives in quantized_index instead of Chroma
+    if knowledge_base_precision() != "float32":
+        from quantized_index import get_quantized_store
+        return get_quantized_store()
+
+    # Return existing instance if created (Singleton Pattern)
+    if config.COLLECTION_NAME in _stores:
+        return _stores[config.COLLECTION_NAME]
+
+    print("🔌 Connecting to Vector Database...")
+
+    # Connect to ChromaDB
+    store = open_store(config.COLLECTION_NAME)
+
     print("✅ Vector Database Connected.")
-    return _db_instance
+    return store
+
+def _knowledge_collection_names(client):
+    """The knowledge base's Chroma collections: the single one and any per-source partitions."""
+    prefix = config.COLLECTION_NAME + "_"
+    return [name for name in collection_names(client) if name == config.COLLECTION_NAME or name.startswith(prefix)]
+
+# Where the knowledge base is stored ("float32": Chroma, else the quantized index); decided on first use
+_knowledge_base_precision = None
+_precision_lock = threading.Lock()
+
+def knowledge_base_precision():
+    """
+    VECTOR_PRECISION, unless the chunks are still in the other store: that store then keeps
+    serving (with a warning) until migrate_knowledge_base() moves them.
+    """
+    global _knowledge_base_precision
+    if _knowledge_base_precision is None:
+        with _precision_lock:
+            if _knowledge_base_precision is None:
+                _knowledge_base_precision = _stored_precision()
+    return _knowledge_base_precision
+
+def _stored_precision():
+    from quantized_index import QuantizedIndex, SERVING_PRECISION
+
+    wanted = config.VECTOR_PRECISION
+    if wanted == "float32":
+        stored = SERVING_PRECISION
+        left = QuantizedIndex(config.QUANTIZED_INDEX_PATH).count() if os.path.exists(config.QUANTIZED_INDEX_PATH) else 0
+    else:
+        stored = "float32"
+        client = get_client(config.VECTOR_DB_PATH)
+        left = sum(client.get_collection(name).count() for name in _knowledge_collection_names(client))
+    if not left:
+        return wanted
+    where = "Chroma" if stored == "float32" else "the reduced-precision index"
+    print(f"⚠️ VECTOR_PRECISION={wanted}, but {left} chunks are still in {where}: "
+          "serving them from there until POST /admin/index/migrate moves them")
+    return stored
+
+def _copy_verified(source, target, label, page_size=1000):
+    """copy_collection(), then checks every chunk of `source` is in `target` (raises before anything is dropped)."""
+    from quantized_index import copy_collection
+
+    print(f"⏳ Moving {label} into the {config.VECTOR_PRECISION} store...")
+    copied = copy_collection(source, target, page_size)
+    ids = source.get(include=[])["ids"]
+    found = set()
+    for i in range(0, len(ids), page_size):
+        found.update(target.get(ids=ids[i:i + page_size], include=[])["ids"])
+    if len(found) != len(ids):
+        raise RuntimeError(f"{len(ids) - len(found)} of {len(ids)} chunks from {label} are missing after the copy; nothing was dropped")
+    print(f"✅ Moved {copied} chunks from {label}")
+    return copied
+
+def migrate_knowledge_base():
+    """
+    Moves the knowledge base to the store VECTOR_PRECISION asks for (POST /admin/index/migrate):
+    the Chroma collection(s) into the quantized index for float16 / int8, back into Chroma for
+    float32. Writes wait meanwhile and reads keep using the old store; each source is dropped
+    only once all of its chunks are found in the target. Returns {"from", "to", "moved"}.
+    """
+    global _knowledge_base_precision, _partitioned
+    from quantized_index import get_quantized_store, close_quantized_store
+
+    source, target = knowledge_base_precision(), config.VECTOR_PRECISION
+    if source == target:
+        return {"from": source, "to": target, "moved": 0}
+    moved = 0
+    with write_lock:
+        index = get_quantized_store()._collection
+        client = get_client(config.VECTOR_DB_PATH)
+        names = []
+        if target == "float32":
+            moved = _copy_verified(index, open_store(config.COLLECTION_NAME)._collection, "the reduced-precision index")
+        else:
+            names = _knowledge_collection_names(client)
+            for name in names:
+                moved += _copy_verified(client.get_collection(name), index, name)
+        # Reads in flight finish on the old store, later ones go to the new one
+        with swap_guard.swapping():
+            _knowledge_base_precision = target
+            # Partitions are filled again from the single collection if PARTITION_BY_SOURCE is on
+            _partitioned = False
+            for name in names:
+                client.delete_collection(name)
+                with _store_lock:
+                    _stores.pop(name, None)
+            if target == "float32":
+                index.clear()
+                close_quantized_store()
+    if moved:
+        _notify_write()
+    return {"from": source, "to": target, "moved": moved}
+
+# Source types that get their own collection with PARTITION_BY_SOURCE (anything else goes to "other")
+SOURCE_TYPES = ("audio", "image", "document", "knowledge_folder")
+_partitioned = False
+_partition_lock = threading.Lock()
+
+def partition_for(source):
+    return source if source in SOURCE_TYPES else "other"
+
+def _move_into_partitions(vector_db, partitions, page_size=1000):
+    """Moves chunks from the single collection into the partitions, embeddings included (nothing is re-embedded)."""
+    collection = vector_db._collection
+    if not collection.count():
+        return
+    print("⏳ Moving chunks into per-source partitions...")
+    moved = 0
+    with write_lock:
+        while True:
+            page = collection.get(include=["documents", "metadatas", "embeddings"], limit=page_size)
+            if not page["ids"]:
+                break
+            rows = {}
+            for i, metadata in enumerate(page["metadatas"]):
+                rows.setdefault(partition_for((metadata or {}).get("source")), []).append(i)
+            for name, indices in rows.items():
+                partitions[name]._collection.upsert(
+                    ids=[page["ids"][i] for i in indices],
+                    embeddings=[page["embeddings"][i] for i in indices],
+                    documents=[page["documents"][i] for i in indices],
+                    metadatas=[page["metadatas"][i] for i in indices]
+                )
+            collection.delete(ids=page["ids"])
+            moved += len(page["ids"])
+    print(f"✅ Moved {moved} chunks into partitions")
+
+def use_partitions():
+    """Per-source collections are used: PARTITION_BY_SOURCE, with the knowledge base in Chroma (float32)."""
+    return config.PARTITION_BY_SOURCE and knowledge_base_precision() == "float32"
+
+def get_partitions():
+    """{source type: Chroma store}, one collection each (only used when use_partitions())."""
+    global _partitioned
+    partitions = {name: open_store(f"{config.COLLECTION_NAME}_{name}") for name in SOURCE_TYPES + ("other",)}
+    if not _partitioned:
+        with _partition_lock:
+            if not _partitioned:
+                _move_into_partitions(get_vector_store(), partitions)
+                _partitioned = True
+    return partitions
+
+def vector_stores(sources=None):
+    """The stores a read has to cover: the partitions for `sources` (all if None), or the single collection."""
+    if not use_partitions():
+        return [get_vector_store()]
+    partitions = get_partitions()
+    if sources is None:
+        return list(partitions.values())
+    return [partitions[name] for name in dict.fromkeys(partition_for(source) for source in sources)]
+
+def _lexical_for(vector_db, lexical_index):
+    """The BM25 index to keep in step: the given one, or the shared one for the main store."""
+    if lexical_index is not None or vector_db is not None or not config.HYBRID_SEARCH_ENABLED:
+        return lexical_index
+    from lexical_index import get_lexical_index
+    return get_lexical_index()
+
+def add_texts_bulk(texts, metadatas=None, ids=None, vector_db=None, batch_size=None, upsert_size=None, lexical_index=None):
+    """
+    Bulk ingestion path for many chunks at once.
+    Embeds `batch_size` texts per forward pass and writes to Chroma in `upsert_size`
+    upserts, instead of one embedding call + one write per chunk via add_texts.
+    The same chunks are added to the BM25 index. Every chunk is stamped with `ingested_at`
+    (epoch seconds) for date filters. Returns the ids written.
+    """
+    lexical_index = _lexical_for(vector_db, lexical_index)
+    batch_size = batch_size or config.EMBED_BATCH_SIZE
+    upsert_size = upsert_size or config.UPSERT_BATCH_SIZE
+
+    texts = list(texts)
+    now = int(time.time())
+    metadatas = [{"ingested_at": now, **(meta or {})} for meta in (metadatas if metadatas is not None else [{} for _ in texts])]
+    ids = list(ids) if ids is not None else [str(uuid.uuid4()) for _ in texts]
+
+    if vector_db is None and use_partitions():
+        # Each source type goes to its own collection
+        rows = {}
+        for i, meta in enumerate(metadatas):
+            rows.setdefault(partition_for(meta.get("source")), []).append(i)
+        for name, indices in rows.items():
+            add_texts_bulk(
+                [texts[i] for i in indices], [metadatas[i] for i in indices], [ids[i] for i in indices],
+                vector_db=get_partitions()[name], batch_size=batch_size, upsert_size=upsert_size,
+                lexical_index=lexical_index
+            )
+        return ids
+
+    vector_db = vector_db or get_vector_store()
+
+    # Chroma rejects writes above its own max batch size
+    max_batch = getattr(vector_db._client, "get_max_batch_size", lambda: upsert_size)()
+    upsert_size = min(upsert_size, max_batch)
+
+    pending = {"ids": [], "documents": [], "metadatas": [], "embeddings": []}
+
+    def flush():
+        for i in range(0, len(pending["ids"]), upsert_size):
+            with metrics.stage("upsert"), write_lock:
+                # Looked up under the lock: a rebuild may have swapped the collection since the last batch
+                vector_db._collection.upsert(**{key: values[i:i + upsert_size] for key, values in pending.items()})
+        for key in pending:
+            pending[key] = []
+
+    for start in range(0, len(texts), batch_size):
+        batch = texts[start:start + batch_size]
+        with metrics.stage("embed"):
+            vectors = vector_db.embeddings.embed_documents(batch)
+        pending["embeddings"].extend(vectors)
+        pending["documents"].extend(batch)
+        pending["metadatas"].extend(metadatas[start:start + batch_size])
+        pending["ids"].extend(ids[start:start + batch_size])
+        if len(pending["ids"]) >= upsert_size:
+            flush()
+    flush()
+
+    if lexical_index is not None:
+        with metrics.stage("bm25_index"):
+            lexical_index.add(ids, texts, metadatas)
+    metrics.CHUNKS_WRITTEN.inc(len(ids))
+    _notify_write()
+    return ids
+
+def existing_ids(ids, vector_db=None):
+    """Returns the subset of `ids` already stored in the collection (no embeddings loaded)."""
+    ids = list(ids)
+    found = set()
+    for store in ([vector_db] if vector_db is not None else vector_stores()):
+        with swap_guard.reading():
+            found.update(store._collection.get(ids=ids, include=[])["ids"])
+    return found
+
+
+def delete_where(where, vector_db=None, lexical_index=None):
+    """Deletes every vector whose metadata matches a Chroma `where` filter (e.g. {"path": ...})."""
+    lexical_index = _lexical_for(vector_db, lexical_index)
+    deleted = False
+    for store in ([vector_db] if vector_db is not None else vector_stores()):
+        with write_lock:
+            ids = store._collection.get(where=where, include=[])["ids"]
+            if ids:
+                store._collection.delete(ids=ids)
+        if ids and lexical_index is not None:
+            lexical_index.delete(ids)
+        deleted = deleted or bool(ids)
+    if deleted:
+        _notify_write()
+
+def update_metadata_where(where, fields, vector_db=None, lexical_index=None):
+    """Adds `fields` to the metadata of every chunk matching a Chroma `where` filter, without re-embedding."""
+    lexical_index = _lexical_for(vector_db, lexical_index)
+    for store in ([vector_db] if vector_db is not None else vector_stores()):
+        with write_lock:
+            found = store._collection.get(where=where, include=["metadatas"])
+            ids = found["ids"]
+            metadatas = [{**(meta or {}), **fields} for meta in found["metadatas"]]
+            for i in range(0, len(ids), config.UPSERT_BATCH_SIZE):
+                store._collection.update(ids=ids[i:i + config.UPSERT_BATCH_SIZE], metadatas=metadatas[i:i + config.UPSERT_BATCH_SIZE])
+        if ids and lexical_index is not None:
+            lexical_index.update_metadata(ids, metadatas)
+
+# What Chroma builds a collection with when its metadata sets no hnsw:* keys
+_CHROMA_HNSW_DEFAULTS = {"space": "l2", "M": 16, "construction_ef": 100, "search_ef": 10}
+
+def _hnsw(metadata):
+    return {key[len("hnsw:"):]: value for key, value in (metadata or {}).items() if key.startswith("hnsw:")}
+
+def _directory_bytes(path):
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, name))
+            except OSError:
+                pass
+    return total
+
+def index_stats():
+    """Vectors and HNSW settings (built with vs configured) per collection, plus on-disk size."""
+    client = get_client(config.VECTOR_DB_PATH)
+    collections = []
+    with swap_guard.reading():
+        found = [(name, client.get_collection(name)) for name in sorted(collection_names(client))]
+        counts = {name: collection.count() for name, collection in found}
+    for name, collection in found:
+        built, configured = {**_CHROMA_HNSW_DEFAULTS, **_hnsw(collection.metadata)}, _hnsw(config.hnsw_settings(name))
+        collections.append({
+            "name": name,
+            "vectors": counts[name],
+            "hnsw": built,
+            "configured": configured,
+            # M / ef values only change when the collection is rebuilt
+            "rebuild_needed": any(built.get(key) != value for key, value in configured.items())
+        })
+    return {"collections": collections, "disk_bytes": _directory_bytes(config.VECTOR_DB_PATH)}
+
+def _repoint(store, collection):
+    """Points an open store at the collection swapped in under its name."""
+    # langchain_chroma keeps the collection in _chroma_collection (behind a read-only _collection) on newer versions
+    if hasattr(store, "_chroma_collection"):
+        store._chroma_collection = collection
+    else:
+        store._collection = collection
+
+def rebuild_collection(collection_name, page_size=1000):
+    """
+    Copies a collection into a fresh one built with its configured HNSW settings and swaps it in.
+    Reclaims what deleted vectors still hold in the HNSW index and applies new M / ef values.
+    Embeddings are copied, not recomputed; writes wait until the swap is done, reads only for
+    the rename. The original is renamed to a backup before the copy takes its name and is dropped
+    last, so an interruption at any point leaves a full copy for _recover_collection.
+    """
+    client = get_client(config.VECTOR_DB_PATH)
+    temp_name, backup_name = collection_name + _REBUILD_SUFFIX, collection_name + _BACKUP_SUFFIX
+    started = time.perf_counter()
+    with write_lock:
+        _recover_collection(client, collection_name)  # Leftovers of an earlier attempt in this process
+        old = client.get_collection(collection_name)
+        new = client.create_collection(temp_name, metadata=config.hnsw_settings(collection_name))
+        copied = 0
+        while True:
+            page = old.get(include=["documents", "metadatas", "embeddings"], limit=page_size, offset=copied)
+            if not page["ids"]:
+                break
+            new.upsert(ids=page["ids"], embeddings=page["embeddings"], documents=page["documents"], metadatas=page["metadatas"])
+            copied += len(page["ids"])
+
+        with swap_guard.swapping():
+            old.modify(name=backup_name)
+            try:
+                new.modify(name=collection_name)
+            except Exception:
+                old.modify(name=collection_name)
+                raise
+            with _store_lock:
+                store = _stores.get(collection_name)
+            if store is not None:
+                _repoint(store, new)  # Callers holding the store (e.g. a running ingest) follow the swap
+        client.delete_collection(backup_name)
+    print(f"✅ Rebuilt {collection_name} ({copied} vectors)")
+    return {"collection": collection_name, "vectors": copied, "hnsw": _hnsw(new.metadata), "seconds": round(time.perf_counter() - started, 1)}
@@ -0,0 +1,154 @@
+"""
+Web research front-end for the agent.
+Searches run on a small thread pool with a hard deadline, identical in-flight queries
+share one request, and results are cached on disk per normalized query for
+WEB_CACHE_TTL seconds. The provider is pluggable: "tavily" in production, "stub" (or
+any callable via set_provider) for offline tests and benchmarks.
+"""
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+import config
+from answer_cache import normalize_query
+from lazy_sqlite import LazyConnection
+
+
+class WebResultCache:
+    """Query-normalized, TTL-bound store of search results (SQLite, survives restarts)."""
+
+    _conn = LazyConnection()
+
+    def __init__(self, db_path, ttl_seconds):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _create_schema(conn):
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS web_results (
+                query TEXT PRIMARY KEY,
+                results TEXT,
+                created_at REAL
+            )
+        """)
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT results, created_at FROM web_results WHERE query = ?", (key,)).fetchone()
+        if row is None or time.time() - row[1] > self.ttl_seconds:
+            return None
+        return json.loads(row[0])
+
+    def put(self, key, results):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO web_results (query, results, created_at) VALUES (?, ?, ?)",
+                (key, json.dumps(results), time.time())
+            )
+            self._conn.execute("DELETE FROM web_results WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+
+
+# Providers: query -> list of {"url", "content"}
+_tavily_tool = None
+
+def tavily_search(query):
+    global _tavily_tool
+    if _tavily_tool is None:
+        # Built on first use; langchain_community is slow to import
+        from langchain_community.tools.tavily_search import TavilySearchResults
+        _tavily_tool = TavilySearchResults(k=3)
+    return _tavily_tool.invoke(query)
+
+def stub_search(query):
+    """Offline provider: canned results from WEB_SEARCH_STUB_FILE ({query: [results]}) after a fixed delay."""
+    time.sleep(config.WEB_SEARCH_STUB_DELAY_MS / 1000)
+    if config.WEB_SEARCH_STUB_FILE:
+        with open(config.WEB_SEARCH_STUB_FILE, "r", encoding="utf-8") as f:
+            canned = {normalize_query(q): r for q, r in json.load(f).items()}
+        if normalize_query(query) in canned:
+            return canned[normalize_query(query)]
+    return [{"url": "stub://search", "content": f"Stub web result for: {query}"}]
+
+PROVIDERS = {"tavily": tavily_search, "stub": stub_search}
+
+
+class WebSearch:
+    def __init__(self, provider, cache, timeout, workers):
+        self.provider = provider
+        self.cache = cache
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix="web")
+        self._inflight = {}  # normalized query -> (future, started)
+        self._lock = threading.Lock()
+        self.stats_counts = {"hits": 0, "misses": 0, "joined": 0, "timeouts": 0, "errors": 0}
+
+    def _count(self, key):
+        with self._lock:
+            self.stats_counts[key] += 1
+
+    def _start(self, key, query):
+        """Returns the in-flight (future, started) for `key`, submitting a search if there is none."""
+        with self._lock:
+            if key in self._inflight:
+                self.stats_counts["joined"] += 1
+                return self._inflight[key]
+            self.stats_counts["misses"] += 1
+            future = self._executor.submit(self.provider, query)
+            entry = self._inflight[key] = (future, time.monotonic())
+
+        def done(f):
+            with self._lock:
+                self._inflight.pop(key, None)
+            if not f.cancelled() and f.exception() is None:
+                self.cache.put(key, f.result())
+
+        future.add_done_callback(done)
+        return entry
+
+    def prefetch(self, query):
+        """Starts a search in the background (speculatively) unless it is cached or already running."""
+        key = normalize_query(query)
+        if self.cache.get(key) is None:
+            self._start(key, query)
+
+    def search(self, query):
+        """
+        Cached results, or the result of a (possibly already running) search. The deadline
+        counts from when the search started, so a prefetched query waits only for what is left.
+        Raises TimeoutError past the deadline; the search still finishes and fills the cache.
+        """
+        key = normalize_query(query)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self._count("hits")
+            return cached
+
+        future, started = self._start(key, query)
+        try:
+            return future.result(timeout=max(0.0, self.timeout - (time.monotonic() - started)))
+        except FutureTimeout:
+            self._count("timeouts")
+            raise TimeoutError(f"Web search took longer than {self.timeout:g}s")
+        except Exception:
+            self._count("errors")
+            raise
+
+    def stats(self):
+        with self._lock:
+            return {**self.stats_counts, "inflight": len(self._inflight)}
+
+
+web_search = WebSearch(
+    provider=PROVIDERS[config.WEB_SEARCH_PROVIDER],
+    cache=WebResultCache(config.WEB_CACHE_PATH, config.WEB_CACHE_TTL),
+    timeout=config.WEB_SEARCH_TIMEOUT,
+    workers=config.WEB_SEARCH_WORKERS
+)
+
+
+def set_provider(provider):
+    """Swaps the search backend: a name from PROVIDERS or any callable query -> results."""
+    web_search.provider = PROVIDERS[provider] if isinstance(provider, str) else provider
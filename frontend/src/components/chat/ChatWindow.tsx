@@ -2,7 +2,7 @@ import { useState, useRef, useEffect } from 'react';
 import { Send, Sparkles } from 'lucide-react';
 import { MessageBubble } from './MessageBubble';
 import { ThinkingIndicator } from './ThinkingIndicator';
-import { sendChatMessage } from '../../services/api';
+import { streamChatMessage } from '../../services/api';
 import type { Message } from '../../types';
 
 interface ChatWindowProps {
@@ -13,6 +13,8 @@ export function ChatWindow({ onFeedbackClick }: ChatWindowProps) {
     const [messages, setMessages] = useState<Message[]>([]);
     const [input, setInput] = useState('');
     const [isLoading, setIsLoading] = useState(false);
+    const [stage, setStage] = useState('retrieving');
+    const [isStreaming, setIsStreaming] = useState(false);
     const messagesEndRef = useRef<HTMLDivElement>(null);
 
     const scrollToBottom = () => {
@@ -37,21 +39,41 @@ export function ChatWindow({ onFeedbackClick }: ChatWindowProps) {
         setMessages(prev => [...prev, userMessage]);
         setInput('');
         setIsLoading(true);
+        setStage('retrieving');
+
+        const aiMessageId = (Date.now() + 1).toString();
+        const upsertAiMessage = (update: (current: Message) => Message) => {
+            setMessages(prev => {
+                const existing = prev.find(m => m.id === aiMessageId);
+                const current: Message = existing ?? {
+                    id: aiMessageId,
+                    role: 'assistant',
+                    content: '',
+                    timestamp: new Date(),
+                    query: userMessage.content,
+                };
+                const next = update(current);
+                return existing ? prev.map(m => (m.id === aiMessageId ? next : m)) : [...prev, next];
+            });
+        };
 
         try {
-            const response = await sendChatMessage(userMessage.content);
-
-            const aiMessage: Message = {
-                id: (Date.now() + 1).toString(),
-                role: 'assistant',
-                content: response.answer,
-                sources: response.context_used,
-                timestamp: new Date(),
-                query: userMessage.content,
-            };
-
-            setMessages(prev => [...prev, aiMessage]);
+            const response = await streamChatMessage(userMessage.content, {
+                onToken: (text) => {
+                    setIsStreaming(true);
+                    upsertAiMessage(m => ({ ...m, content: m.content + text }));
+                },
+                onStatus: setStage,
+                onReset: () => {
+                    setIsStreaming(false);
+                    setMessages(prev => prev.filter(m => m.id !== aiMessageId));
+                },
+            });
+
+            // The final event carries the cleaned answer and the cited sources
+            upsertAiMessage(m => ({ ...m, content: response.answer, sources: response.context_used }));
         } catch (error) {
+            setMessages(prev => prev.filter(m => m.id !== aiMessageId));
             const errorMessage: Message = {
                 id: (Date.now() + 1).toString(),
                 role: 'assistant',
@@ -61,6 +83,7 @@ export function ChatWindow({ onFeedbackClick }: ChatWindowProps) {
             setMessages(prev => [...prev, errorMessage]);
         } finally {
             setIsLoading(false);
+            setIsStreaming(false);
         }
     };
 
@@ -100,7 +123,11 @@ export function ChatWindow({ onFeedbackClick }: ChatWindowProps) {
                     />
                 ))}
 
-                {isLoading && <ThinkingIndicator message="Searching memory & reasoning..." />}
+                {isLoading && !isStreaming && (
+                    <ThinkingIndicator
+                        message={stage === 'researching' ? 'Researching the web...' : 'Searching memory & reasoning...'}
+                    />
+                )}
 
                 <div ref={messagesEndRef} />
             </div>
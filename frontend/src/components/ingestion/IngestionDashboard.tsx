@@ -3,8 +3,8 @@ import { Upload, Mic, Image, FileText, FolderSearch } from 'lucide-react';
 import { AudioRecorder } from './AudioRecorder';
 import { FileDropzone } from './FileDropzone';
 import { ProcessingLogs } from './ProcessingLogs';
-import { ingestAudio, ingestImage, ingestText, scanKnowledgeFolder } from '../../services/api';
-import type { ProcessingLog } from '../../types';
+import { ingestAudio, ingestImage, ingestImages, ingestText, scanKnowledgeFolder } from '../../services/api';
+import type { Job, ProcessingLog } from '../../types';
 
 type TabType = 'audio' | 'image' | 'documents';
 
@@ -28,6 +28,12 @@ export function IngestionDashboard() {
         ));
     };
 
+    const jobProgress = (filename: string) => (job: Job) => {
+        updateLog(filename, {
+            message: `${job.stage || job.status} (${Math.round(job.progress * 100)}%)`
+        });
+    };
+
     const handleAudioFiles = async (files: File[]) => {
         for (const file of files) {
             addLog({
@@ -38,7 +44,7 @@ export function IngestionDashboard() {
             });
 
             try {
-                const response = await ingestAudio(file, file.name);
+                const response = await ingestAudio(file, file.name, jobProgress(file.name));
                 updateLog(file.name, {
                     status: 'success',
                     message: response.text_snippet || 'Transcription complete!'
@@ -53,6 +59,9 @@ export function IngestionDashboard() {
     };
 
     const handleImageFiles = async (files: File[]) => {
+        if (files.length > 1) {
+            return handleImageBatch(files);
+        }
         for (const file of files) {
             addLog({
                 type: 'image',
@@ -62,7 +71,7 @@ export function IngestionDashboard() {
             });
 
             try {
-                const response = await ingestImage(file);
+                const response = await ingestImage(file, jobProgress(file.name));
                 updateLog(file.name, {
                     status: 'success',
                     message: response.extracted_text || 'Text extraction complete!'
@@ -76,6 +85,32 @@ export function IngestionDashboard() {
         }
     };
 
+    const handleImageBatch = async (files: File[]) => {
+        const label = `${files.length} images`;
+        addLog({
+            type: 'image',
+            filename: label,
+            status: 'processing',
+            message: 'Extracting text from images...'
+        });
+
+        try {
+            const response = await ingestImages(files, jobProgress(label));
+            const failed = response.images.filter(img => img.status === 'error');
+            updateLog(label, {
+                status: response.images_processed ? 'success' : 'error',
+                message: `${response.images_processed} image(s) indexed in ${response.elapsed_seconds}s` +
+                    ` (${response.images_per_second ?? '-'} img/s)` +
+                    (failed.length ? `, failed: ${failed.map(img => img.filename).join(', ')}` : '')
+            });
+        } catch (err) {
+            updateLog(label, {
+                status: 'error',
+                message: err instanceof Error ? err.message : 'Text extraction failed'
+            });
+        }
+    };
+
     const handleTextFiles = async (files: File[]) => {
         for (const file of files) {
             addLog({
@@ -86,7 +121,7 @@ export function IngestionDashboard() {
             });
 
             try {
-                const response = await ingestText(file);
+                const response = await ingestText(file, jobProgress(file.name));
                 updateLog(file.name, {
                     status: 'success',
                     message: `${response.chunks_created} chunk(s) created: ${response.text_snippet}`
@@ -110,10 +145,11 @@ export function IngestionDashboard() {
         });
 
         try {
-            const response = await scanKnowledgeFolder();
+            const response = await scanKnowledgeFolder(jobProgress('Knowledge Folder'));
             updateLog('Knowledge Folder', {
-                status: response.files_processed > 0 ? 'success' : 'error',
-                message: response.message || `Processed ${response.files_processed} file(s): ${response.files?.join(', ') || 'none'}`
+                status: response.status === 'success' || response.files_processed > 0 ? 'success' : 'error',
+                message: response.message || `Processed ${response.files_processed} file(s): ${response.files?.join(', ') || 'none'}` +
+                    ` (${response.files_unchanged ?? 0} unchanged, ${response.files_removed?.length ?? 0} removed)`
             });
         } catch (err) {
             updateLog('Knowledge Folder', {
@@ -1,10 +1,46 @@
 const API_BASE_URL = 'http://localhost:8000';
 
-import type { ChatResponse, IngestResponse, FeedbackResponse } from '../types';
+import type { BatchImageResponse, ChatFilters, ChatResponse, IngestResponse, FeedbackResponse, Job, JobAccepted } from '../types';
 
-export async function sendChatMessage(query: string): Promise<ChatResponse> {
+const JOB_POLL_INTERVAL_MS = 1000;
+
+export async function getJob(jobId: string): Promise<Job> {
+    const response = await fetch(`${API_BASE_URL}/jobs/${jobId}`);
+
+    if (!response.ok) {
+        throw new Error(`Job lookup failed: ${response.statusText}`);
+    }
+
+    return response.json();
+}
+
+// Ingestion endpoints return a job ID straight away; poll until the job finishes
+export async function waitForJob<T>(jobId: string, onProgress?: (job: Job) => void): Promise<T> {
+    while (true) {
+        const job = await getJob(jobId);
+        if (job.status === 'succeeded') {
+            return job.result as T;
+        }
+        if (job.status === 'failed') {
+            throw new Error(job.error || 'Ingestion job failed');
+        }
+        onProgress?.(job);
+        await new Promise(resolve => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+    }
+}
+
+function appendChatFilters(formData: FormData, filters?: ChatFilters) {
+    if (!filters) return;
+    Object.entries(filters).forEach(([key, value]) => {
+        const text = Array.isArray(value) ? value.join(',') : value;
+        if (text) formData.append(key, text);
+    });
+}
+
+export async function sendChatMessage(query: string, filters?: ChatFilters): Promise<ChatResponse> {
     const formData = new FormData();
     formData.append('query', query);
+    appendChatFilters(formData, filters);
 
     const response = await fetch(`${API_BASE_URL}/chat`, {
         method: 'POST',
@@ -18,7 +54,56 @@ export async function sendChatMessage(query: string): Promise<ChatResponse> {
     return response.json();
 }
 
-export async function ingestAudio(file: Blob, filename: string = 'recording.wav'): Promise<IngestResponse> {
+export interface ChatStreamHandlers {
+    onToken: (text: string) => void;
+    onStatus?: (stage: string) => void;
+    onReset?: () => void;
+}
+
+// Streams /chat/stream (Server-Sent Events over a POST body) and resolves with the final answer
+export async function streamChatMessage(query: string, handlers: ChatStreamHandlers, filters?: ChatFilters): Promise<ChatResponse> {
+    const formData = new FormData();
+    formData.append('query', query);
+    appendChatFilters(formData, filters);
+
+    const response = await fetch(`${API_BASE_URL}/chat/stream`, {
+        method: 'POST',
+        body: formData,
+    });
+
+    if (!response.ok || !response.body) {
+        throw new Error(`Chat request failed: ${response.statusText}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const raw = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+
+            const event = raw.match(/^event: (.*)$/m)?.[1];
+            const data = JSON.parse(raw.match(/^data: (.*)$/m)?.[1] || '{}');
+
+            if (event === 'token') handlers.onToken(data.text);
+            else if (event === 'status') handlers.onStatus?.(data.stage);
+            else if (event === 'reset') handlers.onReset?.();
+            else if (event === 'error') throw new Error(data.detail || 'Chat stream failed');
+            else if (event === 'final') return data as ChatResponse;
+        }
+    }
+
+    throw new Error('Chat stream ended without an answer');
+}
+
+export async function ingestAudio(file: Blob, filename: string = 'recording.wav', onProgress?: (job: Job) => void): Promise<IngestResponse> {
     const formData = new FormData();
     formData.append('file', file, filename);
 
@@ -31,10 +116,11 @@ export async function ingestAudio(file: Blob, filename: string = 'recording.wav'
         throw new Error(`Audio ingestion failed: ${response.statusText}`);
     }
 
-    return response.json();
+    const accepted: JobAccepted = await response.json();
+    return waitForJob<IngestResponse>(accepted.job_id, onProgress);
 }
 
-export async function ingestImage(file: File): Promise<IngestResponse> {
+export async function ingestImage(file: File, onProgress?: (job: Job) => void): Promise<IngestResponse> {
     const formData = new FormData();
     formData.append('file', file);
 
@@ -47,7 +133,25 @@ export async function ingestImage(file: File): Promise<IngestResponse> {
         throw new Error(`Image ingestion failed: ${response.statusText}`);
     }
 
-    return response.json();
+    const accepted: JobAccepted = await response.json();
+    return waitForJob<IngestResponse>(accepted.job_id, onProgress);
+}
+
+export async function ingestImages(files: File[], onProgress?: (job: Job) => void): Promise<BatchImageResponse> {
+    const formData = new FormData();
+    files.forEach(file => formData.append('files', file));
+
+    const response = await fetch(`${API_BASE_URL}/ingest/images`, {
+        method: 'POST',
+        body: formData,
+    });
+
+    if (!response.ok) {
+        throw new Error(`Batch image ingestion failed: ${response.statusText}`);
+    }
+
+    const accepted: JobAccepted = await response.json();
+    return waitForJob<BatchImageResponse>(accepted.job_id, onProgress);
 }
 
 export async function submitFeedback(originalQuery: string, correctAnswer: string): Promise<FeedbackResponse> {
@@ -88,10 +192,12 @@ export interface ScanResponse {
     message?: string;
     files_processed: number;
     files?: string[];
+    files_unchanged?: number;
+    files_removed?: string[];
     errors?: { file: string; error: string }[];
 }
 
-export async function ingestText(file: File): Promise<TextIngestResponse> {
+export async function ingestText(file: File, onProgress?: (job: Job) => void): Promise<TextIngestResponse> {
     const formData = new FormData();
     formData.append('file', file);
 
@@ -104,10 +210,11 @@ export async function ingestText(file: File): Promise<TextIngestResponse> {
         throw new Error(`Text ingestion failed: ${response.statusText}`);
     }
 
-    return response.json();
+    const accepted: JobAccepted = await response.json();
+    return waitForJob<TextIngestResponse>(accepted.job_id, onProgress);
 }
 
-export async function scanKnowledgeFolder(): Promise<ScanResponse> {
+export async function scanKnowledgeFolder(onProgress?: (job: Job) => void): Promise<ScanResponse> {
     const response = await fetch(`${API_BASE_URL}/ingest/scan`, {
         method: 'POST',
     });
@@ -116,6 +223,7 @@ export async function scanKnowledgeFolder(): Promise<ScanResponse> {
         throw new Error(`Folder scan failed: ${response.statusText}`);
     }
 
-    return response.json();
+    const accepted: JobAccepted = await response.json();
+    return waitForJob<ScanResponse>(accepted.job_id, onProgress);
 }
 
@@ -1,13 +1,75 @@
 // API Types
+export interface ContextTokens {
+    chunks: number;
+    used: number;
+    duplicates: number;
+    trimmed: number;
+    dropped: number;
+    raw_tokens: number;
+    packed_tokens: number;
+    saved_tokens: number;
+}
+
+// Optional /chat scope; lists are sent comma-separated, dates as ISO strings or epoch seconds
+export interface ChatFilters {
+    source?: string[];
+    filename?: string[];
+    path_prefix?: string;
+    since?: string;
+    until?: string;
+}
+
 export interface ChatResponse {
     answer: string;
     context_used: string[];
+    sources?: number[];
+    context_tokens?: ContextTokens | null;
+    corrected?: boolean;
+    similarity?: number;
 }
 
 export interface IngestResponse {
     status: string;
     text_snippet?: string;
     extracted_text?: string;
+    cached?: boolean;
+}
+
+export interface BatchImageResult {
+    filename: string;
+    status: 'success' | 'error';
+    chunks_created?: number;
+    extracted_text?: string;
+    latency_ms?: number;
+    error?: string;
+}
+
+export interface BatchImageResponse {
+    status: string;
+    images_processed: number;
+    images_failed: number;
+    elapsed_seconds: number;
+    images_per_second: number | null;
+    images: BatchImageResult[];
+}
+
+export interface JobAccepted {
+    status: string;
+    job_id: string;
+    filename?: string;
+}
+
+export interface Job {
+    id: string;
+    kind: string;
+    filename?: string;
+    status: 'queued' | 'running' | 'succeeded' | 'failed';
+    stage?: string;
+    progress: number;
+    result?: unknown;
+    error?: string;
+    queue_seconds: number;
+    run_seconds?: number;
 }
 
 export interface FeedbackResponse {